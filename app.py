@@ -1,12 +1,15 @@
 import streamlit as st
 from ui.layout import setup_page, render_header, render_footer, inject_css
-from ui.sidebar import render_sidebar
+from ui.sidebar import render_export, render_sidebar
 from ui.tabs import render_tabs
-from data.processor import process_data
+from ui.diagnostics import begin_trace, render_diagnostics
+from data.instrument import finish_trace, stage
+from data.processor import add_confidence_intervals, get_scoring_profile, get_views, process_data
 
 
 # Page Setup
 setup_page()
+trace = begin_trace()
 inject_css()
 render_header()
 
@@ -16,17 +19,31 @@ render_footer()
 
 
 # Sidebar: Upload + Filters
-survey_df, hr_df, filters = render_sidebar()
+cube, hr_df, filters = render_sidebar()
 
 
 # Data Processing
+profile = get_scoring_profile()
 results_df = process_data(
-    survey_df=survey_df,
+    cube=cube,
     hr_df=hr_df,
-    agg_level=filters["agg_level"],
+    filters=filters,
+    profile=profile,
 )
+results_df = add_confidence_intervals(results_df, cube, hr_df, filters, profile)
+views = get_views(results_df, cube, hr_df, filters, profile)
+builds_before = views.builds.copy()
 
 
 # Main Content
-render_tabs(results_df, filters)
+with stage("render_tabs"):
+    render_tabs(views, filters, profile,
+                drill=lambda level: process_data(cube, hr_df, {**filters, "agg_level": level}, profile,
+                                                 slot="drill"))
+render_export(cube, hr_df, filters, profile)
+
+
+# Diagnostics (opt-in)
+finish_trace(trace)
+render_diagnostics(trace, views, builds_before)
 
@@ -0,0 +1,93 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.index import DimensionIndex
+
+# Sidebar filter benchmark: four isin masks + sorted(unique()) option lists
+# over the raw survey (the pre-index path) versus DimensionIndex options and
+# bitmap/posting intersection.
+#
+#     python -m benchmarks.bench_filters --rows 5000000 --departments 400
+
+DIMS = ['month', 'department', 'role_level', 'location']
+
+
+def make_frame(rows, departments, locations, roles, months, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = {
+        'department': np.array([f"Dept {i:04d}" for i in range(departments)], dtype=object),
+        'location': np.array([f"Site {i:04d}" for i in range(locations)], dtype=object),
+        'role_level': np.array([f"Level {i}" for i in range(roles)], dtype=object),
+        'month': np.array([str(p) for p in pd.period_range('2022-01', periods=months, freq='M')], dtype=object),
+    }
+    return pd.DataFrame({col: values[rng.integers(0, len(values), rows)] for col, values in labels.items()})
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def selections(options, rng):
+    # A mix of typical sidebar states: defaults, narrow picks, one value removed
+    yield "last 3 months, all else", {
+        'month': options['month'][-3:], 'department': options['department'],
+        'role_level': options['role_level'], 'location': options['location'],
+    }
+    yield "5 departments", {
+        'month': options['month'][-3:], 'department': list(rng.choice(options['department'], 5, replace=False)),
+        'role_level': options['role_level'], 'location': options['location'],
+    }
+    yield "all but one location", {
+        'month': options['month'], 'department': options['department'],
+        'role_level': options['role_level'], 'location': options['location'][1:],
+    }
+
+
+def run(rows, departments, locations, roles, months, repeat):
+    frame = make_frame(rows, departments, locations, roles, months)
+    print(f"{rows:,} rows, {departments} departments, {locations} locations, {roles} roles, {months} months")
+
+    build, index = _best_of(lambda: DimensionIndex(frame, DIMS), 1)
+    print(f"index build: {build:.3f}s ({index.nbytes / 1e6:.0f} MB)")
+
+    scan_opts, options = _best_of(lambda: {c: sorted(frame[c].unique()) for c in DIMS}, repeat)
+    index_opts, _ = _best_of(lambda: {c: index.options(c) for c in DIMS}, repeat)
+    print(f"{'option lists':<28} isin/unique {scan_opts * 1e3:9.1f} ms   index {index_opts * 1e3:9.3f} ms")
+
+    rng = np.random.default_rng(1)
+    for label, selection in selections(options, rng):
+        def scan():
+            mask = np.ones(len(frame), dtype=bool)
+            for col, values in selection.items():
+                mask &= frame[col].isin(values).to_numpy()
+            return mask
+
+        scan_time, expected = _best_of(scan, repeat)
+        index_time, got = _best_of(lambda: index.mask(selection), repeat)
+        assert np.array_equal(expected, got), label
+        print(f"{label:<28} isin/unique {scan_time * 1e3:9.1f} ms   index {index_time * 1e3:9.1f} ms"
+              f"   ({scan_time / index_time:5.1f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_filters", description="Benchmark sidebar filtering: isin scans vs DimensionIndex.")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--departments", type=int, default=400)
+    parser.add_argument("--locations", type=int, default=60)
+    parser.add_argument("--roles", type=int, default=6)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+    run(args.rows, args.departments, args.locations, args.roles, args.months, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from benchmarks.synth import generate
+from data import disk_cache
+from data.cache import ResultCache, normalize_filters
+from data.engine import GROUP_KEY_MAP
+from data.instrument import finish_trace, start_trace
+from data.registry import DatasetRegistry
+from data.scoring import DEFAULT_PROFILE
+from visuals.figures import group_bar_figure, radar_figure, trend_figure
+
+# End-to-end pipeline benchmark on a synthetic (or supplied) survey/HR pair.
+# Times the headless work behind each dashboard step: load_data (registry
+# parse + cube build, cold and from the disk cache), sidebar filtering,
+# process_data for every aggregation level (uncached and as a cache hit), and
+# each chart (figure build and the PNG encode st.pyplot does). Load timings
+# carry their per-stage breakdown from data.instrument. --sql runs the same
+# cases against the out-of-core SQLite backend (data.sql_store).
+#
+# Results are written as JSON; pass an earlier file to --compare to print the
+# change per case and exit non-zero if any case slowed past --threshold.
+#
+#     python -m benchmarks.bench_pipeline --responses 1000000 --departments 400 --save bench.json
+#     python -m benchmarks.bench_pipeline --responses 1000000 --departments 400 --compare bench.json
+
+# st.pyplot's default savefig arguments
+PYPLOT_SAVEFIG = {"format": "png", "bbox_inches": "tight", "dpi": 200}
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def _traced(fn, repeat):
+    # Best wall time plus the stage breakdown of that run
+    best, best_stages, result = float("inf"), {}, None
+    for _ in range(repeat):
+        trace = start_trace("bench")
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        finish_trace(trace)
+        if seconds < best:
+            best = seconds
+            best_stages = {r.path: round(r.seconds, 6) for r in trace.stages()}
+    return best, best_stages, result
+
+
+def selections(cube):
+    # Sidebar states: the default view, a narrow pick, and one value removed
+    months = cube.options('month')
+    departments = cube.options('department')
+    roles = cube.options('role_level')
+    locations = cube.options('location')
+    base = {"months": months[-3:], "departments": departments, "roles": roles,
+            "locations": locations, "agg_level": "Department"}
+    yield "default", base
+    yield "5 departments", {**base, "departments": departments[:5]}
+    yield "all months, all but one location", {**base, "months": months, "locations": locations[1:]}
+
+
+def _encode(fig):
+    buf = io.BytesIO()
+    fig.savefig(buf, **PYPLOT_SAVEFIG)
+    plt.close(fig)
+    return buf.tell()
+
+
+def run(survey_path, hr_path, chunksize=None, repeat=3, profile=DEFAULT_PROFILE, sql=False, log=print):
+    cases = []
+
+    def record(name, seconds, rows=None, stages=None, nbytes=None):
+        case = {"name": name, "seconds": round(seconds, 6)}
+        detail = ""
+        if rows is not None:
+            case["rows"] = int(rows)
+            detail = f"   {rows:,} rows"
+        if nbytes is not None:
+            case["bytes"] = int(nbytes)
+            detail = f"   {nbytes / 1e3:,.0f} KB"
+        if stages:
+            case["stages"] = stages
+        cases.append(case)
+        log(f"{name:<48} {seconds * 1e3:10.1f} ms{detail}")
+
+    # load_data: a fresh registry (and SQL store) per run, so every run parses
+    def load():
+        if not sql:
+            return DatasetRegistry().load(survey_path, hr_path, chunksize=chunksize)
+        with tempfile.TemporaryDirectory() as root:
+            return DatasetRegistry(sql_dir=root).load(survey_path, hr_path, chunksize=chunksize)
+
+    seconds, stages, dataset = _traced(load, repeat)
+    record("load_data (parse)", seconds, dataset.report["rows_kept"], stages)
+    hr = dataset.hr
+    cube = dataset.cube
+
+    sql_root = tempfile.TemporaryDirectory() if sql else None
+    if sql:
+        dataset = DatasetRegistry(sql_dir=sql_root.name).load(survey_path, hr_path, chunksize=chunksize)
+        cube = dataset.cube
+        seconds, stages, _ = _traced(
+            lambda: DatasetRegistry(sql_dir=sql_root.name).load(survey_path, hr_path, dataset_id=dataset.dataset_id),
+            repeat)
+        record("load_data (sql store)", seconds, dataset.report["rows_kept"], stages)
+    elif disk_cache.available():
+        with tempfile.TemporaryDirectory() as root:
+            cache = disk_cache.DiskCache(root)
+            cache.save(dataset.dataset_id, dataset.survey, hr, cube, dataset.warnings, dataset.report)
+            seconds, stages, _ = _traced(
+                lambda: DatasetRegistry(disk_cache=cache).load(
+                    survey_path, hr_path, chunksize=chunksize, dataset_id=dataset.dataset_id), repeat)
+            record("load_data (disk cache)", seconds, dataset.report["rows_kept"], stages)
+
+    # Sidebar: option lists and the matching-response count for each filter state
+    seconds, _ = _best_of(lambda: [cube.options(c) for c in ('month', 'department', 'role_level', 'location')],
+                          repeat)
+    record("sidebar options", seconds, len(cube))
+    default_filters = None
+    for label, filters in selections(cube):
+        default_filters = default_filters or filters
+        seconds, matching = _best_of(lambda: cube.responses(filters), repeat)
+        record(f"sidebar filter: {label}", seconds, matching)
+
+    # process_data per aggregation level, computed and then served from cache
+    results = {}
+    for agg_level in GROUP_KEY_MAP:
+        filters = {**default_filters, "agg_level": agg_level}
+        seconds, stages, results[agg_level] = _traced(
+            lambda: cube.compute_cri(hr, agg_level, filters, profile), repeat)
+        record(f"process_data: {agg_level}", seconds, len(results[agg_level]), stages)
+
+        cache = ResultCache()
+        key = (dataset.dataset_id, normalize_filters(filters), profile)
+        cache.get_or_compute(key, lambda: results[agg_level])
+        seconds, _ = _best_of(lambda: cache.get_or_compute(
+            (dataset.dataset_id, normalize_filters(filters), profile), lambda: None), repeat)
+        record(f"process_data: {agg_level} (cached)", seconds)
+
+    # Charts: figure build and PNG encode, per aggregation level
+    charts = {
+        "trend": lambda df: trend_figure(df, profile),
+        "group_bar": lambda df: group_bar_figure(df, profile),
+        "radar": lambda df: radar_figure(df),
+    }
+    for agg_level, df in results.items():
+        for name, build in charts.items():
+            build_time = encode_time = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                fig = build(df)
+                built = time.perf_counter()
+                if fig is None:
+                    break
+                size = _encode(fig)
+                build_time = min(build_time, built - start)
+                encode_time = min(encode_time, time.perf_counter() - built)
+            if fig is None:
+                continue
+            record(f"chart {name}: {agg_level}", build_time, len(df))
+            record(f"chart {name} png: {agg_level}", encode_time, nbytes=size)
+
+    if sql_root is not None:
+        sql_root.cleanup()
+    return cases
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "matplotlib": matplotlib.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(baseline, cases, threshold):
+    # Prints old/new per case; returns the names that slowed past threshold
+    before = {case["name"]: case["seconds"] for case in baseline["cases"]}
+    regressions = []
+    print(f"\nvs {baseline.get('environment', {}).get('git') or 'baseline'} ({baseline.get('created', '?')})")
+    for case in cases:
+        old = before.get(case["name"])
+        if not old:
+            continue
+        ratio = case["seconds"] / old
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(case["name"])
+            flag = "  SLOWER"
+        print(f"{case['name']:<48} {old * 1e3:10.1f} -> {case['seconds'] * 1e3:10.1f} ms  ({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_pipeline",
+                                     description="Benchmark loading, filtering, scoring and charts end to end.")
+    parser.add_argument("--survey", help="survey CSV to benchmark (default: generate one)")
+    parser.add_argument("--hr", help="HR CSV to benchmark (required with --survey)")
+    parser.add_argument("--data-dir", help="where to write generated CSVs (default: a temporary directory)")
+    parser.add_argument("--responses", type=int, default=100_000)
+    parser.add_argument("--departments", type=int, default=40)
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--roles", type=int, default=5)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunksize", type=int, default=None, help="stream the survey in chunks of this many rows")
+    parser.add_argument("--sql", action="store_true", help="use the out-of-core SQLite backend")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--compare", help="results JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.2, help="slowdown that counts as a regression (default: 0.2)")
+    args = parser.parse_args(argv)
+    if bool(args.survey) != bool(args.hr):
+        parser.error("--survey and --hr go together")
+
+    plt.switch_backend("Agg")
+    params = {"chunksize": args.chunksize, "repeat": args.repeat, "sql": args.sql}
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.survey:
+            survey_path, hr_path = args.survey, args.hr
+            params.update({"survey": survey_path, "hr": hr_path})
+        else:
+            params.update({k: getattr(args, k) for k in ("responses", "departments", "locations", "roles",
+                                                          "months", "seed")})
+            start = time.perf_counter()
+            survey_path, hr_path = generate(args.data_dir or tmp, args.responses, args.departments,
+                                            args.locations, args.roles, args.months, args.seed)
+            print(f"generated {args.responses:,} responses in {time.perf_counter() - start:.1f}s")
+        cases = run(survey_path, hr_path, args.chunksize, args.repeat, sql=args.sql)
+
+    results = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": params,
+        "environment": environment(),
+        "cases": cases,
+    }
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results in {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print("note: baseline was run with different parameters", file=sys.stderr)
+        regressions = compare(baseline, cases, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than {1 + args.threshold:.2f}x baseline")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.cube import SurveyCube
+from data.engine import GROUP_KEY_MAP, HR_METRICS, Q_ALL, compute_cri
+
+# Reference-equivalence check for the vectorized scoring kernel: random
+# surveys (missing answers, one-response groups, groups skipping months,
+# partial HR coverage) are scored by the kernel (SurveyCube.compute_cri) and
+# by the original pandas implementation on raw rows (engine.compute_cri).
+# Components must agree to 1e-9 and CRI / risk level exactly.
+#
+#     python -m benchmarks.kernel_equivalence --cases 50
+
+COMPARE_COLUMNS = ["vol_score", "trust_score", "comm_score", "hr_score", "change_score"]
+
+
+def random_case(rng, rows):
+    n_dept, n_role, n_loc, n_month = rng.integers(1, 12), rng.integers(1, 5), rng.integers(1, 8), rng.integers(1, 9)
+    months = [str(p) for p in pd.period_range('2024-01', periods=n_month, freq='M')]
+    survey = pd.DataFrame({
+        'department': rng.choice([f"D{i}" for i in range(n_dept)], rows),
+        'role_level': rng.choice([f"R{i}" for i in range(n_role)], rows),
+        'location': rng.choice([f"L{i}" for i in range(n_loc)], rows),
+        'month': rng.choice(months, rows),
+    })
+    answers = rng.integers(1, 6, (rows, len(Q_ALL))).astype(float)
+    answers[rng.random(answers.shape) < 0.05] = np.nan
+    answers[rng.random(rows) < 0.02] = np.nan  # a few rows with no answers at all
+    survey[Q_ALL] = answers
+    survey = survey.dropna(subset=Q_ALL, how='all')
+
+    hr_rows = [
+        [d, m] + list(rng.random(len(HR_METRICS)) * [0.1, 0.05, 4, 6, 5])
+        for d in survey['department'].unique() for m in months if rng.random() < 0.7
+    ]
+    hr = pd.DataFrame(hr_rows, columns=['department', 'month'] + HR_METRICS)
+    if hr.empty:
+        hr = pd.DataFrame([["D0", months[0]] + [0.0] * len(HR_METRICS)], columns=['department', 'month'] + HR_METRICS)
+    return survey, hr
+
+
+def random_filters(rng, survey):
+    def pick(col):
+        values = sorted(survey[col].unique())
+        k = rng.integers(1, len(values) + 1)
+        return sorted(rng.choice(values, k, replace=False))
+
+    return {"months": pick('month'), "departments": pick('department'),
+            "roles": pick('role_level'), "locations": pick('location')}
+
+
+def check(reference, candidate):
+    reference = reference.reset_index(drop=True)
+    candidate = candidate.reset_index(drop=True)
+    if len(reference) != len(candidate):
+        return f"row count {len(reference)} != {len(candidate)}"
+    for col in ["group", "month", "responses", "risk_level"]:
+        if not (reference[col].astype(str).to_numpy() == candidate[col].astype(str).to_numpy()).all():
+            return f"column {col} differs"
+    ref_cri, cand_cri = reference["CRI"].to_numpy(), candidate["CRI"].to_numpy()
+    if not np.array_equal(ref_cri, cand_cri, equal_nan=True):
+        return f"CRI differs in {int((ref_cri != cand_cri).sum())} rows"
+    for col in COMPARE_COLUMNS:
+        if not np.allclose(reference[col], candidate[col], rtol=0, atol=1e-9, equal_nan=True):
+            return f"{col} differs by up to {np.nanmax(np.abs(reference[col] - candidate[col])):.3g}"
+    return None
+
+
+def run(cases, rows, seed):
+    rng = np.random.default_rng(seed)
+    failures = 0
+    reference_time = kernel_time = 0.0
+    for case in range(cases):
+        survey, hr = random_case(rng, int(rng.integers(5, rows)))
+        cube = SurveyCube.from_survey(survey)
+        filters = random_filters(rng, survey) if case % 2 else None
+        if filters is not None:
+            raw = survey[
+                survey['month'].isin(filters['months']) & survey['department'].isin(filters['departments']) &
+                survey['role_level'].isin(filters['roles']) & survey['location'].isin(filters['locations'])
+            ]
+            if raw.empty:
+                continue
+        else:
+            raw = survey
+
+        for agg_level in GROUP_KEY_MAP:
+            start = time.perf_counter()
+            reference = compute_cri(raw, hr, agg_level)
+            reference_time += time.perf_counter() - start
+            start = time.perf_counter()
+            candidate = cube.compute_cri(hr, agg_level, filters)
+            kernel_time += time.perf_counter() - start
+
+            problem = check(reference, candidate)
+            if problem:
+                failures += 1
+                print(f"case {case} ({agg_level}): {problem}")
+
+    print(f"{cases} cases x {len(GROUP_KEY_MAP)} levels: {failures} mismatches "
+          f"(pandas {reference_time:.2f}s, kernel {kernel_time:.2f}s)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.kernel_equivalence",
+                                     description="Check the scoring kernel against the pandas reference.")
+    parser.add_argument("--cases", type=int, default=50)
+    parser.add_argument("--rows", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    return 1 if run(args.cases, args.rows, args.seed) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
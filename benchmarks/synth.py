@@ -0,0 +1,145 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data.engine import HR_METRICS, Q_ALL, Q_CHANGE
+
+# Synthetic survey/HR generator. Writes a survey CSV and an HR CSV in the same
+# layout as the upload templates, at any size, reproducibly from a seed.
+#
+# Each department has a latent health level that drifts month to month, some
+# departments are polarized (answers split into two camps), and some
+# department-months carry a change shock that hits the change questions and
+# the HR stress metrics. Department sizes are heavy-tailed, so a few large
+# departments sit next to many small ones. About 1% of answers are blank.
+#
+#     python -m benchmarks.synth out/ --responses 1000000 --departments 400 --months 36
+
+DEFAULT_CHUNK_ROWS = 500_000
+ROLES = ["IC", "Senior IC", "Lead", "Manager", "Senior Manager", "Director", "VP", "Executive"]
+POLARIZED_SHARE = 0.1
+SHOCK_SHARE = 0.15
+MISSING_SHARE = 0.01
+
+
+class Organization:
+    # Latent parameters for one synthetic organization, shared by the survey
+    # and HR writers so HR stress tracks survey sentiment.
+
+    def __init__(self, departments, locations, roles, months, start="2022-01", seed=0):
+        rng = np.random.default_rng(seed)
+        self.departments = np.array([f"Dept {i:04d}" for i in range(departments)], dtype=object)
+        self.locations = np.array([f"Site {i:04d}" for i in range(locations)], dtype=object)
+        self.roles = np.array([ROLES[i] if i < len(ROLES) else f"Level {i}" for i in range(roles)], dtype=object)
+        self.months = pd.period_range(start, periods=months, freq="M")
+
+        size = 1.0 / np.arange(1, departments + 1) ** 0.8
+        self.dept_weights = rng.permutation(size / size.sum())
+        self.health = rng.normal(0.0, 0.5, departments)
+        self.drift = rng.normal(0.0, 0.03, departments)
+        self.polarized = rng.random(departments) < POLARIZED_SHARE
+        self.shock = (rng.random((departments, months)) < SHOCK_SHARE) * rng.uniform(0.4, 1.2, (departments, months))
+        self.location_effect = rng.normal(0.0, 0.2, locations)
+        self.role_effect = np.linspace(-0.15, 0.25, roles) if roles > 1 else np.zeros(1)
+
+        # Every calendar day of the range in the template's M/D/YYYY format
+        days = pd.date_range(self.months[0].start_time, self.months[-1].end_time.normalize(), freq="D")
+        self.day_labels = np.array([f"{d.month}/{d.day}/{d.year}" for d in days], dtype=object)
+        day_month = np.asarray((days.year - self.months[0].year) * 12 + days.month - self.months[0].month)
+        self.month_days = np.bincount(day_month, minlength=months)
+        self.month_first_day = np.concatenate([[0], np.cumsum(self.month_days)[:-1]])
+
+    def mood(self, dept, month):
+        return self.health[dept] + self.drift[dept] * month
+
+    def survey_chunk(self, rng, start, rows):
+        dept = rng.choice(len(self.departments), rows, p=self.dept_weights)
+        loc = rng.integers(0, len(self.locations), rows)
+        role = rng.integers(0, len(self.roles), rows)
+        month = rng.integers(0, len(self.months), rows)
+        day = self.month_first_day[month] + (rng.random(rows) * self.month_days[month]).astype(int)
+
+        level = 3.6 + self.mood(dept, month) + self.location_effect[loc] + self.role_effect[role]
+        camp = np.where(rng.random(rows) < 0.5, -1.2, 1.2)
+        level += np.where(self.polarized[dept], camp, 0.0) + rng.normal(0.0, 0.6, rows)
+
+        answers = level[:, None] + rng.normal(0.0, 0.7, (rows, len(Q_ALL)))
+        change = [Q_ALL.index(q) for q in Q_CHANGE]
+        answers[:, change] -= self.shock[dept, month][:, None]
+        answers = np.clip(np.rint(answers), 1, 5)
+        answers[rng.random(answers.shape) < MISSING_SHARE] = np.nan
+
+        frame = pd.DataFrame({
+            "response_id": [f"RESP_{i:08d}" for i in range(start + 1, start + rows + 1)],
+            "department": self.departments[dept],
+            "role_level": self.roles[role],
+            "location": self.locations[loc],
+        })
+        for i, q in enumerate(Q_ALL):
+            frame[q] = pd.array(answers[:, i], dtype="Int8")
+        frame["timestamp"] = self.day_labels[day]
+        return frame
+
+    def hr_frame(self, rng):
+        dept, month = np.meshgrid(np.arange(len(self.departments)), np.arange(len(self.months)), indexing="ij")
+        dept, month = dept.ravel(), month.ravel()
+        stress = np.clip(0.5 - 0.4 * self.mood(dept, month) + 0.5 * self.shock[dept, month]
+                         + rng.normal(0.0, 0.15, len(dept)), 0.0, None)
+        headcount = np.maximum(5, self.dept_weights[dept] * 20 * len(self.departments))
+        frame = pd.DataFrame({
+            "department": self.departments[dept],
+            "month": np.asarray(self.months.astype(str))[month],
+            "attrition_rate": np.round(0.01 + 0.03 * stress + rng.exponential(0.005, len(dept)), 3),
+            "absenteeism_rate": np.round(0.005 + 0.02 * stress + rng.exponential(0.003, len(dept)), 3),
+            "sick_days_avg": np.round(1.0 + 2.0 * stress + rng.exponential(0.3, len(dept)), 1),
+            "grievances_count": rng.poisson(stress * headcount / 40),
+            "manager_escalations": rng.poisson(stress * headcount / 60),
+        })
+        return frame[["department", "month"] + HR_METRICS]
+
+
+def generate(output_dir, responses, departments=40, locations=10, roles=5, months=24,
+             seed=0, chunk_rows=DEFAULT_CHUNK_ROWS):
+    # Writes survey.csv and hr.csv under output_dir and returns their paths.
+    # Rows are written chunk by chunk, so memory stays flat at 10M responses.
+    os.makedirs(output_dir, exist_ok=True)
+    org = Organization(departments, locations, roles, months, seed=seed)
+    rng = np.random.default_rng(seed + 1)
+    survey_path = os.path.join(output_dir, "survey.csv")
+    hr_path = os.path.join(output_dir, "hr.csv")
+
+    with open(survey_path, "w", newline="") as f:
+        for start in range(0, responses, chunk_rows):
+            chunk = org.survey_chunk(rng, start, min(chunk_rows, responses - start))
+            chunk.to_csv(f, index=False, header=start == 0)
+    org.hr_frame(rng).to_csv(hr_path, index=False)
+    return survey_path, hr_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.synth",
+                                     description="Generate a synthetic survey/HR CSV pair.")
+    parser.add_argument("output_dir")
+    parser.add_argument("--responses", type=int, default=100_000)
+    parser.add_argument("--departments", type=int, default=40)
+    parser.add_argument("--locations", type=int, default=10)
+    parser.add_argument("--roles", type=int, default=5)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    survey_path, hr_path = generate(args.output_dir, args.responses, args.departments, args.locations,
+                                    args.roles, args.months, args.seed)
+    size = os.path.getsize(survey_path) / 1e6
+    print(f"{args.responses:,} responses -> {survey_path} ({size:.0f} MB), {hr_path} "
+          f"({time.perf_counter() - start:.1f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,189 @@
+import argparse
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import matplotlib.pyplot as plt
+
+from data.cube import SurveyCube
+from data.engine import GROUP_KEY_MAP, DataValidationError, level_slug, load_inputs
+from data.ingest import DEFAULT_CHUNKSIZE, load_inputs_streaming
+from data.scoring import DEFAULT_PROFILE, ScoringProfile
+from visuals.figures import group_bar_figure, radar_figure, trend_figure
+
+# Batch report: score many organizations' survey/HR CSV pairs in a process
+# pool and write each org's results tables and charts (rendered with the Agg
+# backend, no Streamlit) under <output>/<org>/. Orgs are independent, so each
+# worker runs the whole pipeline for one org and throughput scales with cores.
+#
+# Inputs are either a manifest CSV with columns org,survey,hr (paths relative
+# to the manifest), or a directory holding <org>/survey.csv + <org>/hr.csv
+# subdirectories and/or <org>_survey.csv + <org>_hr.csv file pairs.
+
+CHART_DPI = 150
+SUMMARY_FIELDS = [
+    "org", "status", "rows", "groups", "months", "latest_avg_cri", "high_risk_groups",
+    "load_seconds", "score_seconds", "chart_seconds", "total_seconds", "error",
+]
+
+
+def discover(path):
+    if os.path.isfile(path):
+        base = os.path.dirname(os.path.abspath(path))
+        with open(path, newline="") as f:
+            return [(row["org"], os.path.join(base, row["survey"]), os.path.join(base, row["hr"]))
+                    for row in csv.DictReader(f)]
+
+    orgs = []
+    for name in sorted(os.listdir(path)):
+        full = os.path.join(path, name)
+        if os.path.isdir(full):
+            survey, hr = os.path.join(full, "survey.csv"), os.path.join(full, "hr.csv")
+            if os.path.isfile(survey) and os.path.isfile(hr):
+                orgs.append((name, survey, hr))
+        elif name.endswith("_survey.csv"):
+            org = name[:-len("_survey.csv")]
+            hr = os.path.join(path, f"{org}_hr.csv")
+            if os.path.isfile(hr):
+                orgs.append((org, full, hr))
+    return orgs
+
+
+def _save(fig, path):
+    if fig is None:
+        return
+    fig.savefig(path, format="png", bbox_inches='tight', dpi=CHART_DPI)
+    plt.close(fig)
+
+
+def run_org(org, survey_csv, hr_csv, output_dir, agg_levels, profile=DEFAULT_PROFILE,
+            chunksize=None, charts=True):
+    plt.switch_backend("Agg")
+    start = time.perf_counter()
+    row = {"org": org, "status": "ok", "error": ""}
+    try:
+        if chunksize:
+            survey, hr, warnings, report = load_inputs_streaming(survey_csv, hr_csv, chunksize=chunksize)
+        else:
+            survey, hr, warnings, report = load_inputs(survey_csv, hr_csv)
+        cube = SurveyCube.from_survey(survey)
+        loaded = time.perf_counter()
+
+        org_dir = os.path.join(output_dir, org)
+        os.makedirs(org_dir, exist_ok=True)
+        results = {}
+        for agg_level in agg_levels:
+            slug = level_slug(agg_level)
+            results[slug] = cube.compute_cri(hr, agg_level, profile=profile)
+            results[slug].to_csv(os.path.join(org_dir, f"cri_{slug}.csv"), index=False)
+        scored = time.perf_counter()
+
+        if charts:
+            for slug, df in results.items():
+                _save(trend_figure(df, profile), os.path.join(org_dir, f"trend_{slug}.png"))
+                _save(group_bar_figure(df, profile), os.path.join(org_dir, f"risk_levels_{slug}.png"))
+                _save(radar_figure(df), os.path.join(org_dir, f"component_drivers_{slug}.png"))
+        charted = time.perf_counter()
+
+        first = next(iter(results.values()))
+        latest = first[first['month'] == first['month'].max()]
+        row.update({
+            "rows": report["rows_kept"],
+            "groups": first['group'].nunique(),
+            "months": first['month'].nunique(),
+            "latest_avg_cri": round(float(latest['CRI'].mean()), 1),
+            "high_risk_groups": int((profile.band(latest['CRI'].to_numpy()) == 2).sum()),
+            "load_seconds": round(loaded - start, 3),
+            "score_seconds": round(scored - loaded, 3),
+            "chart_seconds": round(charted - scored, 3),
+        })
+        if warnings:
+            with open(os.path.join(org_dir, "warnings.txt"), "w") as f:
+                f.write("\n".join(warnings) + "\n")
+    except DataValidationError as e:
+        row.update({"status": "error", "error": str(e)})
+    except Exception as e:
+        # One broken org (unreadable file, bad HR values, chart failure) must
+        # not take the rest of the batch down with it
+        row.update({"status": "error", "error": f"{type(e).__name__}: {e}"})
+    finally:
+        plt.close("all")
+    row["total_seconds"] = round(time.perf_counter() - start, 3)
+    return row
+
+
+def run_batch(orgs, output_dir, agg_levels=("Department",), profile=DEFAULT_PROFILE,
+              workers=None, chunksize=None, charts=True, on_done=None):
+    os.makedirs(output_dir, exist_ok=True)
+    rows = []
+    if workers == 1:
+        for org, survey_csv, hr_csv in orgs:
+            rows.append(run_org(org, survey_csv, hr_csv, output_dir, agg_levels, profile, chunksize, charts))
+            if on_done:
+                on_done(rows[-1])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_org, org, survey_csv, hr_csv, output_dir, agg_levels, profile, chunksize,
+                                   charts): org for org, survey_csv, hr_csv in orgs}
+            for future in as_completed(futures):
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    # The worker itself died (e.g. killed for memory)
+                    rows.append({"org": futures[future], "status": "error", "error": f"{type(e).__name__}: {e}",
+                                 "total_seconds": 0.0})
+                if on_done:
+                    on_done(rows[-1])
+
+    rows.sort(key=lambda r: r["org"])
+    with open(os.path.join(output_dir, "summary.csv"), "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m data.batch",
+        description="Score many organizations' survey/HR CSV pairs and write per-org results and charts.",
+    )
+    parser.add_argument("inputs", help="manifest CSV (org,survey,hr) or directory of survey/HR pairs")
+    parser.add_argument("output_dir")
+    parser.add_argument("--agg-level", action="append", choices=list(GROUP_KEY_MAP),
+                        help="aggregation level to report (repeatable; default: Department)")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--profile", default=None, help="scoring profile JSON (default: built-in weights)")
+    parser.add_argument("--stream", action="store_true", help=f"stream surveys in chunks of {DEFAULT_CHUNKSIZE:,} rows")
+    parser.add_argument("--no-charts", action="store_true", help="write results tables only")
+
+    args = parser.parse_args(argv)
+    orgs = discover(args.inputs)
+    if not orgs:
+        print(f"error: no survey/HR pairs found in {args.inputs}", file=sys.stderr)
+        return 1
+    profile = ScoringProfile.from_json(args.profile) if args.profile else DEFAULT_PROFILE
+
+    def report(row):
+        detail = (f"{row['rows']:,} rows, CRI {row['latest_avg_cri']}" if row["status"] == "ok"
+                  else f"error: {row['error']}")
+        print(f"{row['org']}: {detail} ({row['total_seconds']:.2f}s)", flush=True)
+
+    start = time.perf_counter()
+    rows = run_batch(orgs, args.output_dir, args.agg_level or ["Department"], profile,
+                     workers=args.workers, chunksize=DEFAULT_CHUNKSIZE if args.stream else None,
+                     charts=not args.no_charts, on_done=report)
+    wall = time.perf_counter() - start
+
+    busy = sum(r["total_seconds"] for r in rows)
+    failed = sum(r["status"] != "ok" for r in rows)
+    print(f"{len(rows)} org(s), {failed} failed, in {wall:.2f}s "
+          f"({busy:.2f}s of work, {busy / wall:.1f}x parallel speedup); "
+          f"summary in {os.path.join(args.output_dir, 'summary.csv')}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
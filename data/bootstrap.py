@@ -0,0 +1,148 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from data.cube import _moments
+from data.engine import COMPONENTS, Q_ALL, Q_CHANGE, Q_COMM, Q_TRUST, group_columns
+from data.jobs import JobCancelled, checkpoint, process_pool
+from data.kernel import group_labels, hr_tensor, score_components
+from data.scoring import DEFAULT_PROFILE
+
+# Bootstrap confidence intervals for CRI and its components per group-month.
+#
+# Resampling works on the cube's sufficient statistics rather than raw rows.
+# Questions are treated as independent. Under that assumption, each of the
+# five aggregates the kernel scores from has an approximately normal sampling
+# distribution:
+#   - question-mean averages: variance sum(s_q^2 / n_q) / k^2
+#   - question-std averages: variance sum(s_q^2 / (2 (n_q - 1))) / k^2
+# A resample is therefore five normal draws per group-month. They are fed to
+# the same score_components the dashboard uses, so trust deltas, clipping and
+# rounding are applied per resample. Intervals are per cell, so every group
+# shares one (resamples, months) noise table per input (common random
+# numbers); groups are processed in blocks, optionally on a process pool, and
+# results do not depend on block size or worker count.
+
+DEFAULT_RESAMPLES = 1000
+DEFAULT_CONFIDENCE = 0.90
+BLOCK_ELEMENTS = 4_000_000
+
+_INPUTS = {
+    "vol_raw": ("std", Q_ALL),
+    "trust_mean": ("mean", Q_TRUST),
+    "comm_mean": ("mean", Q_COMM),
+    "comm_std": ("std", Q_COMM),
+    "change_mean": ("mean", Q_CHANGE),
+}
+OUTPUTS = ["CRI"] + COMPONENTS
+
+
+def input_moments(n, means, stds):
+    # Point value and standard error of each kernel input, (groups, months)
+    moments = {}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for name, (kind, questions) in _INPUTS.items():
+            cols = [Q_ALL.index(q) for q in questions]
+            q_n, q_mean, q_std = n[..., cols], means[..., cols], stds[..., cols]
+            values = q_mean if kind == "mean" else q_std
+            valid = ~np.isnan(values)
+            k = valid.sum(axis=-1)
+            point = np.where(k > 0, np.where(valid, values, 0.0).sum(axis=-1) / k, np.nan)
+            if kind == "mean":
+                var = q_std ** 2 / q_n
+            else:
+                var = q_std ** 2 / (2 * (q_n - 1))
+            var = np.where(np.isfinite(var), var, 0.0).sum(axis=-1) / np.maximum(k, 1) ** 2
+            moments[name] = (point.astype(np.float32), np.sqrt(var).astype(np.float32))
+    return moments
+
+
+def _quantiles(values, qs):
+    # Linear-interpolated quantiles over axis 0; one sort is much cheaper than
+    # np.quantile's per-quantile partition along a strided axis
+    ordered = np.sort(values, axis=0)
+    out = []
+    for q in qs:
+        pos = q * (len(ordered) - 1)
+        below = int(np.floor(pos))
+        above = min(below + 1, len(ordered) - 1)
+        frac = pos - below
+        out.append(ordered[below] * (1 - frac) + ordered[above] * frac)
+    return out
+
+
+def _block(args):
+    moments, noise, present, hr_raw, profile, confidence = args
+    draws = {}
+    for name, (point, se) in moments.items():
+        sample = point + se * noise[name][:, None, :]
+        draws[name] = np.clip(sample, 0, None) if _INPUTS[name][0] == "std" else sample
+    # HR metrics are not resampled; broadcast so hr_score keeps the resample axis
+    hr_raw = np.broadcast_to(hr_raw, sample.shape)
+
+    scores = score_components(draws, present, hr_raw, profile)
+    tail = (1 - confidence) / 2
+    return {name: tuple(_quantiles(scores[name], [tail, 1 - tail])) for name in OUTPUTS}
+
+
+def bootstrap_intervals(n, means, stds, present, hr_raw, profile=DEFAULT_PROFILE,
+                        resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, seed=0, workers=None):
+    n_groups, n_months = present.shape
+    moments = input_moments(n, means, stds)
+    rng = np.random.default_rng(seed)
+    noise = {name: rng.standard_normal((resamples, n_months), dtype=np.float32) for name in _INPUTS}
+    block = max(1, BLOCK_ELEMENTS // max(1, resamples * n_months))
+
+    tasks = []
+    for start in range(0, n_groups, block):
+        rows = slice(start, start + block)
+        block_moments = {name: (point[rows], se[rows]) for name, (point, se) in moments.items()}
+        tasks.append((block_moments, noise, present[rows], hr_raw[rows].astype(np.float32), profile, confidence))
+
+    results = []
+    if workers and workers > 1 and len(tasks) > 1:
+        with process_pool(workers) as pool:
+            try:
+                for result in pool.map(_block, tasks):
+                    results.append(result)
+                    checkpoint(len(results) / len(tasks), f"Bootstrap block {len(results)}/{len(tasks)}")
+            except JobCancelled:
+                pool.shutdown(cancel_futures=True)
+                raise
+    else:
+        for task in tasks:
+            checkpoint(len(results) / len(tasks), f"Bootstrap block {len(results) + 1}/{len(tasks)}")
+            results.append(_block(task))
+
+    intervals = {}
+    for name in OUTPUTS:
+        intervals[name] = (
+            np.concatenate([r[name][0] for r in results]) if results else np.empty((0, n_months)),
+            np.concatenate([r[name][1] for r in results]) if results else np.empty((0, n_months)),
+        )
+    return intervals
+
+
+def cube_intervals(cube, hr_df, agg_level, filters=None, profile=DEFAULT_PROFILE,
+                   resamples=DEFAULT_RESAMPLES, confidence=DEFAULT_CONFIDENCE, seed=0, workers=None):
+    groups, months, counts, n, total, total_sq = cube.tensor_stats(group_columns(agg_level), filters)
+    means, stds = _moments(n, total, total_sq)
+    present = counts > 0
+    hr_raw = hr_tensor(hr_df, groups, months, agg_level, cube.department_mix(agg_level, filters))
+
+    if workers is None:
+        workers = int(os.environ.get("CRI_BOOTSTRAP_WORKERS", "0")) or None
+    intervals = bootstrap_intervals(n, means, stds, present, hr_raw, profile,
+                                    resamples, confidence, seed, workers)
+
+    g, m = np.nonzero(present)
+    frame = pd.DataFrame({
+        "group": group_labels(groups)[g],
+        "month": np.asarray(months, dtype=object)[m],
+    })
+    for name in OUTPUTS:
+        lo, hi = intervals[name]
+        frame[f"{name}_lo"] = lo[g, m].astype(np.float64)
+        frame[f"{name}_hi"] = hi[g, m].astype(np.float64)
+    return frame
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from data.instrument import count
+
+# Results cache keyed on (dataset fingerprint, normalized filter selection).
+# Looking up a key costs O(number of selected filter values) instead of the
+# O(rows) argument hashing st.cache_data does on every rerun.
+
+DEFAULT_RESULT_CACHE_SIZE = 128
+_HASH_BLOCK = 1 << 20
+
+
+def _update_hash(h, src):
+    if isinstance(src, (bytes, bytearray, memoryview)):
+        h.update(src)
+    elif hasattr(src, "getbuffer"):
+        with src.getbuffer() as buf:
+            h.update(buf)
+    elif hasattr(src, "read"):
+        pos = src.tell()
+        src.seek(0)
+        for block in iter(lambda: src.read(_HASH_BLOCK), b""):
+            h.update(block)
+        src.seek(pos)
+    else:
+        with open(src, "rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                h.update(block)
+
+
+def fingerprint(*sources):
+    h = hashlib.blake2b(digest_size=16)
+    for src in sources:
+        _update_hash(h, src)
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def normalize_filters(filters):
+    def _values(key):
+        values = filters.get(key)
+        return None if values is None else tuple(sorted(set(values)))
+
+    return (
+        filters["agg_level"],
+        _values("months"),
+        _values("departments"),
+        _values("roles"),
+        _values("locations"),
+    )
+
+
+class ResultCache:
+    def __init__(self, maxsize=DEFAULT_RESULT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                count("result_cache_hit")
+                return self._entries[key]
+            self.misses += 1
+        count("result_cache_miss")
+
+        value = compute()
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, dataset_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == dataset_id]:
+                del self._entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,225 @@
+import numpy as np
+import pandas as pd
+
+from data.engine import (
+    DIMENSIONS,
+    FILTER_COLUMNS,
+    GROUP_KEY_MAP,
+    ORG_LEVEL,
+    Q_ALL,
+    combine_levels,
+    decategorize,
+    group_columns,
+    score_aggregates,
+)
+from data.index import DimensionIndex
+from data.instrument import stage
+from data.jobs import checkpoint
+from data.kernel import score_dense
+from data.scoring import DEFAULT_PROFILE
+
+# Sufficient-statistics cube: per (department, role_level, location, month)
+# cell we keep the response count and, per question, the count / sum / sum of
+# squares of valid answers. Means and sample standard deviations for any filter
+# selection and any aggregation level are rebuilt by summing cells, so filter
+# changes cost O(cells) instead of O(rows).
+#
+# Several aggregation levels (grouping sets) are computed together: the finest
+# is summed from cells, and each coarser level is rolled up from the smallest
+# level already computed whose columns include its own, so e.g. organization
+# <- department <- department x role costs one pass over cells in total.
+
+CELL_KEYS = DIMENSIONS + ['month']
+
+COUNT_COLS = [f"{q}_n" for q in Q_ALL]
+SUM_COLS = [f"{q}_sum" for q in Q_ALL]
+SUMSQ_COLS = [f"{q}_sumsq" for q in Q_ALL]
+STAT_COLS = ["responses"] + COUNT_COLS + SUM_COLS + SUMSQ_COLS
+
+
+class SurveyCube:
+    def __init__(self, cells, dataset_id=None):
+        self.cells = cells
+        self.dataset_id = dataset_id
+        self._index = None
+
+    @classmethod
+    def from_survey(cls, survey_df, dataset_id=None):
+        grouped = survey_df.groupby(CELL_KEYS, observed=True, sort=True, dropna=False)
+        codes = grouped.ngroup().to_numpy()
+        cells = grouped.size().rename("responses").reset_index()
+        n_cells = len(cells)
+
+        values = survey_df[Q_ALL].to_numpy(dtype=np.float64)
+        valid = ~np.isnan(values)
+        values = np.where(valid, values, 0.0)
+
+        stats = {}
+        for j, q in enumerate(Q_ALL):
+            stats[f"{q}_n"] = np.bincount(codes, weights=valid[:, j], minlength=n_cells)
+            stats[f"{q}_sum"] = np.bincount(codes, weights=values[:, j], minlength=n_cells)
+            stats[f"{q}_sumsq"] = np.bincount(codes, weights=values[:, j] ** 2, minlength=n_cells)
+
+        cells = pd.concat([decategorize(cells, CELL_KEYS), pd.DataFrame(stats)], axis=1)
+        return cls(cells, dataset_id)
+
+    def __len__(self):
+        return len(self.cells)
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = DimensionIndex(self.cells, CELL_KEYS)
+        return self._index
+
+    @property
+    def nbytes(self):
+        return int(self.cells.memory_usage(deep=True).sum())
+
+    def options(self, column):
+        return self.index.options(column)
+
+    def select(self, filters):
+        return self.index.mask({column: filters.get(key) for key, column in FILTER_COLUMNS.items()})
+
+    def responses(self, filters=None):
+        cells = self.cells if filters is None else self.cells[self.select(filters)]
+        return int(cells["responses"].sum())
+
+    def group_stats(self, columns, filters=None):
+        # Group x month STAT_COLS for the given group columns
+        cells = self.cells if filters is None else self.cells[self.select(filters)]
+        return sum_stats(cells, columns)
+
+    def group_counts(self, columns, filters=None):
+        # Responses per group columns x month
+        cells = self.cells if filters is None else self.cells[self.select(filters)]
+        keys = list(columns) + ['month']
+        return cells.groupby(keys, sort=True, observed=True)['responses'].sum().reset_index()
+
+    def department_mix(self, agg_level, filters=None):
+        # Responses per group x department x month for levels that do not
+        # group by department (HR stress is projected through it); else None
+        columns = group_columns(agg_level)
+        if 'department' in columns:
+            return None
+        return self.group_counts(columns + ['department'], filters)
+
+    def level_stats(self, agg_levels, filters=None):
+        # {agg_level: group x month stats}, coarser levels rolled up from finer ones
+        stats = {}
+        for level in sorted(set(agg_levels), key=lambda lvl: -len(group_columns(lvl))):
+            columns = group_columns(level)
+            parents = [p for p in stats if set(group_columns(p)) >= set(columns)]
+            if parents:
+                stats[level] = sum_stats(stats[min(parents, key=lambda p: len(stats[p]))], columns)
+            else:
+                stats[level] = self.group_stats(columns, filters)
+        return stats
+
+    def aggregate(self, group_key, filters=None):
+        return aggregate_cells(self.group_stats([group_key], filters), group_key)
+
+    def tensor_stats(self, columns, filters=None):
+        # Dense (groups, months[, 18]) sums for the vectorized scoring kernel
+        columns = [columns] if isinstance(columns, str) else list(columns)
+        return dense_stats(self.group_stats(columns, filters), columns)
+
+    def tensor(self, columns, filters=None):
+        groups, months, counts, n, total, total_sq = self.tensor_stats(columns, filters)
+        means, stds = _moments(n, total, total_sq)
+        return groups, months, counts, means, stds
+
+    def compute_cri(self, hr_df, agg_level, filters=None, profile=DEFAULT_PROFILE):
+        with stage("aggregate", rows=len(self)):
+            groups, months, counts, means, stds = self.tensor(group_columns(agg_level), filters)
+            mix = self.department_mix(agg_level, filters)
+        return score_dense(means, stds, counts, groups, months, hr_df, agg_level, profile, mix)
+
+    def compute_cri_levels(self, hr_df, agg_levels, filters=None, profile=DEFAULT_PROFILE):
+        # {agg_level: results} for several levels from one pass over the cells.
+        # Levels without department get their department mix from the same
+        # rollup (the level with department added).
+        agg_levels = list(dict.fromkeys(agg_levels))
+        mix_levels = {level: _with_department(level) for level in agg_levels
+                      if 'department' not in group_columns(level)}
+        with stage("aggregate_levels", rows=len(self)):
+            stats = self.level_stats(agg_levels + list(mix_levels.values()), filters)
+        results = {}
+        for i, level in enumerate(agg_levels):
+            checkpoint(i / len(agg_levels), f"Scoring level {i + 1}/{len(agg_levels)}")
+            groups, months, counts, n, total, total_sq = dense_stats(stats[level], group_columns(level))
+            means, stds = _moments(n, total, total_sq)
+            mix = stats[mix_levels[level]] if level in mix_levels else None
+            results[level] = score_dense(means, stds, counts, groups, months, hr_df, level, profile, mix)
+        return results
+
+    def compute_cri_reference(self, hr_df, agg_level, filters=None, profile=DEFAULT_PROFILE):
+        agg_df = self.aggregate(GROUP_KEY_MAP[agg_level], filters)
+        return score_aggregates(agg_df, hr_df, agg_level, profile, self.department_mix(agg_level, filters))
+
+
+def _with_department(agg_level):
+    columns = set(group_columns(agg_level)) | {'department'}
+    return combine_levels([label for label, col in GROUP_KEY_MAP.items() if col in columns])
+
+
+def aggregate_cells(cells, group_key):
+    # Group x month means/stds from any frame of cell statistics (STAT_COLS)
+    sums = cells.groupby([group_key, 'month'], sort=True)[STAT_COLS].sum()
+
+    means, stds = _moments(
+        sums[COUNT_COLS].to_numpy(), sums[SUM_COLS].to_numpy(), sums[SUMSQ_COLS].to_numpy()
+    )
+
+    agg_df = pd.concat([
+        pd.DataFrame(means, index=sums.index, columns=[f"{q}_mean" for q in Q_ALL]),
+        pd.DataFrame(stds, index=sums.index, columns=[f"{q}_std" for q in Q_ALL]),
+        sums["responses"].astype(np.int64),
+    ], axis=1)
+    return agg_df.reset_index()
+
+
+def sum_stats(cells, columns):
+    # Sums STAT_COLS over group columns x month; cells can be raw cube cells
+    # or the stats of any finer level
+    return cells.groupby(list(columns) + ['month'], sort=True, observed=True)[STAT_COLS].sum().reset_index()
+
+
+def _factorize_groups(cells, columns):
+    # Group codes and a named Index (MultiIndex for combined levels) of groups
+    if not columns:
+        return np.zeros(len(cells), dtype=np.int64), pd.Index([ORG_LEVEL])
+    if len(columns) == 1:
+        g, groups = pd.factorize(cells[columns[0]], sort=True)
+        return g, pd.Index(groups, name=columns[0])
+    g, groups = pd.factorize(pd.MultiIndex.from_frame(cells[columns]), sort=True)
+    return g, groups.set_names(columns)
+
+
+def dense_stats(cells, columns):
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    g, groups = _factorize_groups(cells, columns)
+    m, months = pd.factorize(cells['month'], sort=True)
+    shape = (len(groups), len(months))
+    flat = g * shape[1] + m
+    size = shape[0] * shape[1]
+
+    def _sum(columns):
+        values = cells[columns].to_numpy(dtype=np.float64)
+        out = np.empty((size, len(columns)))
+        for j in range(len(columns)):
+            out[:, j] = np.bincount(flat, weights=values[:, j], minlength=size)
+        return out.reshape(shape + (len(columns),))
+
+    counts = np.bincount(flat, weights=cells['responses'].to_numpy(dtype=np.float64), minlength=size)
+    counts = counts.reshape(shape).astype(np.int64)
+    return groups, list(months), counts, _sum(COUNT_COLS), _sum(SUM_COLS), _sum(SUMSQ_COLS)
+
+
+def _moments(n, total, total_sq):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(n > 0, total / n, np.nan)
+        var = (total_sq - total * means) / (n - 1)
+        stds = np.where(n > 1, np.sqrt(np.clip(var, 0, None)), np.nan)
+    return means, stds
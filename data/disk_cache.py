@@ -0,0 +1,166 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - the cache is simply disabled
+    pa = None
+    feather = None
+
+from data.cache import fingerprint
+from data.cube import SurveyCube
+from data.engine import DataValidationError, load_inputs
+from data.ingest import DEFAULT_CHUNKSIZE, load_inputs_streaming
+
+# On-disk cache of validated uploads, keyed by content fingerprint. Frames are
+# stored as uncompressed Arrow IPC files so later runs memory-map them instead
+# of re-parsing CSV text (and re-running timestamp inference). load()
+# converts only the HR table and the cube cells; the survey table, which the
+# dashboard rarely touches, is returned as a loader that maps it on first use.
+
+DEFAULT_CACHE_DIR = ".cri_cache"
+# Bump whenever parsing or validation changes what gets stored (2: one
+# slash-date order per column), so older entries are re-parsed
+FORMAT_VERSION = 2
+
+logger = logging.getLogger("cri.cache")
+
+_TABLES = ("survey", "hr", "cube")
+
+
+def available():
+    return pa is not None
+
+
+class DiskCache:
+    def __init__(self, root=None):
+        if not available():
+            raise RuntimeError("pyarrow is required for the on-disk dataset cache")
+        self.root = root or os.environ.get("CRI_CACHE_DIR", DEFAULT_CACHE_DIR)
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, dataset_id):
+        return os.path.join(self.root, dataset_id)
+
+    def __contains__(self, dataset_id):
+        return os.path.exists(os.path.join(self._path(dataset_id), "meta.json"))
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.root) if name in self)
+
+    def save(self, dataset_id, survey, hr, cube, warnings, report=None):
+        # True once the entry is on disk. Caching is optional, so a frame
+        # Arrow cannot store or a full disk is logged and skipped.
+        try:
+            tmp = tempfile.mkdtemp(prefix=f".{dataset_id}.", dir=self.root)
+        except OSError as e:
+            logger.warning("Not caching %s: %s", dataset_id, e)
+            return False
+        try:
+            for name, df in zip(_TABLES, (survey, hr, cube.cells)):
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                feather.write_feather(table, os.path.join(tmp, f"{name}.arrow"), compression="uncompressed")
+            meta = {
+                "version": FORMAT_VERSION,
+                "dataset_id": dataset_id,
+                "created": time.time(),
+                "warnings": warnings,
+                "report": report,
+            }
+            with open(os.path.join(tmp, "meta.json"), "w") as f:
+                json.dump(meta, f)
+            # Atomic publish: readers never see a half-written entry
+            os.replace(tmp, self._path(dataset_id))
+        except Exception as e:
+            shutil.rmtree(tmp, ignore_errors=True)
+            if dataset_id not in self:  # else another writer published it first
+                logger.warning("Not caching %s: %s: %s", dataset_id, type(e).__name__, e)
+                return False
+        return True
+
+    def load(self, dataset_id):
+        path = self._path(dataset_id)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            return None
+
+        hr = _read_frame(path, "hr")
+        cube = SurveyCube(_read_frame(path, "cube"), dataset_id=dataset_id)
+        return lambda: _read_frame(path, "survey"), hr, cube, meta["warnings"], meta["report"]
+
+    def remove(self, dataset_id):
+        shutil.rmtree(self._path(dataset_id), ignore_errors=True)
+
+    def clear(self):
+        for dataset_id in self.entries():
+            self.remove(dataset_id)
+
+
+def _read_frame(path, name):
+    table = feather.read_table(os.path.join(path, f"{name}.arrow"), memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+
+def warm(cache, survey_path, hr_path, chunksize=None):
+    dataset_id = fingerprint(survey_path, hr_path)
+    if dataset_id in cache:
+        return dataset_id, False
+
+    if chunksize:
+        survey, hr, warnings, report = load_inputs_streaming(survey_path, hr_path, chunksize=chunksize)
+    else:
+        survey, hr, warnings, report = load_inputs(survey_path, hr_path)
+    cube = SurveyCube.from_survey(survey, dataset_id=dataset_id)
+    return dataset_id, cache.save(dataset_id, survey, hr, cube, warnings, report)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m data.disk_cache",
+        description="Manage the on-disk cache of parsed survey/HR uploads.",
+    )
+    parser.add_argument("--cache-dir", default=None, help=f"cache directory (default: $CRI_CACHE_DIR or {DEFAULT_CACHE_DIR})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    warm_cmd = sub.add_parser("warm", help="parse a survey/HR CSV pair and store it in the cache")
+    warm_cmd.add_argument("survey_csv")
+    warm_cmd.add_argument("hr_csv")
+    warm_cmd.add_argument("--stream", action="store_true", help=f"stream the survey in chunks of {DEFAULT_CHUNKSIZE:,} rows")
+
+    sub.add_parser("list", help="list cached dataset fingerprints")
+    sub.add_parser("clear", help="remove every cached dataset")
+
+    args = parser.parse_args(argv)
+    cache = DiskCache(args.cache_dir)
+
+    if args.command == "warm":
+        start = time.perf_counter()
+        try:
+            dataset_id, created = warm(cache, args.survey_csv, args.hr_csv,
+                                       chunksize=DEFAULT_CHUNKSIZE if args.stream else None)
+        except DataValidationError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        if dataset_id not in cache:
+            print(f"error: could not write the cache entry for {dataset_id} (see log)", file=sys.stderr)
+            return 1
+        state = "cached" if created else "already cached"
+        print(f"{dataset_id} {state} ({time.perf_counter() - start:.2f}s)")
+    elif args.command == "list":
+        for dataset_id in cache.entries():
+            print(dataset_id)
+    elif args.command == "clear":
+        cache.clear()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+import numpy as np
+import pandas as pd
+
+from data.instrument import stage
+from data.scoring import DEFAULT_PROFILE, RISK_LEVELS
+from data.timestamps import derive_month, describe_formats, is_mixed, parse_timestamps
+
+# Headless CRI engine: no Streamlit imports here, so batch jobs, schedulers and
+# benchmarks can run the same math the dashboard shows.
+
+Q_ALL = [f"q{i}" for i in range(1, 19)]
+Q_TRUST = ['q1', 'q2', 'q3', 'q4', 'q5', 'q15', 'q16', 'q17', 'q18']
+Q_COMM = ['q6', 'q7', 'q8', 'q9', 'q10']
+Q_CHANGE = ['q11', 'q12', 'q13', 'q14']
+
+DIMENSIONS = ['department', 'role_level', 'location']
+GROUP_KEY_MAP = {
+    "Department": "department",
+    "Role Level": "role_level",
+    "Location": "location"
+}
+
+# Aggregation levels beyond GROUP_KEY_MAP: the whole organization (no group
+# columns) and combinations of dimensions such as "Department × Location"
+ORG_LEVEL = "Organization"
+LEVEL_SEPARATOR = " × "
+GROUP_LABEL_SEPARATOR = " / "
+
+# Sidebar filter keys and the survey column each one selects on
+FILTER_COLUMNS = {
+    "months": "month",
+    "departments": "department",
+    "roles": "role_level",
+    "locations": "location"
+}
+
+HR_METRICS = ['attrition_rate', 'absenteeism_rate', 'sick_days_avg', 'grievances_count', 'manager_escalations']
+
+COMPONENTS = ["vol_score", "trust_score", "comm_score", "hr_score", "change_score"]
+RESULT_COLUMNS = ["group", "month", "responses", "CRI", "risk_level"] + COMPONENTS
+
+
+class DataValidationError(ValueError):
+    pass
+
+
+def group_columns(agg_level):
+    # Survey columns an aggregation level groups by, in display order
+    if agg_level == ORG_LEVEL:
+        return []
+    return [GROUP_KEY_MAP[part] for part in agg_level.split(LEVEL_SEPARATOR)]
+
+
+def combine_levels(labels):
+    # ["Department", "Location"] -> "Department × Location"; [] -> the organization
+    return LEVEL_SEPARATOR.join(labels) if labels else ORG_LEVEL
+
+
+def drill_levels(agg_level):
+    # {dimension label: the level that breaks agg_level down by it}, in
+    # GROUP_KEY_MAP order; the first is where the drill-down opens
+    columns = group_columns(agg_level)
+    return {
+        by: combine_levels([label for label, col in GROUP_KEY_MAP.items() if col in columns or label == by])
+        for by, col in GROUP_KEY_MAP.items() if col not in columns
+    }
+
+
+def level_slug(agg_level):
+    # File-name form of a level: department, department_x_location, organization
+    return "_x_".join(group_columns(agg_level)) or "organization"
+
+
+def read_inputs(survey_src, hr_src):
+    try:
+        survey = pd.read_csv(survey_src)
+        hr = pd.read_csv(hr_src)
+    except Exception as e:
+        raise DataValidationError(f"Error reading CSV files: {e}") from e
+    return survey, hr
+
+
+def validate_survey(survey, slash_order=None):
+    # slash_order: the column's MM/DD vs DD/MM order when survey is only part
+    # of it (see data.timestamps.parse_timestamps)
+    warnings = []
+
+    missing_survey = [col for col in DIMENSIONS + Q_ALL if col not in survey.columns]
+    if missing_survey:
+        raise DataValidationError(f"Survey CSV is missing required columns: {', '.join(missing_survey)}")
+
+    if 'timestamp' not in survey.columns:
+        raise DataValidationError("Survey CSV is missing 'timestamp' column.")
+
+    survey['timestamp'], timestamp_formats = parse_timestamps(survey['timestamp'], order=slash_order)
+    if survey['timestamp'].isna().all():
+        raise DataValidationError("All timestamps are invalid. Please use format like YYYY-MM-DD or MM/DD/YYYY.")
+    warnings.extend(timestamp_warnings(timestamp_formats))
+
+    survey['month'] = derive_month(survey['timestamp'])
+
+    # Convert q1-q18 to numeric, coerce errors
+    survey[Q_ALL] = survey[Q_ALL].apply(pd.to_numeric, errors='coerce')
+
+    invalid_rows = (survey[Q_ALL].isna().sum(axis=1) > 0).sum()
+    if invalid_rows > 0:
+        warnings.append(f"{invalid_rows} survey rows contain non-numeric scores (converted to NaN). "
+                        f"Check your data for text in question columns.")
+
+    invalid_responses = survey[Q_ALL].isna().all(axis=1).sum()
+    if invalid_responses > 0:
+        warnings.append(f"{invalid_responses} survey rows have no valid scores and will be ignored.")
+
+    rows_read = len(survey)
+    survey = survey.dropna(subset=Q_ALL, how='all')  # Drop completely empty responses
+    report = {
+        "rows_read": rows_read,
+        "rows_kept": len(survey),
+        "timestamp_formats": timestamp_formats,
+    }
+    return survey, warnings, report
+
+
+def timestamp_warnings(timestamp_formats):
+    warnings = []
+    if is_mixed(timestamp_formats):
+        warnings.append(f"Survey timestamps use mixed formats: {describe_formats(timestamp_formats)}.")
+    invalid = timestamp_formats.get("invalid", 0)
+    if invalid:
+        warnings.append(f"{invalid} survey rows have missing or unparseable timestamps.")
+    return warnings
+
+
+def validate_hr(hr):
+    missing_hr = [col for col in ['department', 'month'] + HR_METRICS if col not in hr.columns]
+    if missing_hr:
+        raise DataValidationError(f"HR Metrics CSV is missing required columns: {', '.join(missing_hr)}")
+
+    hr['month'] = hr['month'].astype(str)
+
+    for col in HR_METRICS:
+        hr[col] = pd.to_numeric(hr[col], errors='coerce').fillna(0)
+    return hr
+
+
+def load_inputs(survey_src, hr_src):
+    with stage("read_csv") as s:
+        survey, hr = read_inputs(survey_src, hr_src)
+        if s:
+            s.rows = len(survey) + len(hr)
+    with stage("validate_survey", rows=len(survey)):
+        survey, warnings, report = validate_survey(survey)
+    with stage("validate_hr", rows=len(hr)):
+        hr = validate_hr(hr)
+    return survey, hr, warnings, report
+
+
+def aggregate_survey(survey_df, group_key):
+    grouped = survey_df.groupby([group_key, 'month'], observed=True)
+
+    means = grouped[Q_ALL].mean()
+    stds = grouped[Q_ALL].std()
+    counts = grouped.size().rename("responses")
+
+    agg_df = pd.concat([means.add_suffix('_mean'), stds.add_suffix('_std'), counts], axis=1)
+    agg_df = agg_df.reset_index()
+
+    return decategorize(agg_df, [group_key, 'month'])
+
+
+def decategorize(df, columns):
+    # Compact (streamed) surveys carry categorical keys; results use plain labels
+    for col in columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(df[col].cat.categories.dtype)
+    return df
+
+
+def risk_level(cri, profile=DEFAULT_PROFILE):
+    return profile.risk_level(cri)
+
+
+def score_aggregates(agg_df, hr_df, agg_level, profile=DEFAULT_PROFILE, mix=None):
+    # mix: responses per group x department x month; role / location levels
+    # use it to weight their departments' HR stress (org average without it)
+    group_key = GROUP_KEY_MAP[agg_level]
+    agg_df = agg_df.copy()
+
+    # 1. Volatility
+    agg_df["volatility_raw"] = agg_df[[f"{q}_std" for q in Q_ALL]].mean(axis=1)
+    agg_df["vol_score"] = np.clip((agg_df["volatility_raw"] - profile.vol_floor) / profile.vol_span * 100, 0, 100)
+
+    # 2. Trust Decline (MoM per group)
+    agg_df["trust_mean"] = agg_df[[f"{q}_mean" for q in Q_TRUST]].mean(axis=1)
+    agg_df = agg_df.sort_values([group_key, 'month'])
+    agg_df["trust_delta"] = agg_df.groupby(group_key)["trust_mean"].diff()
+    agg_df["trust_decline"] = (-agg_df["trust_delta"].clip(upper=0)).fillna(0)  # positive = decline
+    agg_df["trust_score"] = np.clip(agg_df["trust_decline"] * profile.trust_scale, 0, 100)
+
+    # 3. Communication Strain
+    agg_df["comm_mean"] = agg_df[[f"{q}_mean" for q in Q_COMM]].mean(axis=1)
+    agg_df["comm_std"] = agg_df[[f"{q}_std" for q in Q_COMM]].mean(axis=1)
+    agg_df["comm_raw"] = (5 - agg_df["comm_mean"]) * agg_df["comm_std"]
+    # Use fixed scale: max reasonable = (5-1)*2 = 8
+    agg_df["comm_score"] = np.clip(agg_df["comm_raw"] / profile.comm_max * 100, 0, 100)
+
+    # 4. HR Stress
+    full_df = agg_df.copy()
+
+    # Fill with org-wide averages; an absent metric contributes 0 (the baseline)
+    metrics = [col for col in HR_METRICS if col in hr_df.columns]
+    org_means = hr_df[metrics].mean()
+    org_stds = hr_df[metrics].std()
+    hr_z = hr_df[['department', 'month']].copy()
+    for col in metrics:
+        hr_z[col] = hr_df[col].fillna(org_means[col])
+
+    # Z-scores
+    hr_z["hr_raw"] = 0.0
+    for col in metrics:
+        z = (hr_z[col] - org_means[col]) / (org_stds[col] + 1e-6)
+        hr_z["hr_raw"] += z / len(HR_METRICS)
+    hr_z = hr_z[['department', 'month', 'hr_raw']]
+
+    def _attach(df, keys, values):
+        # No matching HR row scores as the org average (hr_raw 0)
+        df = pd.merge(df, values, on=keys, how='left', indicator=True)
+        df["hr_raw"] = df["hr_raw"].where(df.pop("_merge") == "both", 0.0)
+        return df
+
+    if agg_level == "Department":
+        full_df = _attach(full_df, ['department', 'month'], hr_z)
+    elif mix is not None:
+        # Response-weighted mix of the departments in each group and month
+        mix = _attach(mix, ['department', 'month'], hr_z)
+        mix["weighted"] = mix["responses"] * mix["hr_raw"]
+        grouped = mix.groupby([group_key, 'month'])
+        sums = grouped[["weighted", "responses"]].sum()
+        undefined = grouped["weighted"].apply(lambda w: w.isna().any())  # NaN propagates like the kernel
+        projected = (sums["weighted"] / sums["responses"]).mask(undefined).rename("hr_raw").reset_index()
+        full_df = _attach(full_df, [group_key, 'month'], projected)
+    else:
+        full_df["hr_raw"] = 0.0
+    full_df["hr_score"] = np.clip(full_df["hr_raw"] * profile.hr_scale, 0, 100)  # since avg z=0 → 0, +2 → 100
+
+    # 5. Change Exposure
+    full_df["change_mean"] = full_df[[f"{q}_mean" for q in Q_CHANGE]].mean(axis=1)
+    full_df["change_score"] = np.clip((full_df["change_mean"] - profile.change_floor) / profile.change_span * 100, 0, 100)
+
+    # Final CRI
+    w_vol, w_trust, w_comm, w_hr, w_change = profile.weights
+    full_df["CRI"] = (
+        full_df["vol_score"] * w_vol +
+        full_df["trust_score"] * w_trust +
+        full_df["comm_score"] * w_comm +
+        full_df["hr_score"] * w_hr +
+        full_df["change_score"] * w_change
+    ).round(1)
+
+    full_df["risk_level"] = RISK_LEVELS[profile.band(full_df["CRI"].to_numpy())]
+    full_df["group"] = full_df[group_key]
+
+    return full_df[[group_key] + RESULT_COLUMNS]
+
+
+def compute_cri(survey_df, hr_df, agg_level, profile=DEFAULT_PROFILE):
+    group_key = GROUP_KEY_MAP[agg_level]
+    agg_df = aggregate_survey(survey_df, group_key)
+    mix = None
+    if group_key != 'department':
+        mix = survey_df.groupby([group_key, 'department', 'month'], observed=True).size().rename("responses")
+        mix = decategorize(mix.reset_index(), [group_key, 'department', 'month'])
+    return score_aggregates(agg_df, hr_df, agg_level, profile, mix)
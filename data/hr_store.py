@@ -0,0 +1,111 @@
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from data.engine import HR_METRICS
+
+# Indexed HR metrics, built once per HR frame. Rows are pivoted into a dense
+# (department, month) grid holding the composite HR z-score (hr_raw) against
+# the org-wide baselines, so scoring gathers by index instead of merging and
+# re-deriving means / stds on every call. A (department, month) without an HR
+# row scores 0, i.e. the org baseline.
+#
+# Levels that group by department read their department's row. Role, location
+# and organization groups take the response-weighted mix of the departments
+# their respondents belong to for that month (project()).
+
+
+class HRStore:
+    def __init__(self, hr_df):
+        self.org_means = np.array([hr_df[col].mean() if col in hr_df.columns else np.nan
+                                   for col in HR_METRICS], dtype=np.float64)
+        self.org_stds = np.array([hr_df[col].std() if col in hr_df.columns else np.nan
+                                  for col in HR_METRICS], dtype=np.float64)
+
+        has_keys = 'department' in hr_df.columns and 'month' in hr_df.columns
+        d, self.departments = pd.factorize(hr_df['department'] if has_keys else pd.Series([], dtype=object), sort=True)
+        m, self.months = pd.factorize(hr_df['month'] if has_keys else pd.Series([], dtype=object), sort=True)
+        ok = (d >= 0) & (m >= 0)
+
+        values = np.full((len(self.departments), len(self.months), len(HR_METRICS)), np.nan)
+        for j, col in enumerate(HR_METRICS):
+            if col in hr_df.columns:
+                values[d[ok], m[ok], j] = hr_df[col].to_numpy(dtype=np.float64)[ok]
+
+        # Same arithmetic as the pandas reference, so scores agree exactly; an
+        # absent metric column contributes 0 (the org baseline)
+        filled = np.where(np.isnan(values), self.org_means, values)
+        z = np.zeros(values.shape[:-1])
+        for j, col in enumerate(HR_METRICS):
+            if col not in hr_df.columns:
+                continue
+            z = z + (filled[..., j] - self.org_means[j]) / (self.org_stds[j] + 1e-6) / len(HR_METRICS)
+        self.z = z
+        self.rows = len(hr_df)
+
+    @property
+    def nbytes(self):
+        return int(self.z.nbytes + self.departments.nbytes + self.months.nbytes)
+
+    def _codes(self, departments, months):
+        return self.departments.get_indexer(departments), self.months.get_indexer(months)
+
+    def lookup(self, departments, months):
+        # (len(departments), len(months)) grid of hr_raw
+        d, m = self._codes(departments, months)
+        out = self.z[np.clip(d, 0, None)][:, np.clip(m, 0, None)] if self.z.size else np.zeros((len(d), len(m)))
+        out[d < 0, :] = 0.0
+        out[:, m < 0] = 0.0
+        return out
+
+    def at(self, departments, months):
+        # hr_raw per (department, month) pair
+        d, m = self._codes(departments, months)
+        ok = (d >= 0) & (m >= 0)
+        out = np.zeros(len(d))
+        out[ok] = self.z[d[ok], m[ok]]
+        return out
+
+    def project(self, mix, groups, months, columns):
+        # mix: responses per group columns x department x month; returns the
+        # (groups, months) response-weighted mean of the departments' hr_raw
+        if not columns:
+            g = np.zeros(len(mix), dtype=np.int64)
+        elif len(columns) == 1:
+            g = groups.get_indexer(mix[columns[0]])
+        else:
+            g = groups.get_indexer(pd.MultiIndex.from_frame(mix[columns]))
+        m = pd.Index(months).get_indexer(mix['month'])
+        ok = (g >= 0) & (m >= 0)
+
+        shape = (len(groups), len(months))
+        flat = g[ok] * shape[1] + m[ok]
+        weights = mix['responses'].to_numpy(dtype=np.float64)[ok]
+        z = self.at(mix['department'].to_numpy()[ok], mix['month'].to_numpy()[ok])
+        total = np.bincount(flat, weights=weights * z, minlength=shape[0] * shape[1])
+        responses = np.bincount(flat, weights=weights, minlength=shape[0] * shape[1])
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(responses > 0, total / responses, 0.0).reshape(shape)
+
+
+_stores = {}
+_lock = threading.Lock()
+
+
+def hr_store(hr):
+    # The HRStore for an HR frame, built on first use and kept while the frame
+    # lives (datasets build theirs at load time). Stores pass through.
+    if isinstance(hr, HRStore):
+        return hr
+    key = id(hr)
+    with _lock:
+        entry = _stores.get(key)
+        if entry is not None and entry[0]() is hr:
+            return entry[1]
+    store = HRStore(hr)
+    with _lock:
+        _stores[key] = (weakref.ref(hr), store)
+    weakref.finalize(hr, _stores.pop, key, None)
+    return store
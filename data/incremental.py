@@ -0,0 +1,262 @@
+import argparse
+import os
+import sys
+import time
+import uuid
+
+import pandas as pd
+
+from data.cube import CELL_KEYS, STAT_COLS, SurveyCube
+from data.engine import (
+    GROUP_KEY_MAP,
+    DataValidationError,
+    load_inputs,
+    score_aggregates,
+    validate_hr,
+    validate_survey,
+)
+from data.trends import TrendState
+
+# Incremental monthly append mode. The running state keeps the cube cells plus,
+# per aggregation level, the unfiltered group×month aggregates and scores.
+# Appending a month folds the new rows into the cube (O(new rows)), rebuilds
+# aggregates only for the months that received data, and rescoring touches
+# those rows plus each group's next row, whose trust delta depends on them.
+# Trend / anomaly state (data.trends) is carried forward month by month when
+# only months after the last one were rescored, and replayed otherwise.
+#
+#     python -m data.incremental init  STATE_DIR survey.csv hr.csv
+#     python -m data.incremental append STATE_DIR new_survey.csv [new_hr.csv]
+
+STATE_FILE = "state.pkl"
+STATE_VERSION = 3
+
+
+def fold_cells(cube, survey_new):
+    # (cube with survey_new's rows folded in, months that received rows).
+    # Cells that already exist (late responses) are summed; O(new rows + cells).
+    new_cells = SurveyCube.from_survey(survey_new).cells
+    affected = set(new_cells['month'].unique())
+    cells = pd.concat([cube.cells, new_cells], ignore_index=True)
+    overlap = cells.duplicated(CELL_KEYS, keep=False)
+    if overlap.any():
+        merged = cells[overlap].groupby(CELL_KEYS, sort=False, dropna=False)[STAT_COLS].sum().reset_index()
+        cells = pd.concat([cells[~overlap], merged], ignore_index=True)
+    return SurveyCube(cells.sort_values(CELL_KEYS, ignore_index=True)), affected
+
+
+def _rows_to_rescore(agg_df, group_key, affected):
+    # Rows whose scores change: rows in an affected month, plus each group's
+    # next row (its trust delta is taken against the affected row). Context
+    # rows are the previous row of every rescored row.
+    months = agg_df.groupby(group_key, sort=False)['month']
+    dependent = agg_df['month'].isin(affected) | months.shift(1).isin(affected)
+    context = ~dependent & dependent.groupby(agg_df[group_key], sort=False).shift(-1, fill_value=False)
+    return dependent, context
+
+
+class IncrementalPipeline:
+    def __init__(self, cube, hr, aggregates, results, version=0, state_id=None, trends=None):
+        self.state_id = state_id or uuid.uuid4().hex
+        self.cube = cube
+        self.hr = hr
+        self.aggregates = aggregates
+        self.results = results
+        self.version = version
+        # agg_level -> (TrendState, trend rows)
+        self.trends = trends if trends is not None else {
+            agg_level: TrendState.from_results(frame) for agg_level, frame in results.items()
+        }
+
+    @classmethod
+    def from_frames(cls, survey, hr):
+        cube = SurveyCube.from_survey(survey)
+        pipeline = cls(cube, hr, {}, {})
+        for agg_level, group_key in GROUP_KEY_MAP.items():
+            pipeline.aggregates[agg_level] = cube.aggregate(group_key)
+            pipeline.results[agg_level] = score_aggregates(pipeline.aggregates[agg_level], hr, agg_level,
+                                                           mix=cube.department_mix(agg_level))
+            pipeline.trends[agg_level] = TrendState.from_results(pipeline.results[agg_level])
+        pipeline._stamp()
+        return pipeline
+
+    @classmethod
+    def from_csv(cls, survey_src, hr_src):
+        survey, hr, warnings, report = load_inputs(survey_src, hr_src)
+        return cls.from_frames(survey, hr), warnings
+
+    @property
+    def months(self):
+        return self.cube.options('month')
+
+    def _stamp(self):
+        self.cube.dataset_id = f"{self.state_id}:{self.version}"
+
+    def append(self, survey_new, hr_new=None, replace_hr=False):
+        # hr_new: HR rows to merge in (latest wins per department and month),
+        # or with replace_hr the complete new HR table
+        start = time.perf_counter()
+        self.cube, affected = fold_cells(self.cube, survey_new)
+
+        hr_changed = hr_new is not None and (replace_hr or len(hr_new) > 0)
+        if hr_changed and replace_hr:
+            self.hr = hr_new
+        elif hr_changed:
+            hr = pd.concat([self.hr, hr_new], ignore_index=True)
+            self.hr = hr.drop_duplicates(['department', 'month'], keep='last', ignore_index=True)
+
+        rescored = set()
+        anomalies = 0
+        for agg_level, group_key in GROUP_KEY_MAP.items():
+            fresh = self.cube.aggregate(group_key, {"months": sorted(affected)})
+            agg_df = self.aggregates[agg_level]
+            agg_df = pd.concat([agg_df[~agg_df['month'].isin(affected)], fresh], ignore_index=True)
+            agg_df = agg_df.sort_values([group_key, 'month'], ignore_index=True)
+            self.aggregates[agg_level] = agg_df
+
+            if hr_changed:
+                # The org-wide HR baseline moved, so every stored row is rescored
+                # (O(group-months); raw survey rows are still never revisited).
+                self.results[agg_level] = score_aggregates(agg_df, self.hr, agg_level,
+                                                           mix=self.cube.department_mix(agg_level))
+                rescored.update(agg_df['month'])
+                anomalies += self._update_trends(agg_level, set(agg_df['month']), affected)
+                continue
+
+            dependent, context = _rows_to_rescore(agg_df, group_key, affected)
+            subset = agg_df[dependent | context]
+            mix = self.cube.department_mix(agg_level, {"months": sorted(subset['month'].unique())})
+            scored = score_aggregates(subset, self.hr, agg_level, mix=mix)
+            dependent_keys = pd.MultiIndex.from_frame(agg_df.loc[dependent, [group_key, 'month']])
+            scored = scored[pd.MultiIndex.from_frame(scored[[group_key, 'month']]).isin(dependent_keys)]
+
+            kept = self.results[agg_level]
+            kept = kept[~pd.MultiIndex.from_frame(kept[[group_key, 'month']]).isin(dependent_keys)]
+            self.results[agg_level] = pd.concat([kept, scored]).sort_values([group_key, 'month'], ignore_index=True)
+            rescored.update(scored['month'])
+            anomalies += self._update_trends(agg_level, set(scored['month']), affected)
+
+        self.version += 1
+        self._stamp()
+        return {
+            "rows": len(survey_new),
+            "months": sorted(affected),
+            "rescored_months": sorted(rescored),
+            "anomalies": anomalies,
+            "seconds": time.perf_counter() - start,
+        }
+
+    def _update_trends(self, agg_level, rescored, affected):
+        # Returns how many groups are flagged in the appended months
+        state, rows = self.trends[agg_level]
+        if not rescored:
+            return 0
+        if state.month is not None and min(rescored) > state.month:
+            rows = pd.concat([rows, state.extend(self.results[agg_level])], ignore_index=True)
+        else:
+            state, rows = TrendState.from_results(self.results[agg_level], state.settings)
+        self.trends[agg_level] = (state, rows)
+        return int((rows['anomaly'] & rows['month'].isin(affected)).sum())
+
+    def trend_rows(self, agg_level):
+        return self.trends[agg_level][1]
+
+    def append_csv(self, survey_src, hr_src=None):
+        try:
+            survey = pd.read_csv(survey_src)
+            hr = pd.read_csv(hr_src) if hr_src is not None else None
+        except Exception as e:
+            raise DataValidationError(f"Error reading CSV files: {e}") from e
+        survey, warnings, _ = validate_survey(survey)
+        if hr is not None:
+            hr = validate_hr(hr)
+        return self.append(survey, hr), warnings
+
+    def compute_cri(self, agg_level, filters=None):
+        if filters is None:
+            return self.results[agg_level]
+        return self.cube.compute_cri(self.hr, agg_level, filters)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        state = {
+            "version": STATE_VERSION,
+            "state_id": self.state_id,
+            "pipeline_version": self.version,
+            "cells": self.cube.cells,
+            "hr": self.hr,
+            "aggregates": self.aggregates,
+            "results": self.results,
+            "trends": self.trends,
+        }
+        path = os.path.join(directory, STATE_FILE)
+        tmp = path + ".tmp"
+        pd.to_pickle(state, tmp)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, directory):
+        state = pd.read_pickle(os.path.join(directory, STATE_FILE))
+        if state.get("version") != STATE_VERSION:
+            raise DataValidationError(f"Unsupported incremental state version in {directory}")
+        pipeline = cls(SurveyCube(state["cells"]), state["hr"], state["aggregates"],
+                       state["results"], state["pipeline_version"], state["state_id"], state["trends"])
+        pipeline._stamp()
+        return pipeline
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m data.incremental",
+        description="Maintain a persisted CRI state that is updated one month at a time.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    init_cmd = sub.add_parser("init", help="build the state from a full survey/HR history")
+    init_cmd.add_argument("state_dir")
+    init_cmd.add_argument("survey_csv")
+    init_cmd.add_argument("hr_csv")
+
+    append_cmd = sub.add_parser("append", help="fold a new month of survey (and HR) rows into the state")
+    append_cmd.add_argument("state_dir")
+    append_cmd.add_argument("survey_csv")
+    append_cmd.add_argument("hr_csv", nargs="?")
+
+    export_cmd = sub.add_parser("export", help="write the current results for one aggregation level as CSV")
+    export_cmd.add_argument("state_dir")
+    export_cmd.add_argument("output_csv")
+    export_cmd.add_argument("--agg-level", default="Department", choices=list(GROUP_KEY_MAP))
+    export_cmd.add_argument("--trends", action="store_true", help="add trend and anomaly columns")
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "init":
+            pipeline, warnings = IncrementalPipeline.from_csv(args.survey_csv, args.hr_csv)
+            pipeline.save(args.state_dir)
+            summary = f"initialised with months {pipeline.months[0]}..{pipeline.months[-1]}"
+        elif args.command == "append":
+            pipeline = IncrementalPipeline.load(args.state_dir)
+            report, warnings = pipeline.append_csv(args.survey_csv, args.hr_csv)
+            pipeline.save(args.state_dir)
+            summary = (f"appended {report['rows']:,} rows for {', '.join(report['months'])}; "
+                       f"rescored {len(report['rescored_months'])} month(s) in {report['seconds']:.2f}s; "
+                       f"{report['anomalies']} anomal{'y' if report['anomalies'] == 1 else 'ies'} flagged")
+        else:
+            pipeline = IncrementalPipeline.load(args.state_dir)
+            results = pipeline.compute_cri(args.agg_level)
+            if args.trends:
+                results = results.merge(pipeline.trend_rows(args.agg_level), on=["group", "month"], how="left")
+            results.to_csv(args.output_csv, index=False)
+            warnings, summary = [], f"wrote {args.output_csv}"
+    except DataValidationError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    for message in warnings:
+        print(f"warning: {message}", file=sys.stderr)
+    print(summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
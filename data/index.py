@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+# Per-dataset inverted index over the filter dimensions, built once per frame.
+# Each column is factorized into sorted labels and integer codes. Low
+# cardinality columns additionally keep one packed row bitmap per value, so a
+# filter is an OR over the selected (or unselected) bitmaps and the four
+# dimensions are ANDed in packed form. High cardinality columns keep
+# sorted-code posting lists instead and choose between a posting gather and
+# a code lookup-table per query, whichever touches fewer bytes.
+
+DEFAULT_BITMAP_BUDGET = 64 * 1024 * 1024
+MAX_BITMAP_VALUES = 256
+
+
+def _code_dtype(n_values):
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_values < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+class DimensionIndex:
+    def __init__(self, frame, columns, bitmap_budget=DEFAULT_BITMAP_BUDGET):
+        self.n_rows = len(frame)
+        self.columns = list(columns)
+        self._levels = {}
+        self._codes = {}
+        self._has_missing = {}
+        self._bitmaps = {}
+        self._postings = {}
+
+        bitmap_bytes = 0
+        row_bytes = (self.n_rows + 7) // 8
+        for col in self.columns:
+            codes, levels = pd.factorize(frame[col])
+            # Sort labels (categorical columns factorize in category order)
+            levels = pd.Index(np.asarray(levels))
+            order = levels.argsort()
+            rank = np.empty(len(order) + 1, dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            rank[-1] = -1
+            levels = levels[order]
+            codes = rank[codes].astype(_code_dtype(len(levels)))
+            self._levels[col] = levels
+            self._codes[col] = codes
+            self._has_missing[col] = bool((codes < 0).any())
+
+            cost = len(levels) * row_bytes
+            if len(levels) <= MAX_BITMAP_VALUES and bitmap_bytes + cost <= bitmap_budget:
+                self._bitmaps[col] = np.stack([np.packbits(codes == v) for v in range(len(levels))]) \
+                    if len(levels) else np.zeros((0, row_bytes), dtype=np.uint8)
+                bitmap_bytes += cost
+            else:
+                order = np.argsort(codes, kind='stable')
+                offsets = np.searchsorted(codes[order], np.arange(len(levels) + 1))
+                self._postings[col] = (order, offsets)
+
+    @property
+    def nbytes(self):
+        total = sum(c.nbytes for c in self._codes.values())
+        total += sum(b.nbytes for b in self._bitmaps.values())
+        total += sum(o.nbytes + off.nbytes for o, off in self._postings.values())
+        return total
+
+    def options(self, column):
+        return list(self._levels[column])
+
+    def _selected_codes(self, column, values):
+        codes = self._levels[column].get_indexer(pd.Index(list(values)).unique())
+        return np.unique(codes[codes >= 0])
+
+    def _packed_mask(self, column, selected):
+        bitmaps = self._bitmaps[column]
+        n_values = len(bitmaps)
+        if len(selected) <= n_values // 2 or self._has_missing[column]:
+            if not len(selected):  # nothing selected: empty mask
+                return np.zeros(bitmaps.shape[1], dtype=np.uint8)
+            return np.bitwise_or.reduce(bitmaps[selected], axis=0)
+        # Most values selected: complement of the few that are not
+        unselected = np.setdiff1d(np.arange(n_values), selected)
+        return ~np.bitwise_or.reduce(bitmaps[unselected], axis=0)
+
+    def _row_mask(self, column, selected):
+        order, offsets = self._postings[column]
+        n_selected_rows = int((offsets[selected + 1] - offsets[selected]).sum())
+        if n_selected_rows * 8 < self.n_rows:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            for v in selected:
+                mask[order[offsets[v]:offsets[v + 1]]] = True
+            return mask
+        lookup = np.zeros(len(self._levels[column]) + 1, dtype=bool)
+        lookup[selected] = True
+        return lookup[self._codes[column]]  # code -1 hits the trailing False
+
+    def mask(self, selections):
+        packed = None
+        mask = None
+        for column, values in selections.items():
+            if values is None:
+                continue
+            selected = self._selected_codes(column, values)
+            if len(selected) == len(self._levels[column]) and not self._has_missing[column]:
+                continue
+            if column in self._bitmaps:
+                part = self._packed_mask(column, selected)
+                packed = part if packed is None else packed & part
+            else:
+                part = self._row_mask(column, selected)
+                mask = part if mask is None else mask & part
+
+        if packed is not None:
+            unpacked = np.unpackbits(packed, count=self.n_rows).view(bool)
+            mask = unpacked if mask is None else mask & unpacked
+        if mask is None:
+            mask = np.ones(self.n_rows, dtype=bool)
+        return mask
+
+    def rows(self, selections):
+        return np.flatnonzero(self.mask(selections))
@@ -0,0 +1,224 @@
+import os
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from data.engine import DIMENSIONS, Q_ALL, DataValidationError, timestamp_warnings, validate_hr
+from data.instrument import set_rows, stage
+from data.jobs import JobCancelled, checkpoint
+from data.timestamps import derive_month, parse_timestamps, slash_evidence, slash_order
+
+# Streaming survey ingestion: read the CSV in chunks, coerce and validate each
+# chunk in one pass, and keep only a compact copy (categorical dimensions,
+# int8/float32 answers) so peak memory is bounded by the chunk size rather
+# than by the width of the raw text columns.
+
+DEFAULT_CHUNKSIZE = 250_000
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _compact_chunk(chunk, slash_order=None):
+    # One numeric pass per question; NaN bookkeeping is done on the 2-D array.
+    answers = np.empty((len(chunk), len(Q_ALL)), dtype=np.float32)
+    for j, q in enumerate(Q_ALL):
+        answers[:, j] = pd.to_numeric(chunk[q], errors='coerce').to_numpy(dtype=np.float32, na_value=np.nan)
+
+    missing = np.isnan(answers)
+    missing_per_row = missing.sum(axis=1)
+    invalid_rows = int((missing_per_row > 0).sum())
+    empty_rows = missing_per_row == len(Q_ALL)
+
+    timestamps, timestamp_formats = parse_timestamps(chunk['timestamp'], order=slash_order)
+
+    keep = ~empty_rows
+    compact = pd.DataFrame(
+        {col: chunk[col].astype('category') for col in DIMENSIONS},
+        index=chunk.index,
+    )
+    for j, q in enumerate(Q_ALL):
+        compact[q] = answers[:, j]
+    compact['timestamp'] = timestamps
+    compact['month'] = derive_month(timestamps).astype('category')
+
+    extra = [c for c in chunk.columns if c not in compact.columns]
+    for col in extra:
+        compact[col] = chunk[col]
+
+    stats = {
+        "invalid_rows": invalid_rows,
+        "empty_rows": int(empty_rows.sum()),
+        "valid_timestamps": int(timestamps.notna().sum()),
+        "timestamp_formats": timestamp_formats,
+    }
+    return compact[keep], stats
+
+
+def _concat_compact(chunks):
+    columns = {}
+    for col in chunks[0].columns:
+        parts = [c[col] for c in chunks]
+        if isinstance(parts[0].dtype, pd.CategoricalDtype):
+            columns[col] = pd.Series(union_categoricals(parts), copy=False)
+        else:
+            columns[col] = pd.concat(parts, ignore_index=True)
+    survey = pd.DataFrame(columns)
+
+    # Answers without gaps fit in int8; the rest stay float32 to carry NaN.
+    for q in Q_ALL:
+        values = survey[q].to_numpy()
+        if not np.isnan(values).any():
+            survey[q] = values.astype(np.int8)
+    return survey
+
+
+def _rewind(src):
+    if hasattr(src, "seek"):
+        src.seek(0)
+
+
+def _read_fraction(src, size):
+    # Share of a file-like source consumed so far, for progress reporting
+    if not size or not hasattr(src, "tell"):
+        return None
+    return src.tell() / size
+
+
+class _KeepOpen:
+    # File-like view of a caller's source that pandas cannot close, so the
+    # source can be read again after a scan
+    def __init__(self, src):
+        self._src = src
+
+    def __getattr__(self, name):
+        return getattr(self._src, name)
+
+    def __iter__(self):
+        return iter(self._src)
+
+    def close(self):
+        pass
+
+
+def scan_slash_order(survey_src, chunksize=DEFAULT_CHUNKSIZE):
+    # The MM/DD vs DD/MM order for the whole timestamp column, so every chunk
+    # reads ambiguous dates the same way a whole-file parse would. Reads only
+    # the timestamp column, and stops at the first chunk that settles it
+    # (usually the first). None if the source cannot be read twice.
+    if not isinstance(survey_src, (str, os.PathLike)) and not hasattr(survey_src, "seek"):
+        return None
+    _rewind(survey_src)
+    try:
+        src = survey_src if isinstance(survey_src, (str, os.PathLike)) else _KeepOpen(survey_src)
+        for chunk in pd.read_csv(src, usecols=['timestamp'], dtype=str, chunksize=chunksize):
+            order = slash_evidence(chunk['timestamp'])
+            if order is not None:
+                return order
+        return "MM/DD"
+    except Exception:
+        return None  # the main pass reports what is wrong with the file
+    finally:
+        _rewind(survey_src)
+
+
+def read_survey_chunked(survey_src, chunksize=DEFAULT_CHUNKSIZE, memory_limit=None, sink=None):
+    # With a sink, each compact chunk is handed to it instead of being kept,
+    # and no survey frame is returned.
+    order = scan_slash_order(survey_src, chunksize)
+    try:
+        reader = pd.read_csv(survey_src, chunksize=chunksize)
+    except Exception as e:
+        raise DataValidationError(f"Error reading CSV files: {e}") from e
+
+    chunks = []
+    retained_bytes = 0
+    peak_bytes = 0
+    rows_read = 0
+    rows_kept = 0
+    invalid_rows = 0
+    empty_rows = 0
+    valid_timestamps = 0
+    timestamp_formats = {}
+    size = getattr(survey_src, "size", None)
+
+    try:
+        for chunk in reader:
+            if rows_read == 0:
+                missing = [col for col in DIMENSIONS + Q_ALL if col not in chunk.columns]
+                if missing:
+                    raise DataValidationError(f"Survey CSV is missing required columns: {', '.join(missing)}")
+                if 'timestamp' not in chunk.columns:
+                    raise DataValidationError("Survey CSV is missing 'timestamp' column.")
+
+                # Unscannable source: the first chunk decides for the file
+                order = order or slash_order(chunk['timestamp'])
+
+            rows_read += len(chunk)
+            chunk_bytes = _frame_bytes(chunk)
+            compact, stats = _compact_chunk(chunk, order)
+            del chunk
+
+            rows_kept += len(compact)
+            if sink is not None:
+                sink(compact)
+            else:
+                chunks.append(compact)
+                retained_bytes += _frame_bytes(compact)
+            peak_bytes = max(peak_bytes, retained_bytes + chunk_bytes)
+            invalid_rows += stats["invalid_rows"]
+            empty_rows += stats["empty_rows"]
+            valid_timestamps += stats["valid_timestamps"]
+            for label, count in stats["timestamp_formats"].items():
+                timestamp_formats[label] = timestamp_formats.get(label, 0) + count
+
+            if memory_limit is not None and retained_bytes > memory_limit:
+                raise DataValidationError(
+                    f"Survey data exceeds the ingestion memory budget "
+                    f"({retained_bytes / 1e6:.0f} MB > {memory_limit / 1e6:.0f} MB after {rows_read} rows)."
+                )
+            checkpoint(_read_fraction(survey_src, size), f"Read {rows_read:,} survey rows")
+    except (DataValidationError, JobCancelled):
+        raise
+    except Exception as e:
+        raise DataValidationError(f"Error reading CSV files: {e}") from e
+
+    if not rows_read or valid_timestamps == 0:
+        raise DataValidationError("All timestamps are invalid. Please use format like YYYY-MM-DD or MM/DD/YYYY.")
+
+    warnings = timestamp_warnings(timestamp_formats)
+    if invalid_rows > 0:
+        warnings.append(f"{invalid_rows} survey rows contain non-numeric scores (converted to NaN). "
+                        f"Check your data for text in question columns.")
+    if empty_rows > 0:
+        warnings.append(f"{empty_rows} survey rows have no valid scores and will be ignored.")
+
+    survey = _concat_compact(chunks) if chunks else None
+    del chunks
+    final_bytes = _frame_bytes(survey) if survey is not None else 0
+
+    report = {
+        "rows_read": rows_read,
+        "rows_kept": rows_kept,
+        "chunksize": chunksize,
+        "timestamp_formats": timestamp_formats,
+        "peak_bytes": max(peak_bytes, retained_bytes + final_bytes),
+        "final_bytes": final_bytes,
+    }
+    return survey, warnings, report
+
+
+def load_inputs_streaming(survey_src, hr_src, chunksize=DEFAULT_CHUNKSIZE, memory_limit=None):
+    with stage("read_survey_chunked"):
+        survey, warnings, report = read_survey_chunked(survey_src, chunksize=chunksize, memory_limit=memory_limit)
+        set_rows(report["rows_read"])
+    with stage("read_hr"):
+        try:
+            hr = pd.read_csv(hr_src)
+        except Exception as e:
+            raise DataValidationError(f"Error reading CSV files: {e}") from e
+        hr = validate_hr(hr)
+        set_rows(len(hr))
+    return survey, hr, warnings, report
@@ -0,0 +1,208 @@
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+
+# Per-stage instrumentation for the hot path. A Trace collects one record per
+# stage: wall time, row count, peak traced memory and named counters such as
+# cache hits and misses. The active trace and stage stack live in context
+# variables, so stage() is a no-op unless a trace is running. Background jobs
+# copy the submitting context, which puts their stages under the rerun that
+# started them.
+#
+# Peak memory is measured with tracemalloc, which slows allocation-heavy
+# code, so it is only on while a trace asks for it. The numbers are
+# process-wide and approximate when several sessions run at once.
+#
+# Finished traces are written as JSON lines to the "cri.perf" logger. Set
+# CRI_PERF_LOG to "stderr" or a file path to attach a handler.
+
+logger = logging.getLogger("cri.perf")
+
+_trace = contextvars.ContextVar("cri_trace", default=None)
+_stack = contextvars.ContextVar("cri_stage_stack", default=())
+_memory_lock = threading.Lock()
+_memory_users = 0
+_logging_configured = False
+
+
+class StageRecord:
+    def __init__(self, name, path, depth, offset):
+        self.name = name
+        self.path = path
+        self.depth = depth
+        self.offset = offset
+        self.seconds = None
+        self.rows = None
+        self.peak_bytes = None
+        self.counters = {}
+        self._start_bytes = 0
+        self._peak = 0
+
+    def to_dict(self):
+        record = {
+            "stage": self.path,
+            "ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+            "offset_ms": round(self.offset * 1000, 3),
+            "depth": self.depth,
+        }
+        if self.rows is not None:
+            record["rows"] = int(self.rows)
+        if self.peak_bytes is not None:
+            record["peak_bytes"] = int(self.peak_bytes)
+        record.update(self.counters)
+        return record
+
+
+class Trace:
+    def __init__(self, name="rerun", track_memory=False):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.track_memory = track_memory
+        self.records = []
+        self.counters = {}
+        self.seconds = None
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def stages(self):
+        # Records in start order (they are appended as stages finish)
+        with self._lock:
+            return sorted(self.records, key=lambda r: (r.offset, r.depth))
+
+    def summary(self):
+        totals = dict(self.counters)
+        for record in self.records:
+            for name, value in record.counters.items():
+                totals[name] = totals.get(name, 0) + value
+        return {
+            "event": "trace",
+            "trace": self.trace_id,
+            "name": self.name,
+            "ms": round(self.seconds * 1000, 3) if self.seconds is not None else None,
+            "stages": len(self.records),
+            **totals,
+        }
+
+
+def _configure_logging():
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+    target = os.environ.get("CRI_PERF_LOG")
+    if not target:
+        return
+    handler = logging.StreamHandler(sys.stderr) if target in ("1", "stderr") else logging.FileHandler(target)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def _memory_start():
+    global _memory_users
+    with _memory_lock:
+        if _memory_users == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        _memory_users += 1
+
+
+def _memory_stop():
+    global _memory_users
+    with _memory_lock:
+        _memory_users -= 1
+        if _memory_users == 0 and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+def _take_peak():
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    return current, peak
+
+
+def start_trace(name="rerun", track_memory=False):
+    _configure_logging()
+    trace = Trace(name, track_memory)
+    if track_memory:
+        _memory_start()
+    _trace.set(trace)
+    _stack.set(())
+    return trace
+
+
+def finish_trace(trace):
+    trace.seconds = time.perf_counter() - trace._start
+    if trace.track_memory:
+        _memory_stop()
+    if _trace.get() is trace:
+        _trace.set(None)
+    if logger.isEnabledFor(logging.INFO):
+        for record in trace.stages():
+            logger.info(json.dumps({"event": "stage", "trace": trace.trace_id, **record.to_dict()}))
+        logger.info(json.dumps(trace.summary()))
+    return trace
+
+
+def current_trace():
+    return _trace.get()
+
+
+@contextmanager
+def stage(name, rows=None):
+    trace = _trace.get()
+    if trace is None:
+        yield None
+        return
+
+    parents = _stack.get()
+    path = "/".join([p.name for p in parents] + [name])
+    record = StageRecord(name, path, len(parents), time.perf_counter() - trace._start)
+    record.rows = rows
+    measure = trace.track_memory and tracemalloc.is_tracing()
+    if measure:
+        current, peak = _take_peak()
+        for parent in parents:
+            parent._peak = max(parent._peak, peak)
+        record._start_bytes = record._peak = current
+
+    token = _stack.set(parents + (record,))
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        _stack.reset(token)
+        if measure and tracemalloc.is_tracing():
+            _, peak = _take_peak()
+            for r in parents + (record,):
+                r._peak = max(r._peak, peak)
+            record.peak_bytes = record._peak - record._start_bytes
+        trace.add(record)
+
+
+def set_rows(rows):
+    stack = _stack.get()
+    if stack:
+        stack[-1].rows = rows
+
+
+def count(name, n=1):
+    # Adds to a counter on the innermost open stage (or the trace itself)
+    trace = _trace.get()
+    if trace is None:
+        return
+    stack = _stack.get()
+    counters = stack[-1].counters if stack else trace.counters
+    counters[name] = counters.get(name, 0) + n
@@ -0,0 +1,163 @@
+import contextvars
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# Background jobs for the dashboard's heavy stages (parsing uploads, scoring,
+# bootstrap). Each session owns one job per slot ("load", "results", ...).
+# Resubmitting a slot with the same key reattaches to the running job, so a
+# rerun mid-computation does not start the work again. A different key
+# cancels the stale job. Cancellation is cooperative: long loops call
+# checkpoint(), which reports progress and raises JobCancelled once the job
+# has been superseded. Outside a job checkpoint() does nothing.
+#
+# The runner only holds a job until its result is consumed (release()); the
+# result itself lives in the results cache. Owners that submit nothing for
+# IDLE_OWNER_SECONDS (closed browser tabs) have their jobs cancelled and
+# dropped on the next submit.
+
+DEFAULT_WORKERS = max(2, min(4, os.cpu_count() or 1))
+IDLE_OWNER_SECONDS = 30 * 60
+
+# Worker processes for CPU-heavy jobs start from a forkserver (spawn where
+# that is unavailable): forking the multithreaded server could copy a lock
+# another thread holds and deadlock the child.
+_PROCESS_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def process_pool(workers):
+    return ProcessPoolExecutor(max_workers=workers, mp_context=_PROCESS_CONTEXT)
+
+
+def checkpoint(fraction=None, message=None):
+    job = getattr(_local, "job", None)
+    if job is None:
+        return
+    if job.cancelled:
+        raise JobCancelled(job.key)
+    if fraction is not None:
+        job.fraction = min(max(float(fraction), 0.0), 1.0)
+    if message is not None:
+        job.message = message
+
+
+class Job:
+    def __init__(self, key):
+        self.key = key
+        self.future = None
+        self.fraction = 0.0
+        self.message = None
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def wait(self, timeout=None):
+        wait([self.future], timeout=timeout)
+        return self.future.done()
+
+    def result(self):
+        return self.future.result()
+
+
+class JobRunner:
+    def __init__(self, max_workers=DEFAULT_WORKERS, idle_seconds=IDLE_OWNER_SECONDS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cri-job")
+        self.idle_seconds = idle_seconds
+        self._jobs = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.reattached = 0
+        self.cancelled = 0
+        self.expired = 0
+
+    def submit(self, owner, slot, key, fn):
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            self._seen[owner] = now
+            job = self._jobs.get((owner, slot))
+            if job is not None and job.key == key and not job.cancelled and not job.future.cancelled():
+                self.reattached += 1
+                return job
+            if job is not None and not job.done():
+                job.cancel()
+                self.cancelled += 1
+
+            job = Job(key)
+            # Run in a copy of the caller's context (carries the active trace)
+            job.future = self._executor.submit(contextvars.copy_context().run, self._run, job, fn)
+            self._jobs[(owner, slot)] = job
+            self.submitted += 1
+            return job
+
+    def _run(self, job, fn):
+        _local.job = job
+        try:
+            checkpoint()
+            return fn()
+        finally:
+            _local.job = None
+
+    def release(self, owner, slot, job):
+        # Drops a finished job once its caller has its result (unless the
+        # slot has moved on to another job meanwhile)
+        with self._lock:
+            if self._jobs.get((owner, slot)) is job and job.done():
+                del self._jobs[(owner, slot)]
+
+    def _drop(self, owner, slot=None):
+        keys = [k for k in self._jobs if k[0] == owner and (slot is None or k[1] == slot)]
+        for k in keys:
+            job = self._jobs.pop(k)
+            if not job.done():
+                job.cancel()
+                self.cancelled += 1
+
+    def _expire(self, now):
+        idle = [owner for owner, seen in self._seen.items() if now - seen > self.idle_seconds]
+        for owner in idle:
+            del self._seen[owner]
+            self._drop(owner)
+            self.expired += 1
+
+    def cancel(self, owner, slot=None):
+        with self._lock:
+            self._drop(owner, slot)
+            if slot is None:
+                self._seen.pop(owner, None)
+
+    def running(self):
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.done())
+
+    def stats(self):
+        return {
+            "jobs": len(self._jobs),
+            "running": self.running(),
+            "submitted": self.submitted,
+            "reattached": self.reattached,
+            "cancelled": self.cancelled,
+            "owners": len(self._seen),
+            "expired_owners": self.expired,
+        }
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from data.engine import (
+    COMPONENTS,
+    GROUP_LABEL_SEPARATOR,
+    Q_ALL,
+    Q_CHANGE,
+    Q_COMM,
+    Q_TRUST,
+    RESULT_COLUMNS,
+    group_columns,
+)
+from data.hr_store import hr_store
+from data.instrument import stage
+from data.scoring import DEFAULT_PROFILE, RISK_LEVELS
+
+# Vectorized CRI scoring kernel. Works on dense (..., groups, months, 18)
+# mean/std tensors and a (groups, months) presence mask, so the five
+# components, the CRI and risk-band codes come out of a handful of array
+# operations. Leading batch axes are allowed (bootstrap resamples, what-if
+# sweeps). data.engine.score_aggregates stays the pandas reference
+# implementation; benchmarks/kernel_equivalence.py checks the two agree.
+
+_TRUST = [Q_ALL.index(q) for q in Q_TRUST]
+_COMM = [Q_ALL.index(q) for q in Q_COMM]
+_CHANGE = [Q_ALL.index(q) for q in Q_CHANGE]
+
+
+def _nanmean(values):
+    # Row mean that skips NaN like DataFrame.mean(axis=1); all-NaN rows stay NaN
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=-1)
+    total = np.where(valid, values, 0.0).sum(axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n > 0, total / n, np.nan)
+
+
+def _previous_present(values, present):
+    # values[..., g, m'] for the last month m' < m in which group g has data
+    n_months = present.shape[-1]
+    idx = np.where(present, np.arange(n_months), -1)
+    idx = np.maximum.accumulate(idx, axis=-1)
+    prev = np.concatenate([np.full(idx.shape[:-1] + (1,), -1), idx[..., :-1]], axis=-1)
+    gathered = np.take_along_axis(values, np.broadcast_to(np.clip(prev, 0, None), values.shape), axis=-1)
+    return np.where(np.broadcast_to(prev, values.shape) >= 0, gathered, np.nan)
+
+
+def component_inputs(means, stds):
+    # The five per-group-month aggregates every component is built from
+    return {
+        "vol_raw": _nanmean(stds),
+        "trust_mean": _nanmean(means[..., _TRUST]),
+        "comm_mean": _nanmean(means[..., _COMM]),
+        "comm_std": _nanmean(stds[..., _COMM]),
+        "change_mean": _nanmean(means[..., _CHANGE]),
+    }
+
+
+def score_components(inputs, present, hr_raw, profile=DEFAULT_PROFILE):
+    p = profile
+    with np.errstate(invalid='ignore'):
+        # 1. Volatility
+        vol = np.clip((inputs["vol_raw"] - p.vol_floor) / p.vol_span * 100, 0, 100)
+
+        # 2. Trust Decline (vs. the group's previous month with data)
+        trust_mean = inputs["trust_mean"]
+        trust_delta = trust_mean - _previous_present(trust_mean, present)
+        trust_decline = np.nan_to_num(-np.minimum(trust_delta, 0), nan=0.0)
+        trust = np.clip(trust_decline * p.trust_scale, 0, 100)
+
+        # 3. Communication Strain
+        comm_raw = (5 - inputs["comm_mean"]) * inputs["comm_std"]
+        comm = np.clip(comm_raw / p.comm_max * 100, 0, 100)
+
+        # 4. HR Stress
+        hr = np.clip(hr_raw * p.hr_scale, 0, 100)
+
+        # 5. Change Exposure
+        change = np.clip((inputs["change_mean"] - p.change_floor) / p.change_span * 100, 0, 100)
+
+        w_vol, w_trust, w_comm, w_hr, w_change = p.weights
+        cri = np.round(vol * w_vol + trust * w_trust + comm * w_comm + hr * w_hr + change * w_change, 1)
+        bands = p.band(cri)
+
+    return {
+        "vol_score": vol,
+        "trust_score": trust,
+        "comm_score": comm,
+        "hr_score": hr,
+        "change_score": change,
+        "CRI": cri,
+        "band": bands,
+    }
+
+
+def score_tensor(means, stds, present, hr_raw, profile=DEFAULT_PROFILE):
+    return score_components(component_inputs(means, stds), present, hr_raw, profile)
+
+
+def _as_index(groups):
+    # Keeps a MultiIndex intact (pd.Index() would flatten it to tuples)
+    return groups if isinstance(groups, pd.Index) else pd.Index(groups)
+
+
+def hr_tensor(hr, groups, months, agg_level, mix=None):
+    # (groups, months) hr_raw from an HR frame or HRStore. Levels without a
+    # department column need mix (responses per group x department x month);
+    # without it they fall back to the org baseline.
+    groups = _as_index(groups)
+    store = hr_store(hr)
+    if 'department' in group_columns(agg_level):
+        departments = groups.get_level_values('department') if groups.nlevels > 1 else groups
+        return store.lookup(departments, months)
+    if mix is None:
+        return np.zeros((len(groups), len(months)))
+    return store.project(mix, groups, months, group_columns(agg_level))
+
+
+def group_labels(groups):
+    # Display label per group: the value itself, or "A / B" for combined levels
+    groups = _as_index(groups)
+    if groups.nlevels == 1:
+        return np.asarray(groups, dtype=object)
+    return np.array([GROUP_LABEL_SEPARATOR.join(map(str, key)) for key in groups], dtype=object)
+
+
+def to_frame(scores, groups, months, counts, agg_level):
+    groups = _as_index(groups)
+    columns = group_columns(agg_level)
+    g, m = np.nonzero(counts > 0)
+    frame = pd.DataFrame({
+        col: np.asarray(groups.get_level_values(i), dtype=object)[g] for i, col in enumerate(columns)
+    })
+    frame["group"] = group_labels(groups)[g]
+    frame["month"] = np.asarray(months, dtype=object)[m]
+    frame["responses"] = counts[g, m].astype(np.int64)
+    frame["CRI"] = scores["CRI"][g, m]
+    frame["risk_level"] = RISK_LEVELS[scores["band"][g, m]]
+    for name in COMPONENTS:
+        frame[name] = scores[name][g, m]
+    return frame[columns + RESULT_COLUMNS]
+
+
+def score_dense(means, stds, counts, groups, months, hr_df, agg_level, profile=DEFAULT_PROFILE, mix=None):
+    with stage("hr_lookup", rows=len(groups)):
+        hr_raw = hr_tensor(hr_df, groups, months, agg_level, mix)
+    with stage("score", rows=int((counts > 0).sum())):
+        scores = score_tensor(means, stds, counts > 0, hr_raw, profile)
+    with stage("to_frame"):
+        return to_frame(scores, groups, months, counts, agg_level)
@@ -1,67 +1,123 @@
-import pandas as pd
+import os
+import time
+import uuid
+
 import streamlit as st
+from data import disk_cache
+from data.cache import fingerprint
+from data.engine import DataValidationError
+from data.instrument import stage
+from data.processor import get_result_cache, run_in_background
+from data.timestamps import describe_formats
+from data.registry import DEFAULT_MEMORY_BUDGET, DatasetRegistry
+from data.watch import SurveyFeed
 
-@st.cache_data
-def load_data(survey_bytes, hr_bytes):
-    try:
-        survey = pd.read_csv(survey_bytes)
-        hr = pd.read_csv(hr_bytes)
-    except Exception as e:
-        st.error(f"Error reading CSV files: {e}")
-        st.stop()
+# Seconds between drop-folder polls while a dashboard is open in watch mode
+WATCH_REFRESH_SECONDS = 5
 
-    # === Survey Validation ===
-    required_survey_cols = ['department', 'role_level', 'location'] + [f'q{i}' for i in range(1, 19)]
-    missing_survey = [col for col in required_survey_cols if col not in survey.columns]
-    if missing_survey:
-        st.error(f"Survey CSV is missing required columns: {', '.join(missing_survey)}")
-        st.stop()
+@st.cache_resource
+def get_registry():
+    # One registry per server process, shared by every session
+    budget_mb = os.environ.get("CRI_REGISTRY_BUDGET_MB")
+    budget = int(budget_mb) * 1024 * 1024 if budget_mb else DEFAULT_MEMORY_BUDGET
+    # CRI_SQL_DIR switches to out-of-core SQLite stores, which replace the disk cache
+    sql_dir = os.environ.get("CRI_SQL_DIR") or None
+    use_disk_cache = sql_dir is None and disk_cache.available() and os.environ.get("CRI_DISK_CACHE", "1") != "0"
+    cache = disk_cache.DiskCache() if use_disk_cache else None
+    return DatasetRegistry(memory_budget=budget, on_evict=get_result_cache().invalidate, disk_cache=cache,
+                           sql_dir=sql_dir)
 
-    # Handle timestamp
-    if 'timestamp' not in survey.columns:
-        st.error("Survey CSV is missing 'timestamp' column.")
-        st.stop()
+def _session_id():
+    if "registry_session_id" not in st.session_state:
+        st.session_state["registry_session_id"] = uuid.uuid4().hex
+    return st.session_state["registry_session_id"]
 
-    survey['timestamp'] = pd.to_datetime(survey['timestamp'], errors='coerce')
-    if survey['timestamp'].isna().all():
-        st.error("All timestamps are invalid. Please use format like YYYY-MM-DD or MM/DD/YYYY.")
-        st.stop()
+def release_dataset():
+    # Detaches this session from its uploaded dataset (no uploads, or a
+    # switch to the watched folder), so the registry may evict it first
+    if "registry_session_id" in st.session_state:
+        get_registry().detach(st.session_state["registry_session_id"])
+    st.session_state.pop("upload_fingerprint", None)
 
-    survey['month'] = survey['timestamp'].dt.to_period('M').astype(str)
+def _fingerprint(survey_bytes, hr_bytes):
+    # Hashed once per pair of uploads: reruns reuse it by UploadedFile.file_id
+    file_ids = (getattr(survey_bytes, "file_id", None), getattr(hr_bytes, "file_id", None))
+    cached = st.session_state.get("upload_fingerprint")
+    if None not in file_ids and cached is not None and cached[0] == file_ids:
+        return cached[1]
+    with stage("fingerprint"):
+        dataset_id = fingerprint(survey_bytes, hr_bytes)
+    if None not in file_ids:
+        st.session_state["upload_fingerprint"] = (file_ids, dataset_id)
+    return dataset_id
 
-    # Convert q1-q18 to numeric, coerce errors
-    q_cols = [f'q{i}' for i in range(1, 19)]
-    survey[q_cols] = survey[q_cols].apply(pd.to_numeric, errors='coerce')
+def load_data(survey_bytes, hr_bytes, chunksize=None, memory_limit=None):
+    registry = get_registry()
+    dataset_id = _fingerprint(survey_bytes, hr_bytes)
+    try:
+        dataset = registry.get(dataset_id) or run_in_background(
+            "load", dataset_id,
+            lambda: registry.load(survey_bytes, hr_bytes, chunksize=chunksize,
+                                  memory_limit=memory_limit, dataset_id=dataset_id),
+            "Loading data...",
+        )
+    except DataValidationError as e:
+        st.error(str(e))
+        st.stop()
+    registry.attach(_session_id(), dataset.dataset_id)
 
-    # Count invalid entries per row
-    invalid_per_row = survey[q_cols].isna().sum(axis=1)
-    invalid_rows = (invalid_per_row > 0).sum()
+    for message in dataset.warnings:
+        st.warning(message)
 
-    if invalid_rows > 0:
-        st.warning(f"{invalid_rows} survey rows contain non-numeric scores (converted to NaN). "
-               f"Check your data for text in question columns.")
+    st.success("Data loaded successfully!")
+    report = dataset.report
+    if report and report.get("chunksize"):
+        st.caption(f"Streamed {report['rows_read']:,} rows in chunks of {report['chunksize']:,} "
+                   f"(peak {report['peak_bytes'] / 1e6:.1f} MB, resident {report['final_bytes'] / 1e6:.1f} MB)")
+    if report and report.get("timestamp_formats"):
+        st.caption(f"Timestamp formats: {describe_formats(report['timestamp_formats'])}")
+    # Scoring runs on the cube; the survey rows are not needed (and stay
+    # unloaded on disk cache hits)
+    return dataset.hr, dataset.cube
 
-    # Warn if many invalid responses
-    invalid_responses = survey[q_cols].isna().all(axis=1).sum()
-    if invalid_responses > 0:
-        st.warning(f"{invalid_responses} survey rows have no valid scores and will be ignored.")
+@st.cache_resource
+def get_feed(path):
+    # One feed per watched path, shared by every session; CRI_WATCH_HR
+    # overrides the HR file (default: hr.csv in the drop folder)
+    return SurveyFeed(path, os.environ.get("CRI_WATCH_HR") or None)
 
-    survey = survey.dropna(subset=q_cols, how='all')  # Drop completely empty responses
+@st.fragment(run_every=WATCH_REFRESH_SECONDS)
+def _watch_status(feed):
+    # Polls on a timer; new data reruns the whole app so every tab refreshes.
+    # A bad drop or HR file is reported here and retried on the next tick.
+    try:
+        version = feed.poll()
+    except DataValidationError as e:
+        st.error(str(e))
+        return
+    if version != st.session_state.get("watch_version"):
+        st.session_state["watch_version"] = version
+        st.rerun()
+    cube, _, _ = feed.snapshot()
+    if cube is not None:
+        updated = time.strftime("%H:%M:%S", time.localtime(feed.updated)) if feed.updated else "—"
+        st.caption(f"📡 Watching {feed.path}: {cube.responses():,} responses, last update {updated}")
 
-    # === HR Validation ===
-    required_hr_cols = ['department', 'month']
-    missing_hr = [col for col in required_hr_cols if col not in hr.columns]
-    if missing_hr:
-        st.error(f"HR Metrics CSV is missing required columns: {', '.join(missing_hr)}")
+def load_watched(path):
+    feed = get_feed(path)
+    try:
+        with stage("watch_poll"):
+            feed.poll()
+    except DataValidationError as e:
+        st.error(str(e))
         st.stop()
+    cube, hr, version = feed.snapshot()
+    st.session_state["watch_version"] = version
+    _watch_status(feed)
 
-    hr['month'] = hr['month'].astype(str)
-
-    # Optional: fill missing numeric metrics with 0 or warn
-    numeric_cols = ['attrition_rate', 'absenteeism_rate', 'sick_days_avg', 'grievances_count', 'manager_escalations']
-    for col in numeric_cols:
-        if col in hr.columns:
-            hr[col] = pd.to_numeric(hr[col], errors='coerce').fillna(0)
-
-    st.success("Data loaded successfully!")
-    return survey, hr
\ No newline at end of file
+    for message in feed.warnings:
+        st.warning(message)
+    if cube is None:
+        st.info(f"Waiting for survey batches and an HR file in {path}...")
+        st.stop()
+    return hr, cube
@@ -1,95 +1,145 @@
-import numpy as np
-import pandas as pd
-import streamlit as st
+import io
+import os
+import uuid
+from itertools import combinations
 
-@st.cache_data
-def process_data(survey_df, hr_df, agg_level):
-    group_key_map = {
-        "Department": "department",
-        "Role Level": "role_level",
-        "Location": "location"
-    }
-    group_key = group_key_map[agg_level]
-
-    q_all = [f"q{i}" for i in range(1, 19)]
-    q_trust = ['q1','q2','q3','q4','q5','q15','q16','q17','q18']
-    q_comm = ['q6','q7','q8','q9','q10']
-    q_change = ['q11','q12','q13','q14']
-
-    # Group and aggregate
-    grouped = survey_df.groupby([group_key, 'month'])
-
-    means = grouped[q_all].mean()
-    stds = grouped[q_all].std()
-    counts = grouped.size().rename("responses")
-
-    agg_df = pd.concat([means.add_suffix('_mean'), stds.add_suffix('_std'), counts], axis=1)
-    agg_df = agg_df.reset_index()
-
-    # 1. Volatility
-    agg_df["volatility_raw"] = agg_df[[f"{q}_std" for q in q_all]].mean(axis=1)
-    agg_df["vol_score"] = np.clip((agg_df["volatility_raw"] - 1.0) / 1.0 * 100, 0, 100)
-
-    # 2. Trust Decline (MoM per group)
-    agg_df["trust_mean"] = agg_df[[f"{q}_mean" for q in q_trust]].mean(axis=1)
-    agg_df = agg_df.sort_values([group_key, 'month'])
-    agg_df["trust_delta"] = agg_df.groupby(group_key)["trust_mean"].diff()
-    agg_df["trust_decline"] = (-agg_df["trust_delta"].clip(upper=0)).fillna(0)  # positive = decline
-    agg_df["trust_score"] = np.clip(agg_df["trust_decline"] * 100, 0, 100)
-
-    # 3. Communication Strain
-    agg_df["comm_mean"] = agg_df[[f"{q}_mean" for q in q_comm]].mean(axis=1)
-    agg_df["comm_std"] = agg_df[[f"{q}_std" for q in q_comm]].mean(axis=1)
-    agg_df["comm_raw"] = (5 - agg_df["comm_mean"]) * agg_df["comm_std"]
-    # Use fixed scale: max reasonable = (5-1)*2 = 8
-    agg_df["comm_score"] = np.clip(agg_df["comm_raw"] / 8.0 * 100, 0, 100)
-
-    # 4. HR Stress
-    hr_metrics = ['attrition_rate', 'absenteeism_rate', 'sick_days_avg', 'grievances_count', 'manager_escalations']
-    full_df = agg_df.copy()
-
-    if agg_level == "Department" and 'department' in hr_df.columns:
-        full_df = pd.merge(full_df, hr_df, left_on=['department', 'month'], right_on=['department', 'month'], how='left')
-
-    # Fill with org-wide averages
-    org_means = hr_df[hr_metrics].mean()
-    org_stds = hr_df[hr_metrics].std()
-    for col in hr_metrics:
-        if col not in full_df.columns:
-            full_df[col] = org_means.get(col, 0)
-        full_df[col] = full_df[col].fillna(org_means.get(col, 0))
-
-    # Z-scores
-    full_df["hr_raw"] = 0
-    for col in hr_metrics:
-        z = (full_df[col] - org_means[col]) / (org_stds[col] + 1e-6)
-        full_df["hr_raw"] += z / len(hr_metrics)
-    full_df["hr_score"] = np.clip(full_df["hr_raw"] * 50, 0, 100)  # since avg z=0 → 0, +2 → 100
-
-    # 5. Change Exposure
-    full_df["change_mean"] = full_df[[f"{q}_mean" for q in q_change]].mean(axis=1)
-    full_df["change_score"] = np.clip((full_df["change_mean"] - 2.0) / 2.0 * 100, 0, 100)
-
-    # Final CRI
-    full_df["CRI"] = (
-        full_df["vol_score"] * 0.30 +
-        full_df["trust_score"] * 0.25 +
-        full_df["comm_score"] * 0.20 +
-        full_df["hr_score"] * 0.15 +
-        full_df["change_score"] * 0.10
-    ).round(1)
-
-    # Risk level
-    def risk_level(cri):
-        if cri <= 39:
-            return "Low risk (Monitor)"
-        elif cri <= 69:
-            return "Medium risk (Preventive attention)"
-        else:
-            return "High risk (Intervention advised)"
-
-    full_df["risk_level"] = full_df["CRI"].apply(risk_level)
-    full_df["group"] = full_df[group_key]
-
-    return full_df[[group_key, "group", "month", "responses", "CRI", "risk_level",
-                    "vol_score", "trust_score", "comm_score", "hr_score", "change_score"]]
\ No newline at end of file
+import streamlit as st
+from data.bootstrap import cube_intervals
+from data.cache import ResultCache, normalize_filters
+from data.jobs import JobRunner
+from data.engine import GROUP_KEY_MAP, combine_levels, drill_levels
+from data.instrument import stage
+from data.scoring import DEFAULT_PROFILE, ScoringProfile
+from data.views import ResultViews
+from visuals.export import export_zip
+
+# Let fast (usually cached) jobs finish before a progress bar is drawn
+PROGRESS_DELAY = 0.05
+PROGRESS_POLL = 0.1
+
+# Organization, each dimension and each pair of dimensions (the levels offered
+# for export; each is scored when first asked for)
+ROLLUP_LEVELS = [combine_levels(list(levels)) for size in range(3) for levels in combinations(GROUP_KEY_MAP, size)]
+
+@st.cache_resource
+def get_result_cache():
+    # Shared by every session; keyed on dataset fingerprint + filter selection
+    return ResultCache()
+
+@st.cache_resource
+def get_scoring_profile():
+    # CRI_SCORING_PROFILE may point at a JSON file overriding ScoringProfile fields
+    path = os.environ.get("CRI_SCORING_PROFILE")
+    return ScoringProfile.from_json(path) if path else DEFAULT_PROFILE
+
+@st.cache_resource
+def get_job_runner():
+    # One worker pool per server process; jobs are owned per session and slot
+    return JobRunner()
+
+def run_in_background(slot, key, fn, label):
+    # Runs fn on the worker pool and waits for it with a progress bar. Each
+    # progress update is a Streamlit call, so a widget change interrupts the
+    # wait; the next rerun reattaches to the job if its key is unchanged and
+    # cancels it otherwise.
+    owner = st.session_state.setdefault("job_owner_id", uuid.uuid4().hex)
+    runner = get_job_runner()
+    job = runner.submit(owner, slot, key, fn)
+    if not job.wait(PROGRESS_DELAY):
+        bar = st.progress(0.0, text=label)
+        while not job.wait(PROGRESS_POLL):
+            bar.progress(job.fraction, text=job.message or label)
+        bar.empty()
+    try:
+        return job.result()
+    finally:
+        runner.release(owner, slot, job)
+
+def _results_key(cube, filters, profile):
+    return (cube.dataset_id, normalize_filters(filters), profile)
+
+def _rollup_results(cube, hr_df, filters, profile, prefetch=True):
+    # The requested level and, with prefetch, the level the drill-down opens
+    # on, from one pass over the cube. Each level is cached under its own
+    # key; any other level is scored (and cached) when something asks for it.
+    agg_level = filters["agg_level"]
+    levels = [agg_level]
+    children = drill_levels(agg_level)
+    if prefetch and children:
+        first = next(iter(children.values()))
+        if _results_key(cube, {**filters, "agg_level": first}, profile) not in get_result_cache():
+            levels.append(first)
+    results = cube.compute_cri_levels(hr_df, levels, filters, profile)
+    cache = get_result_cache()
+    for level, frame in results.items():
+        cache.put(_results_key(cube, {**filters, "agg_level": level}, profile), frame)
+    return results[agg_level]
+
+def _cached_results(cube, hr_df, filters, profile, prefetch=True):
+    return get_result_cache().get_or_compute(_results_key(cube, filters, profile),
+                                             lambda: _rollup_results(cube, hr_df, filters, profile, prefetch))
+
+def process_data(cube, hr_df, filters, profile=DEFAULT_PROFILE, slot="results"):
+    # slot: the job slot to run in; the drill-down uses its own so it never
+    # cancels the main results job
+    key = _results_key(cube, filters, profile)
+    with stage("process_data") as s:
+        results = run_in_background(slot, key, lambda: _cached_results(cube, hr_df, filters, profile),
+                                    "Scoring groups...")
+        if s:
+            s.rows = len(results)
+    return results
+
+def chart_export_key(cube, filters, profile=DEFAULT_PROFILE, agg_levels=None):
+    return (cube.dataset_id, normalize_filters(filters), profile, "charts", tuple(agg_levels or GROUP_KEY_MAP))
+
+def export_charts(cube, hr_df, filters, profile=DEFAULT_PROFILE, agg_levels=None):
+    # ZIP of every group's charts for each aggregation level, built on demand.
+    # Archives can be large, so each session keeps only its latest one (not
+    # the shared results cache, which bounds entries, not bytes).
+    agg_levels = tuple(agg_levels or GROUP_KEY_MAP)
+    key = chart_export_key(cube, filters, profile, agg_levels)
+    latest = st.session_state.get("chart_export_archive")
+    if latest is not None and latest[0] == key:
+        return latest[1]
+
+    def build():
+        results = {level: _cached_results(cube, hr_df, {**filters, "agg_level": level}, profile, prefetch=False)
+                   for level in agg_levels}
+        buf = io.BytesIO()
+        export_zip(results, buf, profile)
+        return buf.getvalue()
+
+    archive = run_in_background("export", key, build, "Rendering charts...")
+    st.session_state["chart_export_archive"] = (key, archive)
+    return archive
+
+def add_confidence_intervals(results_df, cube, hr_df, filters, profile=DEFAULT_PROFILE):
+    resamples = filters.get("ci_resamples")
+    if not resamples or results_df.empty:
+        return results_df
+    key = (cube.dataset_id, normalize_filters(filters), profile, "bootstrap", resamples)
+    with stage("bootstrap", rows=len(results_df)):
+        intervals = run_in_background("intervals", key, lambda: get_result_cache().get_or_compute(
+            key, lambda: cube_intervals(cube, hr_df, filters["agg_level"], filters, profile, resamples)
+        ), "Bootstrapping confidence intervals...")
+    return results_df.merge(intervals, on=["group", "month"], how="left")
+
+def get_history(cube, hr_df, filters, profile=DEFAULT_PROFILE):
+    # The same selection over every month, for trend baselines; None when
+    # no month filter is applied (the results already are the history)
+    if filters.get("months") is None:
+        return None
+    history_filters = {**filters, "months": None}
+    key = _results_key(cube, history_filters, profile)
+    # Only the displayed level: trends never read the drill-down level
+    return run_in_background("history", key,
+                             lambda: _cached_results(cube, hr_df, history_filters, profile, prefetch=False),
+                             "Scoring trend history...")
+
+def get_views(results_df, cube, hr_df, filters, profile=DEFAULT_PROFILE):
+    # One ResultViews per results version (dataset, filters, profile, intervals)
+    key = (cube.dataset_id, normalize_filters(filters), profile, "views", filters.get("ci_resamples"))
+    return get_result_cache().get_or_compute(
+        key, lambda: ResultViews(results_df, get_history(cube, hr_df, filters, profile))
+    )
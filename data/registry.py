@@ -0,0 +1,281 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from data.cache import fingerprint
+from data.cube import CELL_KEYS, SurveyCube
+from data.engine import FILTER_COLUMNS, load_inputs
+from data.hr_store import hr_store
+from data.index import DimensionIndex
+from data.instrument import count, stage
+from data.jobs import checkpoint
+from data.ingest import DEFAULT_CHUNKSIZE, load_inputs_streaming
+from data.sql_store import build_store, open_store, store_path
+
+# Process-wide dataset registry. Uploads are fingerprinted by content, parsed
+# once, and the resulting frames are shared (read-only) by every session that
+# uploads the same files. Datasets are evicted least-recently-used first, and
+# detached datasets before ones a session is still looking at, whenever the
+# registry grows past its memory budget. Sessions detach when they switch
+# source or drop their uploads; ones not seen for IDLE_SESSION_SECONDS
+# (closed tabs) are detached on the next attach or eviction.
+
+DEFAULT_MEMORY_BUDGET = 1024 * 1024 * 1024
+IDLE_SESSION_SECONDS = 30 * 60
+
+
+def _freeze(df):
+    # Shared between sessions: numeric blocks are marked read-only in place
+    for col in df.columns:
+        if getattr(df[col].dtype, "kind", "O") in "biufmM":
+            values = df[col].to_numpy(copy=False)
+            if isinstance(values, np.ndarray):
+                values.flags.writeable = False
+    return df
+
+
+def _frame_bytes(df):
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _rewind(src):
+    if hasattr(src, "seek"):
+        src.seek(0)
+
+
+class Dataset:
+    def __init__(self, dataset_id, survey, hr, cube, warnings, report=None):
+        self.dataset_id = dataset_id
+        # survey is None when the rows live in an out-of-core SQL store, or a
+        # zero-argument loader (disk cache hits) called on first access
+        self._survey = None
+        self._survey_loader = survey if callable(survey) else None
+        self._survey_lock = threading.Lock()
+        if survey is not None and not callable(survey):
+            self._survey = _freeze(survey)
+        self.hr = _freeze(hr)
+        self.cube = cube
+        # HR baselines and z-scores, indexed once; scoring finds it via hr_store(hr)
+        self.hr_store = hr_store(self.hr)
+        self.warnings = warnings
+        self.report = report
+        self.nbytes = ((_frame_bytes(self._survey) if self._survey is not None else 0) + _frame_bytes(hr) +
+                       self.hr_store.nbytes + cube.nbytes)
+        self.sessions = set()
+        self._survey_index = None
+
+    @property
+    def survey(self):
+        if self._survey_loader is not None:
+            with self._survey_lock:
+                if self._survey_loader is not None:
+                    self._survey = _freeze(self._survey_loader())
+                    self._survey_loader = None
+                    self.nbytes += _frame_bytes(self._survey)
+        return self._survey
+
+    @property
+    def survey_index(self):
+        # Row-level index for consumers that need raw responses; the dashboard
+        # itself filters cube cells through cube.index.
+        if self._survey_index is None:
+            self._survey_index = DimensionIndex(self.survey, CELL_KEYS)
+            self.nbytes += self._survey_index.nbytes
+        return self._survey_index
+
+    def filter_survey(self, filters):
+        if self._survey is None and self._survey_loader is None:
+            return self.cube.rows(filters)
+        rows = self.survey_index.rows({column: filters.get(key) for key, column in FILTER_COLUMNS.items()})
+        return self.survey.iloc[rows]
+
+
+class DatasetRegistry:
+    def __init__(self, memory_budget=DEFAULT_MEMORY_BUDGET, on_evict=None, disk_cache=None, sql_dir=None,
+                 idle_seconds=IDLE_SESSION_SECONDS):
+        self.memory_budget = memory_budget
+        self.idle_seconds = idle_seconds
+        self.on_evict = on_evict
+        self.disk_cache = disk_cache
+        self.sql_dir = sql_dir
+        self.loads = 0
+        self.disk_hits = 0
+        self.reuses = 0
+        self.evictions = 0
+        self._datasets = OrderedDict()
+        self._sessions = {}
+        self._seen = {}
+        self._loading = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, dataset_id):
+        return dataset_id in self._datasets
+
+    def __len__(self):
+        return len(self._datasets)
+
+    @property
+    def nbytes(self):
+        return sum(ds.nbytes for ds in self._datasets.values())
+
+    def get(self, dataset_id):
+        with self._lock:
+            dataset = self._datasets.get(dataset_id)
+            if dataset is not None:
+                self._datasets.move_to_end(dataset_id)
+            return dataset
+
+    def load(self, survey_src, hr_src, chunksize=None, memory_limit=None, dataset_id=None):
+        if dataset_id is None:
+            dataset_id = fingerprint(survey_src, hr_src)
+
+        dataset = self.get(dataset_id)
+        if dataset is not None:
+            self.reuses += 1
+            count("dataset_reuse")
+            return dataset
+
+        # One parse per fingerprint, even if several sessions upload at once
+        with self._lock:
+            loading = self._loading.setdefault(dataset_id, threading.Lock())
+        try:
+            with loading:
+                dataset = self.get(dataset_id)
+                if dataset is not None:
+                    self.reuses += 1
+                    return dataset
+
+                cached = None
+                if self.disk_cache is not None and dataset_id in self.disk_cache:
+                    with stage("disk_cache_load"):
+                        cached = self.disk_cache.load(dataset_id)
+
+                if self.sql_dir is not None:
+                    survey = None
+                    cube, hr, warnings, report = self._load_sql(dataset_id, survey_src, hr_src, chunksize)
+                elif cached is not None:
+                    survey, hr, cube, warnings, report = cached
+                    self.disk_hits += 1
+                    count("disk_cache_hit")
+                else:
+                    count("dataset_parse")
+                    survey, hr, cube, warnings, report = self._parse(
+                        dataset_id, survey_src, hr_src, chunksize, memory_limit
+                    )
+                dataset = Dataset(dataset_id, survey, hr, cube, warnings, report)
+
+                with self._lock:
+                    self._datasets[dataset_id] = dataset
+                    self.loads += 1
+        finally:
+            with self._lock:
+                self._loading.pop(dataset_id, None)
+
+        self._evict(keep=dataset_id)
+        return dataset
+
+    def _parse(self, dataset_id, survey_src, hr_src, chunksize, memory_limit):
+        _rewind(survey_src)
+        _rewind(hr_src)
+        checkpoint(0.0, "Parsing uploads")
+        with stage("parse"):
+            if chunksize:
+                survey, hr, warnings, report = load_inputs_streaming(
+                    survey_src, hr_src, chunksize=chunksize, memory_limit=memory_limit
+                )
+            else:
+                survey, hr, warnings, report = load_inputs(survey_src, hr_src)
+
+        checkpoint(0.9, "Building survey cube")
+        with stage("cube_build", rows=len(survey)):
+            cube = SurveyCube.from_survey(survey, dataset_id=dataset_id)
+        if self.disk_cache is not None:
+            with stage("disk_cache_save"):
+                self.disk_cache.save(dataset_id, survey, hr, cube, warnings, report)
+        return survey, hr, cube, warnings, report
+
+    def _load_sql(self, dataset_id, survey_src, hr_src, chunksize):
+        # Out-of-core mode: survey rows go to a SQLite store, never a DataFrame
+        path = store_path(self.sql_dir, dataset_id)
+        opened = open_store(path) if os.path.exists(path) else None
+        if opened is not None:
+            self.disk_hits += 1
+            count("sql_store_hit")
+            return opened
+
+        count("dataset_parse")
+        _rewind(survey_src)
+        _rewind(hr_src)
+        checkpoint(0.0, "Loading uploads into the survey store")
+        with stage("parse"):
+            return build_store(path, survey_src, hr_src, chunksize or DEFAULT_CHUNKSIZE, dataset_id)
+
+    def attach(self, session_id, dataset_id):
+        with self._lock:
+            now = time.monotonic()
+            self._expire_sessions(now)
+            self._seen[session_id] = now
+            previous = self._sessions.get(session_id)
+            if previous == dataset_id:
+                return
+            if previous in self._datasets:
+                self._datasets[previous].sessions.discard(session_id)
+            self._sessions[session_id] = dataset_id
+            if dataset_id in self._datasets:
+                self._datasets[dataset_id].sessions.add(session_id)
+
+    def detach(self, session_id):
+        with self._lock:
+            self._detach(session_id)
+
+    def _detach(self, session_id):
+        self._seen.pop(session_id, None)
+        dataset_id = self._sessions.pop(session_id, None)
+        if dataset_id in self._datasets:
+            self._datasets[dataset_id].sessions.discard(session_id)
+
+    def _expire_sessions(self, now):
+        for session_id in [sid for sid, seen in self._seen.items() if now - seen > self.idle_seconds]:
+            self._detach(session_id)
+
+    def _evict(self, keep=None):
+        evicted = []
+        with self._lock:
+            self._expire_sessions(time.monotonic())
+            total = sum(ds.nbytes for ds in self._datasets.values())
+            # Detached datasets go first, then attached ones, oldest first
+            candidates = (
+                [ds for ds in self._datasets.values() if not ds.sessions] +
+                [ds for ds in self._datasets.values() if ds.sessions]
+            )
+            for ds in candidates:
+                if total <= self.memory_budget:
+                    break
+                if ds.dataset_id == keep:
+                    continue
+                del self._datasets[ds.dataset_id]
+                for session_id in ds.sessions:
+                    self._sessions.pop(session_id, None)
+                total -= ds.nbytes
+                evicted.append(ds.dataset_id)
+            self.evictions += len(evicted)
+
+        if self.on_evict is not None:
+            for dataset_id in evicted:
+                self.on_evict(dataset_id)
+        return evicted
+
+    def stats(self):
+        return {
+            "datasets": len(self._datasets),
+            "sessions": len(self._sessions),
+            "nbytes": self.nbytes,
+            "memory_budget": self.memory_budget,
+            "loads": self.loads,
+            "disk_hits": self.disk_hits,
+            "reuses": self.reuses,
+            "evictions": self.evictions,
+        }
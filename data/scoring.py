@@ -0,0 +1,141 @@
+import json
+from dataclasses import asdict, dataclass, replace
+
+import numpy as np
+
+# Scoring profile: the component weights, normalization constants and risk
+# cutoffs used by the engine, the kernel, the charts and the tabs. The default
+# profile reproduces the published CRI definition.
+
+COMPONENT_LABELS = [
+    "Polarization & Instability",
+    "Declining Trust & Safety",
+    "Communication Strain",
+    "HR Operational Stress",
+    "Rapid Change Impact",
+]
+
+RISK_LEVELS = np.array([
+    "Low risk (Monitor)",
+    "Medium risk (Preventive attention)",
+    "High risk (Intervention advised)",
+], dtype=object)
+
+RISK_COLORS = ["#16c961", "#f39c12", "#e73825"]
+
+
+@dataclass(frozen=True)
+class ScoringProfile:
+    # vol, trust, comm, hr, change
+    weights: tuple = (0.30, 0.25, 0.20, 0.15, 0.10)
+    # Volatility: (mean std - floor) / span → 0..100
+    vol_floor: float = 1.0
+    vol_span: float = 1.0
+    # Trust decline: MoM drop in trust mean × scale
+    trust_scale: float = 100.0
+    # Communication strain: (5 - comm mean) × comm std / max (max = (5-1)*2)
+    comm_max: float = 8.0
+    # HR stress: mean z-score × scale (z=+2 → 100)
+    hr_scale: float = 50.0
+    # Change exposure: (change mean - floor) / span → 0..100
+    change_floor: float = 2.0
+    change_span: float = 2.0
+    # Risk bands: CRI <= low_max is low, <= medium_max is medium, else high
+    low_max: float = 39.0
+    medium_max: float = 69.0
+
+    @classmethod
+    def from_dict(cls, values):
+        values = dict(values)
+        if "weights" in values:
+            values["weights"] = tuple(float(w) for w in values["weights"])
+        return cls(**values)
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+    def to_dict(self):
+        return asdict(self)
+
+    def with_weights(self, weights):
+        return replace(self, weights=tuple(float(w) for w in weights))
+
+    def band(self, cri):
+        # NaN falls through to the top band, as the original risk_level did
+        cri = np.asarray(cri, dtype=np.float64)
+        with np.errstate(invalid='ignore'):
+            return np.where(cri <= self.low_max, 0, np.where(cri <= self.medium_max, 1, 2))
+
+    def risk_level(self, cri):
+        return RISK_LEVELS[int(self.band(cri))]
+
+    def color(self, cri):
+        return RISK_COLORS[int(self.band(cri))]
+
+
+DEFAULT_PROFILE = ScoringProfile()
+
+
+def _ranks(cri):
+    # Rank 1 = highest CRI along the last axis; ties broken by position
+    order = np.argsort(-np.nan_to_num(cri, nan=-np.inf), axis=-1, kind='stable')
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.arange(1, cri.shape[-1] + 1), axis=-1)
+    return ranks
+
+
+def sample_scenarios(n, profile=DEFAULT_PROFILE, concentration=50.0, threshold_jitter=5.0, seed=0):
+    # Weight vectors from a Dirichlet centred on the profile's weights, and
+    # band cutoffs jittered uniformly by ±threshold_jitter points
+    rng = np.random.default_rng(seed)
+    weights = rng.dirichlet(np.asarray(profile.weights) * concentration, size=n)
+    low = profile.low_max + rng.uniform(-threshold_jitter, threshold_jitter, n)
+    medium = profile.medium_max + rng.uniform(-threshold_jitter, threshold_jitter, n)
+    return weights, np.column_stack([low, np.maximum(medium, low)])
+
+
+def sensitivity(components, weights, thresholds=None, profile=DEFAULT_PROFILE):
+    # components: (groups, 5) matrix; weights: (scenarios, 5);
+    # thresholds: (scenarios, 2) low/medium cutoffs. One matmul scores every
+    # scenario; bands and rankings are compared against the profile baseline.
+    components = np.asarray(components, dtype=np.float64)
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64))
+    if thresholds is None:
+        thresholds = np.tile([profile.low_max, profile.medium_max], (len(weights), 1))
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    cri = np.round(weights @ components.T, 1)
+    with np.errstate(invalid='ignore'):
+        bands = np.where(cri <= thresholds[:, :1], 0, np.where(cri <= thresholds[:, 1:], 1, 2))
+    ranks = _ranks(cri)
+
+    base_cri = np.round(components @ np.asarray(profile.weights), 1)
+    base_bands = profile.band(base_cri)
+    base_ranks = _ranks(base_cri)
+
+    n_groups = components.shape[0]
+    rank_shift = np.abs(ranks - base_ranks)
+    if n_groups > 1:
+        # Spearman correlation of each scenario's ranking with the baseline
+        d2 = ((ranks - base_ranks) ** 2).sum(axis=1)
+        spearman = 1 - 6 * d2 / (n_groups * (n_groups ** 2 - 1))
+    else:
+        spearman = np.ones(len(weights))
+
+    return {
+        "cri": cri,
+        "bands": bands,
+        "ranks": ranks,
+        "base_cri": base_cri,
+        "base_bands": base_bands,
+        "base_ranks": base_ranks,
+        "band_changed": (bands != base_bands).mean(axis=1),
+        "top_changed": ranks.argmin(axis=1) != base_ranks.argmin(),
+        "spearman": spearman,
+        "band_share": np.stack([(bands == b).mean(axis=0) for b in range(3)], axis=1),
+        "rank_min": ranks.min(axis=0),
+        "rank_max": ranks.max(axis=0),
+        "max_rank_shift": rank_shift.max(axis=0),
+    }
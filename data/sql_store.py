@@ -0,0 +1,244 @@
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+
+from data.cache import fingerprint
+from data.cube import CELL_KEYS, SurveyCube
+from data.engine import FILTER_COLUMNS, GROUP_KEY_MAP, Q_ALL, DataValidationError, validate_hr
+from data.ingest import DEFAULT_CHUNKSIZE, read_survey_chunked
+from data.instrument import set_rows, stage
+from data.jobs import checkpoint
+from data.scoring import DEFAULT_PROFILE, ScoringProfile
+
+# Out-of-core backend: survey rows live in a local SQLite file instead of a
+# DataFrame. Uploads are streamed in chunks into the file, and the sidebar
+# filters plus the group x month count / sum / sum-of-squares aggregation run
+# as SQL, so only the small aggregate table comes back into Python. Scoring
+# then goes through the same kernel as the in-memory cube.
+#
+# SqlSurveyCube stands in for SurveyCube wherever the app uses a cube. Each
+# query opens its own read-only connection, so background jobs can share one.
+#
+#     python -m data.sql_store build STORE_DIR survey.csv hr.csv
+#     python -m data.sql_store score STORE_DIR/<id>.sqlite --agg-level Location --month 2025-09
+
+SCHEMA_VERSION = 1
+STORE_SUFFIX = ".sqlite"
+
+_STATS_SQL = ", ".join(
+    ["COUNT(*) AS responses"] +
+    [f"COUNT({q}) AS {q}_n" for q in Q_ALL] +
+    [f"TOTAL({q}) AS {q}_sum" for q in Q_ALL] +
+    [f"TOTAL({q} * {q}) AS {q}_sumsq" for q in Q_ALL]
+)
+
+
+def _where(filters, extra=()):
+    # One json_each() parameter per filtered dimension, however many values
+    clauses, params = list(extra), []
+    for key, column in FILTER_COLUMNS.items():
+        values = (filters or {}).get(key)
+        if values is None:
+            continue
+        clauses.append(f"{column} IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps([v.item() if hasattr(v, "item") else v for v in values]))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+class SqlSurveyCube(SurveyCube):
+    def __init__(self, path, rows, options, dataset_id=None):
+        self.path = path
+        self.rows_stored = rows
+        self.dataset_id = dataset_id
+        self._uri = Path(path).resolve().as_uri() + "?mode=ro"
+        self._options = options
+
+    def _query(self, sql, params=()):
+        with closing(sqlite3.connect(self._uri, uri=True, check_same_thread=False)) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def __len__(self):
+        return self.rows_stored
+
+    @property
+    def nbytes(self):
+        # Rows stay on disk; only the option lists are held in memory
+        return sum(len(values) * 64 for values in self._options.values())
+
+    def options(self, column):
+        # Collected while loading, so the sidebar never scans the table
+        return list(self._options[column])
+
+    def select(self, filters):
+        raise TypeError("SqlSurveyCube has no cell mask; use responses(filters) or rows(filters)")
+
+    def responses(self, filters=None):
+        where, params = _where(filters)
+        return int(self._query(f"SELECT COUNT(*) AS n FROM responses{where}", params)["n"].iloc[0])
+
+    def rows(self, filters=None):
+        where, params = _where(filters)
+        return self._query(f"SELECT * FROM responses{where}", params)
+
+    def group_counts(self, columns, filters=None):
+        keys = list(columns) + ["month"]
+        where, params = _where(filters, [f"{col} IS NOT NULL" for col in columns])
+        return self._query(
+            f"SELECT {', '.join(keys)}, COUNT(*) AS responses FROM responses{where} "
+            f"GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}",
+            params,
+        )
+
+    def group_stats(self, columns, filters=None):
+        # Group x month sufficient statistics in STAT_COLS layout, pushed down;
+        # level_stats() rolls coarser levels up from this in memory
+        keys = list(columns) + ["month"]
+        where, params = _where(filters, [f"{col} IS NOT NULL" for col in columns])
+        with stage("sql_aggregate"):
+            stats = self._query(
+                f"SELECT {', '.join(keys)}, {_STATS_SQL} FROM responses{where} "
+                f"GROUP BY {', '.join(keys)} ORDER BY {', '.join(keys)}",
+                params,
+            )
+            set_rows(len(stats))
+        return stats
+
+
+def store_path(root, dataset_id):
+    return os.path.join(root, f"{dataset_id}{STORE_SUFFIX}")
+
+
+def build_store(path, survey_src, hr_src, chunksize=DEFAULT_CHUNKSIZE, dataset_id=None):
+    # Streams the survey into a fresh SQLite file next to path, then publishes
+    # it atomically; returns (cube, hr, warnings, report) like a parse.
+    root = os.path.dirname(os.path.abspath(path))
+    os.makedirs(root, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".build.", suffix=STORE_SUFFIX, dir=root)
+    os.close(fd)
+    try:
+        with closing(sqlite3.connect(tmp)) as conn:
+            conn.execute("PRAGMA journal_mode = OFF")
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("CREATE TABLE responses ({})".format(
+                ", ".join(CELL_KEYS + [f"{q} REAL" for q in Q_ALL] + ["timestamp TEXT"])))
+
+            seen = {col: set() for col in CELL_KEYS}
+
+            def sink(chunk):
+                for col in CELL_KEYS:
+                    seen[col].update(chunk[col].dropna().unique())
+                frame = chunk[CELL_KEYS + Q_ALL].astype({col: object for col in CELL_KEYS})
+                frame["timestamp"] = chunk["timestamp"].dt.strftime("%Y-%m-%d %H:%M:%S")
+                frame.to_sql("responses", conn, if_exists="append", index=False)
+
+            with stage("sql_load"):
+                _, warnings, report = read_survey_chunked(survey_src, chunksize=chunksize, sink=sink)
+                set_rows(report["rows_kept"])
+            try:
+                hr = pd.read_csv(hr_src)
+            except Exception as e:
+                raise DataValidationError(f"Error reading CSV files: {e}") from e
+            hr = validate_hr(hr)
+
+            checkpoint(0.95, "Indexing survey store")
+            with stage("sql_index"):
+                conn.execute("CREATE INDEX responses_month ON responses (month)")
+            hr.to_sql("hr", conn, index=False)
+            options = {col: sorted(v.item() if hasattr(v, "item") else v for v in values)
+                       for col, values in seen.items()}
+            meta = {
+                "version": SCHEMA_VERSION,
+                "dataset_id": dataset_id,
+                "rows": report["rows_kept"],
+                "options": options,
+                "warnings": warnings,
+                "report": report,
+            }
+            conn.execute("CREATE TABLE meta (value TEXT)")
+            conn.execute("INSERT INTO meta VALUES (?)", (json.dumps(meta),))
+            conn.commit()
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    return SqlSurveyCube(path, report["rows_kept"], options, dataset_id), hr, warnings, report
+
+
+def open_store(path):
+    # Returns (cube, hr, warnings, report), or None for a store from another schema
+    uri = Path(path).resolve().as_uri() + "?mode=ro"
+    with closing(sqlite3.connect(uri, uri=True)) as conn:
+        meta = json.loads(conn.execute("SELECT value FROM meta").fetchone()[0])
+        if meta.get("version") != SCHEMA_VERSION:
+            return None
+        hr = pd.read_sql_query("SELECT * FROM hr", conn)
+    cube = SqlSurveyCube(path, meta["rows"], meta["options"], meta["dataset_id"])
+    return cube, hr, meta["warnings"], meta["report"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m data.sql_store",
+        description="Build and query out-of-core SQLite survey stores.",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build_cmd = sub.add_parser("build", help="stream a survey/HR CSV pair into a store")
+    build_cmd.add_argument("store_dir")
+    build_cmd.add_argument("survey_csv")
+    build_cmd.add_argument("hr_csv")
+    build_cmd.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+
+    score_cmd = sub.add_parser("score", help="score a store with filters pushed down to SQL")
+    score_cmd.add_argument("store")
+    score_cmd.add_argument("--agg-level", choices=list(GROUP_KEY_MAP), default="Department")
+    score_cmd.add_argument("--month", action="append", help="month to include (repeatable; default: all)")
+    score_cmd.add_argument("--department", action="append", help="department to include (repeatable)")
+    score_cmd.add_argument("--role", action="append", help="role level to include (repeatable)")
+    score_cmd.add_argument("--location", action="append", help="location to include (repeatable)")
+    score_cmd.add_argument("--profile", default=None, help="scoring profile JSON (default: built-in weights)")
+    score_cmd.add_argument("--output", default=None, help="write results CSV here (default: stdout)")
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    if args.command == "build":
+        dataset_id = fingerprint(args.survey_csv, args.hr_csv)
+        path = store_path(args.store_dir, dataset_id)
+        if os.path.exists(path):
+            print(f"{path} already built")
+            return 0
+        try:
+            cube, _, warnings, _ = build_store(path, args.survey_csv, args.hr_csv, args.chunksize, dataset_id)
+        except DataValidationError as e:
+            print(f"error: {e}", file=sys.stderr)
+            return 1
+        for message in warnings:
+            print(f"warning: {message}", file=sys.stderr)
+        print(f"{path}: {len(cube):,} responses ({time.perf_counter() - start:.1f}s)")
+    elif args.command == "score":
+        opened = open_store(args.store)
+        if opened is None:
+            print(f"error: {args.store} was built by another version; rebuild it", file=sys.stderr)
+            return 1
+        cube, hr, _, _ = opened
+        profile = ScoringProfile.from_json(args.profile) if args.profile else DEFAULT_PROFILE
+        filters = {"months": args.month, "departments": args.department,
+                   "roles": args.role, "locations": args.location}
+        results = cube.compute_cri(hr, args.agg_level, filters, profile)
+        results.to_csv(args.output or sys.stdout, index=False)
+        print(f"{len(results)} rows from {len(cube):,} responses ({time.perf_counter() - start:.2f}s)",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
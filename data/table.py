@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from data.engine import group_columns
+
+# Server-side paging for the Signal Drivers table. A ResultTable wraps one
+# results frame: sort orders are computed once per (column, direction) and
+# reused, and each search / filter / sort selection is kept as an array of
+# row positions. page() slices those positions and materializes only the
+# visible rows, so once a selection is built, turning pages costs O(page size)
+# whatever the total row count.
+
+PAGE_SIZES = [25, 50, 100, 250]
+DEFAULT_PAGE_SIZE = 50
+SELECTION_CACHE_SIZE = 16
+
+
+class ResultTable:
+    def __init__(self, results, agg_level):
+        # Single-dimension levels: the key column duplicates the group label
+        columns = group_columns(agg_level)
+        frame = results.drop(columns=columns) if len(columns) == 1 else results
+        self.frame = frame.rename(columns={"group": "Group"}).reset_index(drop=True)
+        self._search = self.frame["Group"].astype(str).str.lower()
+        self._orders = {}
+        self._selections = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def columns(self):
+        return list(self.frame.columns)
+
+    def order(self, column, ascending=True):
+        # Row positions sorted by one column (stable, missing values last)
+        key = (column, ascending)
+        with self._lock:
+            if key not in self._orders:
+                ordered = self.frame[column].sort_values(ascending=ascending, kind="stable", na_position="last")
+                self._orders[key] = ordered.index.to_numpy()
+            return self._orders[key]
+
+    def select(self, sort=None, ascending=True, search="", filters=None):
+        # Row positions matching search (substring of the group label) and
+        # filters ({column: allowed values}), in sort order
+        search = search.strip().lower()
+        filters = {col: tuple(values) for col, values in (filters or {}).items() if values}
+        key = (sort, ascending, search, tuple(sorted(filters.items())))
+        with self._lock:
+            if key in self._selections:
+                self._selections.move_to_end(key)
+                return self._selections[key]
+
+        order = self.order(sort, ascending) if sort else np.arange(len(self.frame))
+        mask = np.ones(len(self.frame), dtype=bool)
+        if search:
+            mask &= self._search.str.contains(search, regex=False).to_numpy()
+        for col, values in filters.items():
+            mask &= self.frame[col].isin(values).to_numpy()
+        positions = order[mask[order]]
+
+        with self._lock:
+            self._selections[key] = positions
+            while len(self._selections) > SELECTION_CACHE_SIZE:
+                self._selections.popitem(last=False)
+        return positions
+
+    def page(self, positions, page, size=DEFAULT_PAGE_SIZE):
+        # Rows of one page (0-based) of a selection
+        start = page * size
+        return self.frame.iloc[positions[start:start + size]]
+
+
+def page_count(positions, size=DEFAULT_PAGE_SIZE):
+    return max(1, -(-len(positions) // size))
@@ -0,0 +1,133 @@
+
+import numpy as np
+import pandas as pd
+
+# Timestamp ingestion with format sniffing. Survey exports repeat the same few
+# date strings millions of times, so values are factorized first and only the
+# distinct strings are parsed: each format class with one vectorized
+# explicit-format call, instead of pandas' per-element format inference.
+
+# (label, strptime format, shape) — checked in order. Slash dates get one
+# order per column (see slash_order), so MM/DD and DD/MM never mix.
+TIMESTAMP_FORMATS = [
+    ("YYYY-MM-DD", "%Y-%m-%d", r"\d{4}-\d{1,2}-\d{1,2}"),
+    ("YYYY-MM-DD HH:MM:SS", "%Y-%m-%d %H:%M:%S", r"\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{2}:\d{2}"),
+    ("YYYY-MM-DDTHH:MM:SS", "%Y-%m-%dT%H:%M:%S", r"\d{4}-\d{1,2}-\d{1,2}T\d{1,2}:\d{2}:\d{2}"),
+    ("YYYY-MM-DD HH:MM", "%Y-%m-%d %H:%M", r"\d{4}-\d{1,2}-\d{1,2} \d{1,2}:\d{2}"),
+    ("YYYY/MM/DD", "%Y/%m/%d", r"\d{4}/\d{1,2}/\d{1,2}"),
+    ("MM/DD/YYYY", "%m/%d/%Y", r"\d{1,2}/\d{1,2}/\d{4}"),
+    ("DD/MM/YYYY", "%d/%m/%Y", r"\d{1,2}/\d{1,2}/\d{4}"),
+    ("MM/DD/YYYY HH:MM", "%m/%d/%Y %H:%M", r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}"),
+    ("MM/DD/YYYY HH:MM:SS", "%m/%d/%Y %H:%M:%S", r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2}"),
+    ("DD/MM/YYYY HH:MM", "%d/%m/%Y %H:%M", r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}"),
+    ("DD/MM/YYYY HH:MM:SS", "%d/%m/%Y %H:%M:%S", r"\d{1,2}/\d{1,2}/\d{4} \d{1,2}:\d{2}:\d{2}"),
+    ("DD.MM.YYYY", "%d.%m.%Y", r"\d{1,2}\.\d{1,2}\.\d{4}"),
+    ("YYYY-MM", "%Y-%m", r"\d{4}-\d{1,2}"),
+]
+
+INFERRED = "inferred"
+INVALID = "invalid"
+
+SNIFF_SAMPLE_SIZE = 1000
+
+_SLASH_DATE = r"(\d{1,2})/(\d{1,2})/\d{4}"
+# Trailing UTC offset or Z; dropped so times keep their local wall-clock month
+_UTC_OFFSET = r"\s*(?:Z|[+-]\d{2}:?\d{2})$"
+
+
+def slash_evidence(values):
+    # "DD/MM" if any slash date has a first field over 12, "MM/DD" if any has
+    # a second field over 12, None while every slash date is ambiguous
+    fields = pd.Series(values, dtype="object").dropna().astype(str).str.strip().str.extract("^" + _SLASH_DATE)
+    if (pd.to_numeric(fields[0], errors="coerce") > 12).any():
+        return "DD/MM"
+    if (pd.to_numeric(fields[1], errors="coerce") > 12).any():
+        return "MM/DD"
+    return None
+
+
+def slash_order(values):
+    # One order per column: day-first if any first field is over 12, else
+    # month-first (pandas' default reading of ambiguous dates)
+    return slash_evidence(values) or "MM/DD"
+
+
+def sniff_formats(values, sample_size=SNIFF_SAMPLE_SIZE):
+    # Formats whose shape matches at least one sampled value, in priority order
+    sample = pd.Series(values, dtype="object").dropna()
+    if len(sample) > sample_size:
+        sample = sample.sample(sample_size, random_state=0)
+    sample = sample.astype(str).str.strip()
+    return [fmt for fmt in TIMESTAMP_FORMATS if sample.str.fullmatch(fmt[2]).any()]
+
+
+def parse_timestamps(series, sample_size=SNIFF_SAMPLE_SIZE, order=None):
+    # order: "MM/DD" or "DD/MM" decided by the caller for the whole column
+    # (chunked and incremental readers); by default taken from series itself
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series, {"datetime": int(series.notna().sum()), INVALID: int(series.isna().sum())}
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype="object").astype(str).str.strip()
+
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype="datetime64[ns]")
+    labels = np.full(len(uniques), INVALID, dtype=object)
+    pending = np.ones(len(uniques), dtype=bool)
+
+    # Sniffed formats first, then the rest of the catalogue for stragglers;
+    # slash dates use the one order chosen for the whole column
+    order = order or slash_order(uniques)
+    excluded = "MM/DD" if order == "DD/MM" else "DD/MM"
+    sniffed = sniff_formats(uniques, sample_size)
+    candidates = [fmt for fmt in sniffed + [fmt for fmt in TIMESTAMP_FORMATS if fmt not in sniffed]
+                  if not fmt[0].startswith(excluded)]
+    for label, fmt, shape in candidates:
+        if not pending.any():
+            break
+        mask = pending & uniques.str.fullmatch(shape).to_numpy()
+        if not mask.any():
+            continue
+        values = pd.to_datetime(uniques[mask], format=fmt, errors="coerce")
+        ok = values.notna().to_numpy()
+        hit = np.flatnonzero(mask)[ok]
+        parsed.iloc[hit] = values[ok].to_numpy()
+        labels[hit] = label
+        pending[hit] = False
+
+    # Anything unrecognised falls back to pandas' own per-element inference
+    if pending.any():
+        rest = np.flatnonzero(pending)
+        local = uniques.iloc[rest].str.replace(_UTC_OFFSET, "", regex=True)
+        values = pd.to_datetime(local, errors="coerce", format="mixed", dayfirst=order == "DD/MM")
+        ok = values.notna().to_numpy()
+        parsed.iloc[rest[ok]] = values[ok].to_numpy()
+        labels[rest[ok]] = INFERRED
+
+    # Missing cells carry code -1, which picks the trailing NaT
+    lookup = np.append(parsed.to_numpy(), np.datetime64("NaT", "ns"))
+    timestamps = pd.Series(lookup[codes], index=series.index)
+
+    row_labels = np.where(codes < 0, len(labels), codes)
+    label_counts = np.bincount(row_labels, minlength=len(labels) + 1)
+    report = {}
+    for label, count in zip(list(labels) + [INVALID], label_counts):
+        if count:
+            report[label] = report.get(label, 0) + int(count)
+    return timestamps, report
+
+
+def derive_month(timestamps):
+    # 'YYYY-MM' labels via datetime64[M] codes, without building Period objects
+    months = timestamps.to_numpy(dtype="datetime64[ns]").astype("datetime64[M]")
+    codes, uniques = pd.factorize(months, use_na_sentinel=False)
+    labels = np.datetime_as_string(np.asarray(uniques, dtype="datetime64[M]"), unit="M")
+    return pd.Series(labels[codes], index=timestamps.index)
+
+
+def describe_formats(report):
+    parts = [f"{label} ({count:,} rows)" for label, count in sorted(report.items(), key=lambda kv: -kv[1])]
+    return ", ".join(parts)
+
+
+def is_mixed(report):
+    return len([label for label in report if label != INVALID]) > 1
@@ -0,0 +1,159 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from data.engine import COMPONENTS
+from data.scoring import COMPONENT_LABELS
+
+# Rolling / EWMA trends and anomaly flags over monthly results. TrendState
+# keeps O(1) running state per group and signal (the CRI and its five
+# components): an EWMA level and variance, the last value, and the smoothed
+# month-over-month change (an EWMA of changes, or a ring buffer of the last
+# `window` changes with their running sum). update() folds one month in at
+# O(groups), so appending a month never revisits the series; from_results()
+# replays a whole results frame month by month.
+#
+# A group is flagged when a signal lands at least min_jump points and
+# z_threshold EW standard deviations away from its EWMA level, once the group
+# has min_periods months of history.
+
+SIGNALS = ["CRI"] + COMPONENTS
+SIGNAL_LABELS = dict(zip(SIGNALS, ["CRI"] + COMPONENT_LABELS))
+TREND_METHODS = ("ewma", "rolling")
+
+
+@dataclass(frozen=True)
+class TrendSettings:
+    # "ewma" or "rolling" smoothing of month-over-month changes
+    method: str = "ewma"
+    # Rolling window / EWMA span, in months with data
+    window: int = 3
+    # Anomaly: |value - EWMA level| >= z_threshold EW std devs and >= min_jump points
+    z_threshold: float = 3.0
+    min_jump: float = 10.0
+    # Months of history a group needs before it can be flagged
+    min_periods: int = 3
+
+    @property
+    def alpha(self):
+        return 2.0 / (self.window + 1)
+
+
+DEFAULT_TREND_SETTINGS = TrendSettings()
+
+
+class TrendState:
+    def __init__(self, settings=DEFAULT_TREND_SETTINGS):
+        if settings.method not in TREND_METHODS:
+            raise ValueError(f"Unknown trend method {settings.method!r}; expected one of {TREND_METHODS}")
+        self.settings = settings
+        self.month = None
+        self.groups = {}
+        n_signals = len(SIGNALS)
+        self.n = np.zeros((0, n_signals), dtype=np.int64)
+        self.last = np.zeros((0, n_signals))
+        self.level = np.zeros((0, n_signals))
+        self.var = np.zeros((0, n_signals))
+        self.slope = np.zeros((0, n_signals))
+        # Rolling method: last `window` changes per group and their sum
+        self.changes = np.zeros((settings.window, 0, n_signals))
+        self.change_sum = np.zeros((0, n_signals))
+
+    @classmethod
+    def from_results(cls, results, settings=DEFAULT_TREND_SETTINGS):
+        # (state, trend rows) after replaying every month of a results frame
+        state = cls(settings)
+        return state, state.extend(results)
+
+    def __len__(self):
+        return len(self.groups)
+
+    def _rows(self, labels):
+        new = [label for label in dict.fromkeys(labels) if label not in self.groups]
+        if new:
+            start = len(self.groups)
+            self.groups.update((label, start + i) for i, label in enumerate(new))
+            pad = ((0, len(new)), (0, 0))
+            self.n = np.pad(self.n, pad)
+            self.last, self.level, self.var, self.slope, self.change_sum = (
+                np.pad(a, pad) for a in (self.last, self.level, self.var, self.slope, self.change_sum)
+            )
+            self.changes = np.pad(self.changes, ((0, 0),) + pad)
+        return np.array([self.groups[label] for label in labels], dtype=np.int64)
+
+    def extend(self, results):
+        # Folds in every month of results after the state's last month
+        if self.month is not None:
+            results = results[results['month'] > self.month]
+        frames = [self.update(month, rows) for month, rows in results.groupby('month', sort=True)]
+        return pd.concat(frames, ignore_index=True) if frames else _empty_frame()
+
+    def update(self, month, rows):
+        # rows: one month of results (group + SIGNALS); returns that month's
+        # trend and anomaly rows
+        if self.month is not None and month <= self.month:
+            raise ValueError(f"Months must be added in order: {month} after {self.month}")
+        s = self.settings
+        idx = self._rows(rows['group'].tolist())
+        x = rows[SIGNALS].to_numpy(dtype=np.float64)
+        seen = ~np.isnan(x)
+        n = self.n[idx]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Anomalies are judged against the state before this month
+            deviation = x - self.level[idx]
+            std = np.sqrt(self.var[idx])
+            flagged = (seen & (n >= s.min_periods) & (np.abs(deviation) >= s.min_jump) &
+                       (np.abs(deviation) >= s.z_threshold * std))
+            z = np.where(flagged, np.abs(deviation) / np.maximum(std, 1e-9), 0.0)
+
+            # Month-over-month change and its smoothed trend
+            change = np.where(seen & (n > 0), x - self.last[idx], np.nan)
+            has_change = ~np.isnan(change)
+            n_changes = np.maximum(n - 1, 0)
+            if s.method == "ewma":
+                slope = np.where(n_changes > 0, s.alpha * change + (1 - s.alpha) * self.slope[idx], change)
+                self.slope[idx] = np.where(has_change, slope, self.slope[idx])
+                trend = np.where(n_changes + has_change > 0, self.slope[idx], np.nan)
+            else:
+                slot = n_changes % s.window
+                full = n_changes >= s.window
+                cell = (slot, idx[:, None], np.arange(len(SIGNALS)))
+                old = self.changes[cell]
+                total = self.change_sum[idx] - np.where(full, old, 0.0) + np.nan_to_num(change)
+                self.change_sum[idx] = np.where(has_change, total, self.change_sum[idx])
+                self.changes[cell] = np.where(has_change, change, old)
+                count = np.minimum(n_changes + has_change, s.window)
+                trend = np.where(count > 0, self.change_sum[idx] / count, np.nan)
+
+            # EWMA level and variance (incremental form)
+            diff = x - self.level[idx]
+            step = s.alpha * diff
+            level = np.where(n > 0, self.level[idx] + step, x)
+            var = np.where(n > 0, (1 - s.alpha) * (self.var[idx] + diff * step), 0.0)
+            self.level[idx] = np.where(seen, level, self.level[idx])
+            self.var[idx] = np.where(seen, var, self.var[idx])
+            self.last[idx] = np.where(seen, x, self.last[idx])
+            self.n[idx] = n + seen
+        self.month = month
+
+        strongest = z.argmax(axis=1)
+        anomaly = flagged.any(axis=1)
+        frame = pd.DataFrame({"group": rows['group'].to_numpy(), "month": month})
+        for j, name in enumerate(SIGNALS):
+            frame[f"{name}_trend"] = trend[:, j]
+        frame["anomaly"] = anomaly
+        frame["anomaly_signal"] = np.where(anomaly, np.array(SIGNALS, dtype=object)[strongest], None)
+        frame["anomaly_change"] = np.where(anomaly, deviation[np.arange(len(idx)), strongest], np.nan)
+        return frame
+
+
+def _empty_frame():
+    columns = ["group", "month"] + [f"{name}_trend" for name in SIGNALS] + ["anomaly", "anomaly_signal",
+                                                                            "anomaly_change"]
+    return pd.DataFrame(columns=columns)
+
+
+def trend_rows(results, settings=DEFAULT_TREND_SETTINGS):
+    return TrendState.from_results(results, settings)[1]
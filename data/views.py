@@ -0,0 +1,122 @@
+import threading
+from collections import Counter
+
+from data.engine import COMPONENTS
+from data.instrument import stage
+from data.scoring import COMPONENT_LABELS
+from data.table import ResultTable
+from data.trends import DEFAULT_TREND_SETTINGS, trend_rows
+
+# Derived views over one results frame, built lazily and at most once. Tabs
+# and charts read these instead of re-sorting and re-grouping results_df.
+# A ResultViews is cached next to the results it wraps, so reruns and
+# sessions that share a filter selection share its views too. `builds`
+# counts how often each view was computed and `reads` how often it was used.
+
+
+class ResultViews:
+    def __init__(self, results, history=None):
+        self.results = results
+        # Same groups over every month (when results cover only some), so
+        # trends and anomaly baselines see each group's full history
+        self.history = history
+        self.builds = Counter()
+        self.reads = Counter()
+        self._views = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name, build, key=None):
+        # key separates parameterized views (e.g. trend settings) under one name
+        slot = name if key is None else (name, key)
+        with self._lock:
+            self.reads[name] += 1
+            if slot not in self._views:
+                with stage(f"view:{name}"):
+                    self._views[slot] = build()
+                self.builds[name] += 1
+            return self._views[slot]
+
+    @property
+    def empty(self):
+        return self.results.empty
+
+    @property
+    def months(self):
+        return self._get("months", lambda: sorted(self.results['month'].unique()))
+
+    @property
+    def latest_month(self):
+        return self.months[-1] if self.months else None
+
+    @property
+    def previous_month(self):
+        return self.months[-2] if len(self.months) > 1 else None
+
+    @property
+    def current(self):
+        # Every group's row in the latest month
+        return self._get("current", lambda: self.results[self.results['month'] == self.latest_month])
+
+    @property
+    def previous(self):
+        def build():
+            if self.previous_month is None:
+                return None
+            return self.results[self.results['month'] == self.previous_month]
+        return self._get("previous", build)
+
+    @property
+    def latest(self):
+        # Each group's most recent row, indexed by group
+        return self._get("latest", lambda: self.results.sort_values('month').groupby('group').last())
+
+    @property
+    def ranked(self):
+        return self._get("ranked", lambda: self.latest.sort_values('CRI', ascending=False))
+
+    @property
+    def top_row(self):
+        return self.ranked.iloc[0]
+
+    @property
+    def top_drivers(self):
+        # (label, score) for the highest-CRI group's components, strongest first
+        def build():
+            row = self.top_row
+            scores = [(label, row[col]) for label, col in zip(COMPONENT_LABELS, COMPONENTS)]
+            return sorted(scores, key=lambda x: x[1], reverse=True)
+        return self._get("top_drivers", build)
+
+    @property
+    def deltas(self):
+        # Month-over-month CRI change per group, against its previous month with data
+        def build():
+            ordered = self.results.sort_values('month')
+            return ordered.groupby('group')['CRI'].diff().groupby(ordered['group']).last()
+        return self._get("deltas", build)
+
+    def trends(self, settings=DEFAULT_TREND_SETTINGS):
+        # Per group-month smoothed trends and anomaly flags (data.trends),
+        # replayed over the full history and cut to the selected months
+        def build():
+            if self.history is None:
+                return trend_rows(self.results, settings)
+            rows = trend_rows(self.history, settings)
+            return rows[rows['month'].isin(self.months)].reset_index(drop=True)
+        return self._get("trends", build, key=settings)
+
+    def anomalies(self, settings=DEFAULT_TREND_SETTINGS):
+        # Groups flagged in the latest month, largest jump first
+        def build():
+            trends = self.trends(settings)
+            flagged = trends[trends['anomaly'] & (trends['month'] == self.latest_month)]
+            return flagged.sort_values('anomaly_change', key=abs, ascending=False)
+        return self._get("anomalies", build, key=settings)
+
+    def table(self, agg_level):
+        # Sorted / searchable pages of the results for the Signal Drivers tab
+        return self._get("table", lambda: ResultTable(self.results, agg_level), key=agg_level)
+
+    def stats(self):
+        with self._lock:
+            return {name: {"builds": self.builds[name], "reads": self.reads[name]} for name in self.reads}
@@ -0,0 +1,335 @@
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+import pandas as pd
+
+from data.engine import DIMENSIONS, Q_ALL, DataValidationError, validate_hr, validate_survey
+from data.cube import SurveyCube
+from data.incremental import STATE_FILE, IncrementalPipeline, fold_cells
+from data.timestamps import slash_evidence
+
+# Watch mode: tails a drop directory (or one append-only file) of survey
+# response batches. DropWatcher remembers a byte offset per file and parses
+# only the complete lines past it, so each poll reads just the new records:
+# CSV files (the header is kept from the first read) and JSON Lines files.
+# The CLI folds new rows into an IncrementalPipeline, which rescores only the
+# affected group-month aggregates and persists them. Dashboards (SurveyFeed)
+# score on demand from the cube, so their LiveCube only folds rows into the
+# cube cells. Every fold bumps the version and with it the cube's dataset_id,
+# so dashboards pick up fresh results on their next rerun. The HR file is
+# re-read whenever it changes and replaces the previous HR table.
+#
+#     python -m data.watch STATE_DIR DROP_DIR [--hr HR_CSV] [--interval 5]
+
+SURVEY_SUFFIXES = (".csv", ".jsonl", ".ndjson")
+DEFAULT_HR_NAME = "hr.csv"
+DEFAULT_POLL_INTERVAL = 5.0
+OFFSETS_FILE = "watch.json"
+
+
+class Batch:
+    def __init__(self, frames=None, hr=None, offsets=None, hr_mtime=None, warnings=None):
+        # frames: [(file name, new rows, slash-date order)], one entry per file
+        # with new records
+        self.frames = frames or []
+        self.hr = hr
+        self.offsets = offsets or {}
+        self.hr_mtime = hr_mtime
+        self.warnings = warnings or []
+
+    def __bool__(self):
+        return bool(self.frames) or self.hr is not None
+
+
+class DropWatcher:
+    def __init__(self, path, hr_path=None, offsets=None, hr_mtime=None):
+        self.path = path
+        if hr_path is None and os.path.isdir(path):
+            hr_path = os.path.join(path, DEFAULT_HR_NAME)
+        self.hr_path = hr_path
+        # file -> {"offset": bytes consumed, "header": CSV header line,
+        #          "order": the file's MM/DD vs DD/MM order once a date settles it}
+        self.offsets = dict(offsets or {})
+        self.hr_mtime = hr_mtime
+
+    def files(self):
+        if os.path.isfile(self.path):
+            return [self.path]
+        if not os.path.isdir(self.path):
+            return []
+        hr_path = os.path.abspath(self.hr_path) if self.hr_path else None
+        files = []
+        for name in sorted(os.listdir(self.path)):
+            full = os.path.join(self.path, name)
+            # Dot / tilde files are editor or in-flight copies
+            if (name.startswith((".", "~")) or not name.lower().endswith(SURVEY_SUFFIXES) or
+                    os.path.abspath(full) == hr_path or not os.path.isfile(full)):
+                continue
+            files.append(full)
+        return files
+
+    def _read_new(self, path):
+        # (frame or None, new offset state) for the complete records past the offset
+        state = self.offsets.get(path, {"offset": 0, "header": None})
+        size = os.path.getsize(path)
+        if size < state["offset"]:
+            # Truncated or replaced: read it again from the start
+            state = {"offset": 0, "header": None}
+        if size == state["offset"]:
+            return None, state
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            data = f.read(size - state["offset"])
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return None, state  # the first record is still being written
+        data = data[:end]
+        state = {**state, "offset": state["offset"] + end}
+
+        if path.lower().endswith(".csv"):
+            if state["header"] is None:
+                first = data.index(b"\n") + 1
+                state["header"] = data[:first].decode("utf-8-sig")
+                data = data[first:]
+            if not data.strip():
+                return None, state
+            return pd.read_csv(io.BytesIO(state["header"].encode() + data)), state
+        if not data.strip():
+            return None, state
+        return pd.read_json(io.BytesIO(data), lines=True, dtype=False, convert_dates=False), state
+
+    def poll(self):
+        # New survey rows per file and a changed HR file. Offsets only move
+        # once the batch is committed.
+        frames, offsets, warnings = [], {}, []
+        for path in self.files():
+            try:
+                frame, offsets[path] = self._read_new(path)
+            except Exception as e:
+                # Skip the unreadable records rather than retrying them forever
+                offsets[path] = self._skip(path)
+                warnings.append(f"Skipped unreadable records in {os.path.basename(path)}: {e}")
+                continue
+            if frame is None or not len(frame):
+                continue
+            # Slash dates keep one order per file across polls; until a date
+            # settles it they read month-first, like a whole-file parse
+            order = offsets[path].get("order")
+            if order is None and 'timestamp' in frame.columns:
+                order = slash_evidence(frame['timestamp'].astype(str))
+                if order is not None:
+                    offsets[path] = {**offsets[path], "order": order}
+            frames.append((os.path.basename(path), frame, order or "MM/DD"))
+
+        hr, hr_mtime = None, self.hr_mtime
+        if self.hr_path and os.path.isfile(self.hr_path):
+            mtime = os.path.getmtime(self.hr_path)
+            if mtime != self.hr_mtime:
+                try:
+                    hr = pd.read_csv(self.hr_path)
+                except Exception as e:
+                    raise DataValidationError(f"Error reading CSV files: {e}") from e
+                hr = validate_hr(hr)
+                hr_mtime = mtime
+
+        return Batch(frames, hr, offsets, hr_mtime, warnings)
+
+    def _skip(self, path):
+        # Offset state past every complete record currently in path
+        state = self.offsets.get(path, {"offset": 0, "header": None})
+        with open(path, "rb") as f:
+            data = f.read()
+        header = state["header"]
+        if header is None and path.lower().endswith(".csv") and b"\n" in data:
+            header = data[:data.index(b"\n") + 1].decode("utf-8-sig")
+        return {**state, "offset": max(data.rfind(b"\n") + 1, state["offset"]), "header": header}
+
+    def commit(self, batch):
+        self.offsets.update(batch.offsets)
+        self.hr_mtime = batch.hr_mtime
+
+    def to_dict(self):
+        return {"offsets": self.offsets, "hr_mtime": self.hr_mtime}
+
+
+class LiveCube:
+    # The part of an IncrementalPipeline a dashboard reads: the cube and the
+    # HR table, with no stored scores or trend state to keep up to date
+    def __init__(self, cube, hr):
+        self.state_id = uuid.uuid4().hex
+        self.cube = cube
+        self.hr = hr
+        self.version = 0
+        self._stamp()
+
+    @classmethod
+    def from_frames(cls, survey, hr):
+        return cls(SurveyCube.from_survey(survey), hr)
+
+    @property
+    def months(self):
+        return self.cube.options('month')
+
+    def _stamp(self):
+        self.cube.dataset_id = f"{self.state_id}:{self.version}"
+
+    def append(self, survey_new, hr_new=None, replace_hr=False):
+        start = time.perf_counter()
+        self.cube, affected = fold_cells(self.cube, survey_new)
+        if hr_new is not None and replace_hr:
+            self.hr = hr_new
+        elif hr_new is not None and len(hr_new):
+            hr = pd.concat([self.hr, hr_new], ignore_index=True)
+            self.hr = hr.drop_duplicates(['department', 'month'], keep='last', ignore_index=True)
+        self.version += 1
+        self._stamp()
+        return {"rows": len(survey_new), "months": sorted(affected), "rescored_months": [],
+                "seconds": time.perf_counter() - start}
+
+
+def ingest(watcher, pipeline=None, factory=IncrementalPipeline):
+    # Folds what is new into pipeline (built with factory.from_frames from the
+    # first batch once both survey rows and HR exist); returns
+    # (pipeline, report or None, warnings)
+    batch = watcher.poll()
+    warnings = list(batch.warnings)
+    if not batch:
+        watcher.commit(batch)
+        return pipeline, None, warnings
+
+    # Each file is validated on its own: files legitimately differ in
+    # timestamp format, and one malformed file must not drop the others
+    surveys = []
+    for name, frame, order in batch.frames:
+        try:
+            survey, survey_warnings, _ = validate_survey(frame, slash_order=order)
+        except DataValidationError as e:
+            warnings.append(f"Skipped {len(frame):,} new rows in {name}: {e}")
+            continue
+        surveys.append(survey)
+        warnings.extend(f"{name}: {message}" for message in survey_warnings)
+    survey = pd.concat(surveys, ignore_index=True) if surveys else None
+
+    if pipeline is None and (survey is None or batch.hr is None):
+        if survey is None:
+            batch.hr, batch.hr_mtime = None, watcher.hr_mtime
+            watcher.commit(batch)
+        return None, None, warnings  # wait for both survey rows and HR
+    if survey is None and batch.hr is None:
+        watcher.commit(batch)
+        return pipeline, None, warnings
+
+    if pipeline is None:
+        start = time.perf_counter()
+        pipeline = factory.from_frames(survey, batch.hr)
+        report = {"rows": len(survey), "months": sorted(survey['month'].unique()),
+                  "rescored_months": pipeline.months, "seconds": time.perf_counter() - start}
+    else:
+        if survey is None:
+            survey = pd.DataFrame(columns=DIMENSIONS + ['month'] + Q_ALL)  # HR-only update
+        # The watcher re-reads the whole HR file, so it replaces the old table
+        report = pipeline.append(survey, batch.hr, replace_hr=True)
+    watcher.commit(batch)
+    return pipeline, report, warnings
+
+
+class SurveyFeed:
+    # One watched source shared by every dashboard session. poll() is
+    # thread-safe and rate-limited; version changes whenever data changed.
+    def __init__(self, path, hr_path=None, min_interval=1.0):
+        self.watcher = DropWatcher(path, hr_path)
+        self.min_interval = min_interval
+        self.pipeline = None
+        self.version = 0
+        self.updated = None
+        self.warnings = []
+        self._last_poll = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self.watcher.path
+
+    def poll(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and self._last_poll is not None and now - self._last_poll < self.min_interval:
+                return self.version
+            self._last_poll = now
+            pipeline, report, warnings = ingest(self.watcher, self.pipeline, LiveCube)
+            self.pipeline = pipeline
+            if warnings or report is not None:
+                self.warnings = warnings  # from the latest poll that did something
+            if report is not None:
+                self.version += 1
+                self.updated = time.time()
+            return self.version
+
+    def snapshot(self):
+        # (cube, hr, version), consistent with each other
+        with self._lock:
+            if self.pipeline is None:
+                return None, None, self.version
+            return self.pipeline.cube, self.pipeline.hr, self.version
+
+
+def _load(state_dir, path, hr_path):
+    offsets_path = os.path.join(state_dir, OFFSETS_FILE)
+    if not os.path.exists(os.path.join(state_dir, STATE_FILE)) or not os.path.exists(offsets_path):
+        return DropWatcher(path, hr_path), None
+    with open(offsets_path) as f:
+        saved = json.load(f)
+    return DropWatcher(path, hr_path, saved["offsets"], saved["hr_mtime"]), IncrementalPipeline.load(state_dir)
+
+
+def _save(state_dir, watcher, pipeline):
+    pipeline.save(state_dir)
+    path = os.path.join(state_dir, OFFSETS_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(watcher.to_dict(), f)
+    os.replace(path + ".tmp", path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m data.watch",
+        description="Fold survey batches dropped into a folder into a persisted CRI state as they arrive.",
+    )
+    parser.add_argument("state_dir", help="incremental state directory (created on first batch)")
+    parser.add_argument("path", help="drop directory of CSV / JSON Lines batches, or one append-only file")
+    parser.add_argument("--hr", default=None, help=f"HR metrics CSV (default: {DEFAULT_HR_NAME} in the drop directory)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_POLL_INTERVAL, help="seconds between polls")
+    parser.add_argument("--once", action="store_true", help="ingest what is there now and exit")
+    args = parser.parse_args(argv)
+
+    watcher, pipeline = _load(args.state_dir, args.path, args.hr)
+    try:
+        while True:
+            try:
+                pipeline, report, warnings = ingest(watcher, pipeline)
+            except DataValidationError as e:
+                print(f"error: {e}", file=sys.stderr)
+                return 1
+            for message in warnings:
+                print(f"warning: {message}", file=sys.stderr)
+            if report is not None:
+                _save(args.state_dir, watcher, pipeline)
+                print(f"ingested {report['rows']:,} rows for {', '.join(report['months']) or 'no new months'}; "
+                      f"rescored {len(report['rescored_months'])} month(s) in {report['seconds']:.2f}s", flush=True)
+            elif pipeline is None and args.once:
+                print("waiting for survey batches and an HR file", file=sys.stderr)
+            if args.once:
+                return 0
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,59 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.kernel_equivalence import check, random_case
+from data.cube import SurveyCube
+from data.disk_cache import DiskCache
+from data.engine import load_inputs
+from data.registry import DatasetRegistry
+
+# Arrow IPC round trips through the on-disk dataset cache
+pytest.importorskip("pyarrow")
+
+
+def _inputs():
+    survey, hr = random_case(np.random.default_rng(2), 800)
+    survey = survey.assign(timestamp=survey['month'] + "-15").drop(columns=['month'])
+    return survey.to_csv(index=False).encode(), hr.to_csv(index=False).encode()
+
+
+def test_round_trip(tmp_path):
+    survey_csv, hr_csv = _inputs()
+    survey, hr, warnings, report = load_inputs(io.BytesIO(survey_csv), io.BytesIO(hr_csv))
+    cube = SurveyCube.from_survey(survey, dataset_id="d1")
+    cache = DiskCache(str(tmp_path))
+    assert cache.save("d1", survey, hr, cube, warnings, report)
+    assert cache.entries() == ["d1"]
+
+    load_survey, cached_hr, cached_cube, cached_warnings, cached_report = cache.load("d1")
+    pd.testing.assert_frame_equal(load_survey().reset_index(drop=True), survey.reset_index(drop=True),
+                                  check_dtype=False)
+    pd.testing.assert_frame_equal(cached_hr, hr, check_dtype=False)
+    assert cached_warnings == warnings
+    assert cached_cube.dataset_id == "d1"
+    for agg_level in ["Department", "Location"]:
+        assert check(cube.compute_cri(hr, agg_level), cached_cube.compute_cri(cached_hr, agg_level)) is None
+
+
+def test_registry_serves_cache_hit_without_survey(tmp_path):
+    survey_csv, hr_csv = _inputs()
+    cache = DiskCache(str(tmp_path))
+    first = DatasetRegistry(disk_cache=cache).load(io.BytesIO(survey_csv), io.BytesIO(hr_csv))
+    registry = DatasetRegistry(disk_cache=cache)
+    second = registry.load(io.BytesIO(survey_csv), io.BytesIO(hr_csv))
+    assert registry.disk_hits == 1
+    assert second._survey is None  # loaded only on first use
+    assert len(second.survey) == len(first.survey)
+
+
+def test_unstorable_frame_skips_cache(tmp_path):
+    survey_csv, hr_csv = _inputs()
+    survey, hr, warnings, report = load_inputs(io.BytesIO(survey_csv), io.BytesIO(hr_csv))
+    survey['note'] = [1 if i % 2 else "text" for i in range(len(survey))]  # mixed object column
+    cache = DiskCache(str(tmp_path))
+    assert not cache.save("d2", survey, hr, SurveyCube.from_survey(survey), warnings, report)
+    assert "d2" not in cache
+    assert cache.entries() == []
@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+from benchmarks.kernel_equivalence import check, random_case
+from data.cube import SurveyCube
+from data.engine import GROUP_KEY_MAP, DataValidationError, compute_cri, validate_hr
+
+# An HR file without one of the metric columns: uploads are rejected, and
+# scoring called directly treats the absent metric as the org baseline in
+# both the pandas reference and the kernel, instead of turning every score NaN.
+
+
+def _case():
+    survey, hr = random_case(np.random.default_rng(4), 1500)
+    return survey, hr.drop(columns=['manager_escalations'])
+
+
+def test_validate_hr_rejects_missing_metric():
+    _, hr = _case()
+    with pytest.raises(DataValidationError, match="manager_escalations"):
+        validate_hr(hr)
+
+
+@pytest.mark.parametrize("agg_level", list(GROUP_KEY_MAP))
+def test_missing_metric_scores_as_baseline(agg_level):
+    survey, hr = _case()
+    reference = compute_cri(survey, hr, agg_level)
+    kernel = SurveyCube.from_survey(survey).compute_cri(hr, agg_level)
+    assert check(reference, kernel) is None
+    assert reference['hr_score'].notna().all() and reference['CRI'].notna().all()
+    assert kernel['hr_score'].notna().all() and kernel['CRI'].notna().all()
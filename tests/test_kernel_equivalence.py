@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from benchmarks.kernel_equivalence import check, random_case, random_filters
+from data.cube import SurveyCube
+from data.engine import GROUP_KEY_MAP, compute_cri
+
+# The vectorized kernel (SurveyCube.compute_cri) against the pandas reference
+# (engine.compute_cri on raw rows), on the random surveys of
+# benchmarks.kernel_equivalence. Odd seeds apply a random filter selection.
+
+
+def _filtered(survey, filters):
+    return survey[
+        survey['month'].isin(filters['months']) & survey['department'].isin(filters['departments']) &
+        survey['role_level'].isin(filters['roles']) & survey['location'].isin(filters['locations'])
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_kernel_matches_reference(seed):
+    rng = np.random.default_rng(seed)
+    survey, hr = random_case(rng, int(rng.integers(5, 2000)))
+    cube = SurveyCube.from_survey(survey)
+    filters = random_filters(rng, survey) if seed % 2 else None
+    raw = _filtered(survey, filters) if filters is not None else survey
+    if raw.empty:
+        pytest.skip("filter selection matches no rows")
+
+    for agg_level in GROUP_KEY_MAP:
+        problem = check(compute_cri(raw, hr, agg_level), cube.compute_cri(hr, agg_level, filters))
+        assert problem is None, f"{agg_level}: {problem}"
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_rollup_levels_match_single_levels(seed):
+    rng = np.random.default_rng(seed)
+    survey, hr = random_case(rng, 1500)
+    cube = SurveyCube.from_survey(survey)
+    levels = list(GROUP_KEY_MAP)
+    for agg_level, frame in cube.compute_cri_levels(hr, levels).items():
+        assert check(cube.compute_cri(hr, agg_level), frame) is None
@@ -0,0 +1,57 @@
+import io
+
+import pandas as pd
+
+from data.engine import DIMENSIONS, HR_METRICS, Q_ALL, load_inputs
+from data.ingest import load_inputs_streaming
+from data.timestamps import parse_timestamps
+from data.watch import DropWatcher, ingest
+
+# Slash dates take one MM/DD vs DD/MM order per column, however the column is
+# read: whole, in chunks, or a few records per watch poll.
+
+# The first two rows are ambiguous; the day-first row only comes later
+TIMESTAMPS = ["03/04/2025", "05/06/2025", "01/02/2025", "25/03/2025"]
+
+
+def _survey_csv(timestamps):
+    rows = [["D0", "R0", "L0"] + [3] * len(Q_ALL) + [ts] for ts in timestamps]
+    frame = pd.DataFrame(rows, columns=DIMENSIONS + Q_ALL + ["timestamp"])
+    return frame.to_csv(index=False).encode()
+
+
+def _hr_csv():
+    frame = pd.DataFrame([["D0", "2025-04"] + [0.0] * len(HR_METRICS)], columns=["department", "month"] + HR_METRICS)
+    return frame.to_csv(index=False).encode()
+
+
+def test_one_order_per_column():
+    parsed, report = parse_timestamps(pd.Series(TIMESTAMPS))
+    assert list(parsed.dt.strftime("%Y-%m-%d")) == ["2025-04-03", "2025-06-05", "2025-02-01", "2025-03-25"]
+    assert report == {"DD/MM/YYYY": 4}
+
+
+def test_offsets_keep_local_month():
+    parsed, _ = parse_timestamps(pd.Series(["2025-01-31T23:30:00-05:00", "2025-03-01T00:30:00+01:00"]))
+    assert list(parsed.dt.strftime("%Y-%m")) == ["2025-01", "2025-03"]
+
+
+def test_streamed_chunks_match_whole_file():
+    survey_csv, hr_csv = _survey_csv(TIMESTAMPS), _hr_csv()
+    whole, _, _, _ = load_inputs(io.BytesIO(survey_csv), io.BytesIO(hr_csv))
+    streamed, _, _, _ = load_inputs_streaming(io.BytesIO(survey_csv), io.BytesIO(hr_csv), chunksize=2)
+    assert list(streamed['timestamp']) == list(whole['timestamp'])
+    assert list(streamed['month'].astype(str)) == ["2025-04", "2025-06", "2025-02", "2025-03"]
+
+
+def test_watch_keeps_order_across_polls(tmp_path):
+    (tmp_path / "hr.csv").write_bytes(_hr_csv())
+    survey = tmp_path / "survey.csv"
+    survey.write_bytes(_survey_csv(TIMESTAMPS[-1:]))
+    watcher = DropWatcher(str(tmp_path))
+    pipeline, _, _ = ingest(watcher)
+
+    with open(survey, "ab") as f:
+        f.write(_survey_csv(TIMESTAMPS[:1]).split(b"\n", 1)[1])
+    pipeline, _, _ = ingest(watcher, pipeline)
+    assert pipeline.months == ["2025-03", "2025-04"]
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from data.cube import SurveyCube
+from data.engine import HR_METRICS, Q_ALL
+from data.trends import DEFAULT_TREND_SETTINGS
+from data.views import ResultViews
+
+# Trends and anomaly flags for a month-filtered selection are replayed over
+# each group's full history, so a short selection can still flag its latest
+# month.
+
+MONTHS = [str(p) for p in pd.period_range('2024-01', periods=8, freq='M')]
+
+
+def _case():
+    rng = np.random.default_rng(0)
+    rows = []
+    for month in MONTHS:
+        for dept in ["D0", "D1"]:
+            for _ in range(20):
+                answers = rng.integers(4, 6, len(Q_ALL)).astype(float)
+                if dept == "D0" and month == MONTHS[-1]:
+                    answers[:] = 1.0  # D0 collapses in the last month
+                rows.append([dept, "R0", "L0", month] + list(answers))
+    survey = pd.DataFrame(rows, columns=['department', 'role_level', 'location', 'month'] + Q_ALL)
+    hr = pd.DataFrame([[d, m] + [0.1, 0.05, 2.0, 1.0, 1.0] for d in ["D0", "D1"] for m in MONTHS],
+                      columns=['department', 'month'] + HR_METRICS)
+    return SurveyCube.from_survey(survey), hr
+
+
+def test_filtered_months_flag_latest_month_with_history():
+    cube, hr = _case()
+    selected = cube.compute_cri(hr, "Department", {"months": MONTHS[-DEFAULT_TREND_SETTINGS.min_periods:]})
+    history = cube.compute_cri(hr, "Department")
+
+    # Replaying only the selected months leaves too little history to flag
+    assert ResultViews(selected).anomalies().empty
+
+    anomalies = ResultViews(selected, history).anomalies()
+    assert list(zip(anomalies['group'], anomalies['month'])) == [("D0", MONTHS[-1])]
+
+
+def test_trends_with_history_cover_only_selected_months():
+    cube, hr = _case()
+    selected = cube.compute_cri(hr, "Department", {"months": MONTHS[-2:]})
+    trends = ResultViews(selected, cube.compute_cri(hr, "Department")).trends()
+    assert sorted(trends['month'].unique()) == MONTHS[-2:]
+    assert trends['CRI_trend'].notna().all()
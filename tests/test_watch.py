@@ -0,0 +1,65 @@
+import os
+
+import pandas as pd
+
+from data.engine import DIMENSIONS, HR_METRICS, Q_ALL
+from data.incremental import IncrementalPipeline
+from data.watch import DropWatcher, LiveCube, SurveyFeed, ingest
+
+# Drop-folder ingestion: batches are folded in as they arrive, and a changed
+# HR file replaces the previous HR table (rows deleted from it go away).
+
+
+def _write_survey(path, rows, header=True):
+    frame = pd.DataFrame([[d, "R0", "L0"] + [3] * len(Q_ALL) + [ts] for d, ts in rows],
+                         columns=DIMENSIONS + Q_ALL + ["timestamp"])
+    with open(path, "a") as f:
+        frame.to_csv(f, index=False, header=header)
+
+
+def _write_hr(path, departments, mtime):
+    pd.DataFrame([[d, "2025-01"] + [1.0] * len(HR_METRICS) for d in departments],
+                 columns=["department", "month"] + HR_METRICS).to_csv(path, index=False)
+    os.utime(path, (mtime, mtime))
+
+
+def test_feed_folds_batches_into_cube(tmp_path):
+    _write_hr(tmp_path / "hr.csv", ["D0", "D1"], 1000)
+    _write_survey(tmp_path / "a.csv", [("D0", "2025-01-05"), ("D1", "2025-01-06")])
+    feed = SurveyFeed(str(tmp_path))
+    assert feed.poll(force=True) == 1
+    assert isinstance(feed.pipeline, LiveCube)
+    cube, _, _ = feed.snapshot()
+    first_id = cube.dataset_id
+
+    _write_survey(tmp_path / "a.csv", [("D0", "2025-02-03")], header=False)
+    assert feed.poll(force=True) == 2
+    cube, _, _ = feed.snapshot()
+    assert cube.responses() == 3
+    assert cube.options('month') == ["2025-01", "2025-02"]
+    assert cube.dataset_id != first_id
+
+
+def test_changed_hr_file_replaces_hr(tmp_path):
+    _write_hr(tmp_path / "hr.csv", ["D0", "D1"], 1000)
+    _write_survey(tmp_path / "a.csv", [("D0", "2025-01-05"), ("D1", "2025-01-06")])
+    feed = SurveyFeed(str(tmp_path))
+    feed.poll(force=True)
+
+    _write_hr(tmp_path / "hr.csv", ["D0"], 2000)
+    feed.poll(force=True)
+    _, hr, _ = feed.snapshot()
+    assert list(hr['department']) == ["D0"]
+
+
+def test_cli_pipeline_replaces_hr(tmp_path):
+    _write_hr(tmp_path / "hr.csv", ["D0", "D1"], 1000)
+    _write_survey(tmp_path / "a.csv", [("D0", "2025-01-05"), ("D1", "2025-01-06")])
+    watcher = DropWatcher(str(tmp_path))
+    pipeline, _, _ = ingest(watcher)
+    assert isinstance(pipeline, IncrementalPipeline)
+
+    _write_hr(tmp_path / "hr.csv", ["D1"], 2000)
+    pipeline, report, _ = ingest(watcher, pipeline)
+    assert report is not None
+    assert list(pipeline.hr['department']) == ["D1"]
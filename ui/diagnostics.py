@@ -0,0 +1,62 @@
+import pandas as pd
+import streamlit as st
+from data.instrument import finish_trace, start_trace
+from data.loader import get_registry
+from data.processor import get_job_runner, get_result_cache
+
+def begin_trace():
+    # Called first thing on every rerun; memory tracking is opt-in (tracemalloc is slow)
+    previous = st.session_state.get("diagnostics_trace")
+    if previous is not None and previous.seconds is None:
+        finish_trace(previous)  # last rerun was stopped or interrupted before finishing
+    enabled = st.session_state.get("show_diagnostics", False)
+    trace = start_trace(track_memory=enabled and st.session_state.get("trace_memory", False))
+    st.session_state["diagnostics_trace"] = trace
+    return trace
+
+def render_diagnostics(trace, views, builds_before):
+    with st.sidebar:
+        st.markdown("---")
+        enabled = st.checkbox("Show diagnostics", key="show_diagnostics")
+        st.checkbox("Track peak memory (slower)", key="trace_memory", disabled=not enabled)
+    if not enabled:
+        return
+
+    with st.expander("🩺 Diagnostics", expanded=True):
+        summary = trace.summary()
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Rerun time", f"{summary['ms']:.0f} ms")
+        col2.metric("Stages", summary["stages"])
+        col3.metric("Result cache hits", summary.get("result_cache_hit", 0))
+        col4.metric("Result cache misses", summary.get("result_cache_miss", 0))
+
+        rows = []
+        for record in trace.stages():
+            rows.append({
+                "Stage": " " * record.depth + record.name,
+                "ms": record.seconds * 1000 if record.seconds is not None else None,
+                "Rows": record.rows,
+                "Peak MB": record.peak_bytes / 1e6 if record.peak_bytes is not None else None,
+                "Counters": ", ".join(f"{k}={v}" for k, v in record.counters.items()),
+            })
+        if rows:
+            st.dataframe(pd.DataFrame(rows).style.format({"ms": "{:.1f}", "Peak MB": "{:.1f}"}, na_rep=""),
+                         use_container_width=True, hide_index=True)
+        if not trace.track_memory:
+            st.caption("Peak memory is only measured with 'Track peak memory' on.")
+
+        stats = views.stats()
+        if stats:
+            st.markdown("**Derived views**")
+            st.dataframe(pd.DataFrame({
+                "Built this rerun": {name: s["builds"] - builds_before.get(name, 0) for name, s in stats.items()},
+                "Built total": {name: s["builds"] for name, s in stats.items()},
+                "Reads total": {name: s["reads"] for name, s in stats.items()},
+            }), use_container_width=True)
+
+        st.markdown("**Shared caches**")
+        st.json({
+            "result_cache": get_result_cache().stats(),
+            "registry": get_registry().stats(),
+            "jobs": get_job_runner().stats(),
+        }, expanded=False)
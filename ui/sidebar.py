@@ -1,64 +1,120 @@
+import os
+
 import streamlit as st
-from data.loader import load_data
+from data.loader import load_data, load_watched, release_dataset
+from data.ingest import DEFAULT_CHUNKSIZE
+from data.instrument import stage
+from data.engine import GROUP_KEY_MAP, combine_levels
+from data.processor import ROLLUP_LEVELS, chart_export_key, export_charts
+
+# Uploads above this size are streamed in compact chunks instead of read whole
+STREAMING_THRESHOLD_BYTES = 50 * 1024 * 1024
 
 def render_sidebar():
     with st.sidebar:
-        st.header("📁 Data Upload")
-
-        survey_file = st.file_uploader(
-            "Workplace Climate Survey CSV",
-            type=["csv"],
-            key="survey"
-        )
-        hr_file = st.file_uploader(
-            "HR Operational Metrics CSV",
-            type=["csv"],
-            key="hr"
-        )
+        # CRI_WATCH_DIR enables a live source fed by a drop folder (data.watch)
+        watch_path = os.environ.get("CRI_WATCH_DIR")
+        source = st.radio("Data source", ["Watched folder", "Upload files"], horizontal=True) if watch_path else None
 
-        if not survey_file or not hr_file:
-            st.warning("Both files are required to generate insights.")
-            st.stop()
-
-        # Load full data (unfiltered)
-        survey_df, hr_df = load_data(survey_file, hr_file)
+        if source == "Watched folder":
+            st.header("📡 Live Data")
+            release_dataset()
+            with stage("load_data"):
+                hr_df, cube = load_watched(watch_path)
+        else:
+            hr_df, cube = render_upload()
 
         st.markdown("---")
 
         st.header("⚙️ Filters & Settings")
 
-        # Get unique values from full data
-        months = sorted(survey_df['month'].unique())
-        departments = sorted(survey_df['department'].unique())
-        roles = sorted(survey_df['role_level'].unique())
-        locations = sorted(survey_df['location'].unique())
+        # Get unique values from the cube cells (full data)
+        months = cube.options('month')
+        departments = cube.options('department')
+        roles = cube.options('role_level')
+        locations = cube.options('location')
 
         selected_months = st.multiselect("Select months", months, default=months[-3:])  # last 3 by default
         selected_depts = st.multiselect("Departments", departments, default=departments)
         selected_roles = st.multiselect("Role Levels", roles, default=roles)
         selected_locations = st.multiselect("Locations", locations, default=locations)
 
-        agg_level = st.radio("Aggregate results by", ["Department", "Role Level", "Location"], index=0)
+        # Any combination of dimensions; none selected means the whole organization
+        group_by = st.multiselect("Aggregate results by", list(GROUP_KEY_MAP), default=["Department"],
+                                  help="Pick several to combine them, e.g. Department × Location")
+        agg_level = combine_levels([level for level in GROUP_KEY_MAP if level in group_by])
+
+        show_intervals = st.checkbox("Show confidence intervals", value=False,
+                                     help="90% bootstrap intervals for CRI and each component")
+        resamples = st.select_slider("Bootstrap resamples", [200, 500, 1000, 2000], value=1000,
+                                     disabled=not show_intervals)
 
     filters = {
         "months": selected_months,
         "departments": selected_depts,
         "roles": selected_roles,
         "locations": selected_locations,
-        "agg_level": agg_level
+        "agg_level": agg_level,
+        "ci_resamples": resamples if show_intervals else None,
     }
 
-    # Apply filters only to survey data
-    filtered_survey = survey_df[
-        (survey_df['month'].isin(selected_months)) &
-        (survey_df['department'].isin(selected_depts)) &
-        (survey_df['role_level'].isin(selected_roles)) &
-        (survey_df['location'].isin(selected_locations))
-    ]
-
-    if filtered_survey.empty:
+    # Filters apply only to survey data, and are resolved against cube cells
+    # (or pushed down to SQL for an out-of-core store)
+    with stage("filter_select", rows=len(cube)) as s:
+        selected = cube.responses(filters)
+        if s:
+            s.counters["responses_selected"] = selected
+    if not selected:
         st.warning("No data matches your filters. Please adjust.")
         st.stop()
 
-    # Return filtered survey + full hr 
-    return filtered_survey, hr_df, filters
\ No newline at end of file
+    # Return survey cube + full hr
+    return cube, hr_df, filters
+
+def render_upload():
+    st.header("📁 Data Upload")
+
+    survey_file = st.file_uploader(
+        "Workplace Climate Survey CSV",
+        type=["csv"],
+        key="survey"
+    )
+    hr_file = st.file_uploader(
+        "HR Operational Metrics CSV",
+        type=["csv"],
+        key="hr"
+    )
+
+    if not survey_file or not hr_file:
+        release_dataset()
+        st.warning("Both files are required to generate insights.")
+        st.stop()
+
+    # Load full data (unfiltered)
+    chunksize = DEFAULT_CHUNKSIZE if survey_file.size > STREAMING_THRESHOLD_BYTES else None
+    with stage("load_data"):
+        hr_df, cube = load_data(survey_file, hr_file, chunksize=chunksize)
+    return hr_df, cube
+
+def render_export(cube, hr_df, filters, profile):
+    with st.sidebar:
+        st.markdown("---")
+        st.header("📦 Chart Export")
+        levels = st.multiselect("Levels to export", list(dict.fromkeys(ROLLUP_LEVELS + [filters["agg_level"]])),
+                                default=[filters["agg_level"]])
+        key = chart_export_key(cube, filters, profile, levels)
+        if st.button("Build chart archive", disabled=not levels, use_container_width=True):
+            st.session_state["chart_export_key"] = key
+
+        # Once requested, reruns reattach to the export job (or its finished
+        # result) until the filters or levels change
+        if not levels or st.session_state.get("chart_export_key") != key:
+            return
+        archive = export_charts(cube, hr_df, filters, profile, levels)
+        st.download_button(
+            label="📥 Download all charts (ZIP)",
+            data=archive,
+            file_name="cri_charts.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
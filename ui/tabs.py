@@ -1,8 +1,15 @@
 import streamlit as st
+import pandas as pd
+from data.engine import COMPONENTS, GROUP_KEY_MAP, drill_levels, group_columns
+from data.scoring import DEFAULT_PROFILE, RISK_LEVELS, sample_scenarios, sensitivity
+from data.table import DEFAULT_PAGE_SIZE, PAGE_SIZES, page_count
+from data.trends import DEFAULT_TREND_SETTINGS, SIGNAL_LABELS, TREND_METHODS, TrendSettings
 from visuals.charts import plot_trend, plot_group_bar, plot_radar
-from io import BytesIO
+from visuals.export import png_bytes
+from visuals.figures import group_bar_figure, radar_figure, trend_figure
 
-def render_tabs(results_df, filters):
+def render_tabs(views, filters, profile=DEFAULT_PROFILE, drill=None):
+    results_df = views.results
     if results_df.empty:
         st.warning("No results to display with current filters.")
         return
@@ -22,37 +29,31 @@ def render_tabs(results_df, filters):
         if results_df.empty:
             st.info("Upload data and apply filters to see executive metrics.")
         else:
-            # Get latest month data
-            latest_month = results_df['month'].max()
-            current = results_df[results_df['month'] == latest_month]
-
-            # Previous month for trend
-            months_sorted = sorted(results_df['month'].unique())
-            prev_month = months_sorted[-2] if len(months_sorted) > 1 else None
-            previous = results_df[results_df['month'] == prev_month] if prev_month else None
+            settings = render_trend_settings()
+            current = views.current
+            trends = views.trends(settings)
 
             # Calculations
             overall_cri = current['CRI'].mean()
-            high_risk_count = len(current[current['CRI'] >= 70])
-            medium_risk_count = len(current[(current['CRI'] >= 40) & (current['CRI'] < 70)])
+            bands = profile.band(current['CRI'].to_numpy())
+            high_risk_count = int((bands == 2).sum())
+            medium_risk_count = int((bands == 1).sum())
             total_groups = len(current)
 
-            # Trend calculation
-            if previous is not None and not previous.empty:
-                prev_avg = previous['CRI'].mean()
-                curr_avg = overall_cri
-                if abs(curr_avg - prev_avg) < 1:
-                    trend = "→"
-                    trend_text = "Stable"
-                elif curr_avg > prev_avg:
-                    trend = "↑"
-                    trend_text = "Increasing"
-                else:
-                    trend = "↓"
-                    trend_text = "Decreasing"
-            else:
+            # Trend: smoothed month-over-month CRI change, averaged over groups
+            trend_now = trends.loc[trends['month'] == views.latest_month, 'CRI_trend'].mean()
+            if pd.isna(trend_now):
                 trend = "→"
                 trend_text = "No prior data"
+            elif abs(trend_now) < 1:
+                trend = "→"
+                trend_text = "Stable"
+            elif trend_now > 0:
+                trend = f"↑ {trend_now:+.1f}/mo"
+                trend_text = "Increasing"
+            else:
+                trend = f"↓ {trend_now:+.1f}/mo"
+                trend_text = "Decreasing"
 
             # Metric Cards using columns
             col1, col2, col3, col4 = st.columns(4)
@@ -80,21 +81,21 @@ def render_tabs(results_df, filters):
 
             with col4:
                 st.metric(
-                    label="Trend (MoM)",
+                    label=f"Trend ({settings.window}-month {'EWMA' if settings.method == 'ewma' else 'rolling'})",
                     value=trend_text,
                     delta=trend
                 )
 
+            render_anomalies(views, settings)
+
             # Trend chart below metrics
             st.markdown("### Organization-Wide CRI Trend")
-            fig_trend = plot_trend(results_df)  # Now returns fig
+            fig_trend = plot_trend(results_df, profile)  # Now returns fig
             if fig_trend:
-                buf = BytesIO()
-                fig_trend.savefig(buf, format="png", bbox_inches='tight', dpi=200)
-                buf.seek(0)
+                # PNG is only rendered when the button is clicked
                 st.download_button(
                     label="📥 Download Trend Chart",
-                    data=buf,
+                    data=lambda: png_bytes(trend_figure(results_df, profile)),
                     file_name="cri_trend.png",
                     mime="image/png",
                     use_container_width=True
@@ -102,19 +103,20 @@ def render_tabs(results_df, filters):
 
     with tab2:
         st.subheader(f"Current Risk Levels by {filters['agg_level']}")
-        fig_bar = plot_group_bar(results_df)  # Returns fig
+        fig_bar = plot_group_bar(results_df, profile, latest=views.latest)  # Returns fig
         if fig_bar:
-            buf = BytesIO()
-            fig_bar.savefig(buf, format="png", bbox_inches='tight', dpi=200)
-            buf.seek(0)
             st.download_button(
                 label="📥 Download Risk Levels Chart",
-                data=buf,
+                data=lambda: png_bytes(group_bar_figure(results_df, profile, latest=views.latest)),
                 file_name="risk_levels.png",
                 mime="image/png",
                 use_container_width=True
             )
 
+        if drill is not None:
+            render_drill_down(views, filters, profile, drill)
+        render_sensitivity(views, profile)
+
     with tab3:  
         st.header("Component Drivers")
         st.markdown("""
@@ -127,22 +129,18 @@ def render_tabs(results_df, filters):
             st.info("Upload data and apply filters to see component drivers.")
         else:
             # Show radar for highest-risk group
-            fig_radar = plot_radar(results_df)  # Returns fig
+            fig_radar = plot_radar(results_df, latest=views.latest)  # Returns fig
             if fig_radar:
-                buf = BytesIO()
-                fig_radar.savefig(buf, format="png", bbox_inches='tight', dpi=200)
-                buf.seek(0)
                 st.download_button(
                     label="📥 Download Radar Chart",
-                    data=buf,
+                    data=lambda: png_bytes(radar_figure(results_df, latest=views.latest)),
                     file_name="component_drivers.png",
                     mime="image/png",
                     use_container_width=True
                 )
 
             # Table for exact values
-            latest = results_df.sort_values('month').groupby('group').last()
-            high_risk_row = latest.sort_values('CRI', ascending=False).iloc[0]
+            high_risk_row = views.top_row
             group_name = high_risk_row.name
 
             st.markdown(f"#### Current Scores — **{group_name}**")
@@ -160,24 +158,7 @@ def render_tabs(results_df, filters):
 
     with tab4:
         st.subheader("Detailed Signal Data")
-
-        display_df = results_df.copy()
-        agg_col = filters["agg_level"].lower().replace(" ", "_")
-        if agg_col in display_df.columns and 'group' in display_df.columns:
-            if (display_df[agg_col] == display_df['group']).all():
-                display_df = display_df.drop(columns=['group'])
-        
-        # Rename for consistency
-        display_df = display_df.rename(columns={agg_col: "Group"})
-        styled = display_df.style.format({
-            "CRI": "{:.1f}",
-            "vol_score": "{:.1f}",
-            "trust_score": "{:.1f}",
-            "comm_score": "{:.1f}",
-            "hr_score": "{:.1f}",
-            "change_score": "{:.1f}",
-        })
-        st.dataframe(styled, use_container_width=True)
+        render_signal_table(views, filters)
 
     with tab5:
         st.header("What This Means")
@@ -186,9 +167,8 @@ def render_tabs(results_df, filters):
         """)
 
         # Find highest risk group
-        latest = results_df.sort_values('month').groupby('group').last()
-        if not latest.empty:
-            high_risk = latest.sort_values('CRI', ascending=False).iloc[0]
+        if not views.latest.empty:
+            high_risk = views.top_row
             group_name = high_risk.name
             cri = high_risk['CRI']
             risk_level = high_risk['risk_level']
@@ -196,23 +176,17 @@ def render_tabs(results_df, filters):
             st.markdown(f"### Highest Signal: **{group_name}** (CRI {cri:.1f} — {risk_level})")
 
             # Rank components
-            components = {
-                "Polarization & Instability": high_risk['vol_score'],
-                "Declining Trust & Safety": high_risk['trust_score'],
-                "Communication Strain": high_risk['comm_score'],
-                "HR Operational Stress": high_risk['hr_score'],
-                "Rapid Change Impact": high_risk['change_score'],
-            }
-            top_components = sorted(components.items(), key=lambda x: x[1], reverse=True)[:2]
+            top_components = views.top_drivers[:2]
 
             st.markdown("**Dominant signals:**")
             for name, score in top_components:
                 if score > 20:  # Only mention meaningful contributors
                     st.markdown(f"- **{name}** (contributing {score:.0f}% to CRI)")
 
-            if cri <= 39:
+            band = profile.band(cri)
+            if band == 0:
                 st.success("Overall low risk — healthy collaboration and stability detected. Continue monitoring.")
-            elif cri <= 69:
+            elif band == 1:
                 st.warning("Emerging strain detected. Patterns suggest growing friction that could escalate if unaddressed.")
             else:
                 st.error("Elevated risk — multiple signals indicate significant strain. Proactive support recommended.")
@@ -252,4 +226,136 @@ def render_tabs(results_df, filters):
             else:
                 st.success("No urgent actions needed — maintain current supportive practices.")
 
-            st.caption("All recommendations are general. Tailor to your organization's context with care and empathy.")
\ No newline at end of file
+            st.caption("All recommendations are general. Tailor to your organization's context with care and empathy.")
+
+def render_signal_table(views, filters):
+    # Sorting, search and filters run on the server; only the visible page
+    # is sent to the browser
+    table = views.table(filters["agg_level"])
+    col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
+    with col1:
+        search = st.text_input("Search groups", "")
+    with col2:
+        sort = st.selectbox("Sort by", table.columns, index=table.columns.index("CRI"))
+    with col3:
+        levels = st.multiselect("Risk level", list(RISK_LEVELS))
+    with col4:
+        descending = st.toggle("Descending", value=True)
+    months = st.multiselect("Months", views.months)
+
+    positions = table.select(sort, not descending, search, {"risk_level": levels, "month": months})
+    col1, col2, col3 = st.columns([1, 1, 3])
+    with col1:
+        size = st.selectbox("Rows per page", PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE))
+    pages = page_count(positions, size)
+    with col2:
+        page = min(st.number_input("Page", min_value=1, value=1, step=1), pages)
+    with col3:
+        first = (page - 1) * size
+        st.caption(f"Rows {min(first + 1, len(positions)):,}–{min(first + size, len(positions)):,} "
+                   f"of {len(positions):,} (page {page} of {pages})")
+
+    score_columns = ["CRI"] + COMPONENTS + [col for col in table.columns if col.endswith(("_lo", "_hi"))]
+    st.dataframe(
+        table.page(positions, page - 1, size),
+        column_config={col: st.column_config.NumberColumn(format="%.1f") for col in score_columns},
+        use_container_width=True,
+        hide_index=True,
+    )
+
+def render_trend_settings():
+    with st.expander("📈 Trend & anomaly settings", expanded=False):
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            method = st.radio("Smoothing", TREND_METHODS, format_func=lambda m: "EWMA" if m == "ewma" else "Rolling mean",
+                              horizontal=True)
+        with col2:
+            window = st.slider("Window (months)", 2, 12, DEFAULT_TREND_SETTINGS.window)
+        with col3:
+            z_threshold = st.slider("Anomaly threshold (std devs)", 1.5, 5.0, DEFAULT_TREND_SETTINGS.z_threshold, 0.5)
+        with col4:
+            min_jump = st.slider("Minimum jump (points)", 0, 30, int(DEFAULT_TREND_SETTINGS.min_jump))
+    return TrendSettings(method=method, window=window, z_threshold=z_threshold, min_jump=float(min_jump))
+
+def render_anomalies(views, settings):
+    anomalies = views.anomalies(settings)
+    if anomalies.empty:
+        st.caption(f"No unusual jumps in {views.latest_month}.")
+        return
+    st.markdown(f"### ⚠️ Unusual jumps in {views.latest_month}")
+    table = pd.DataFrame({
+        "Group": anomalies['group'].to_numpy(),
+        "Signal": anomalies['anomaly_signal'].map(SIGNAL_LABELS).to_numpy(),
+        "Change vs. trend": anomalies['anomaly_change'].to_numpy(),
+        "CRI trend (per month)": anomalies['CRI_trend'].to_numpy(),
+    })
+    st.dataframe(table.style.format({"Change vs. trend": "{:+.1f}", "CRI trend (per month)": "{:+.1f}"}),
+                 use_container_width=True, hide_index=True)
+
+def render_drill_down(views, filters, profile, drill):
+    # Breaks a group down by one more dimension. drill(level) returns results
+    # for another level; those were scored with the current ones, so this
+    # reads a cached rollup instead of recomputing.
+    columns = group_columns(filters["agg_level"])
+    children = drill_levels(filters["agg_level"])
+    if not children:
+        return
+    with st.expander("🔍 Drill down", expanded=False):
+        col1, col2 = st.columns(2)
+        with col2:
+            by = st.selectbox("Break down by", list(children))
+        child = drill(children[by])
+
+        if columns:
+            with col1:
+                group = st.selectbox(filters["agg_level"], list(views.ranked.index))
+            parent = views.latest.loc[group, columns].to_numpy()
+            child = child[(child[columns] == parent).all(axis=1)]
+            child = child.assign(group=child[GROUP_KEY_MAP[by]])
+            title = f"{group} by {by}"
+        else:
+            title = f"Organization by {by}"
+
+        if child.empty:
+            st.info("No data for this breakdown.")
+            return
+        st.markdown(f"#### {title}")
+        plot_group_bar(child, profile)
+
+def render_sensitivity(views, profile):
+    with st.expander("⚖️ Weight & threshold sensitivity", expanded=False):
+        st.markdown("How stable are current rankings and risk bands if the CRI weights "
+                    "and band cutoffs were chosen slightly differently?")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            n_scenarios = st.select_slider("Scenarios", [100, 500, 1000, 5000, 10000], value=1000)
+        with col2:
+            concentration = st.slider("Weight certainty", 5, 200, 50,
+                                      help="Dirichlet concentration around the current weights; lower = wider spread")
+        with col3:
+            jitter = st.slider("Cutoff jitter (± points)", 0, 15, 5)
+
+        if not st.checkbox("Run sensitivity analysis", value=False):
+            return
+
+        latest = views.latest
+        weights, thresholds = sample_scenarios(n_scenarios, profile, concentration, jitter)
+        result = sensitivity(latest[COMPONENTS].to_numpy(), weights, thresholds, profile)
+
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Groups changing band (avg)", f"{result['band_changed'].mean():.0%}")
+        col2.metric("Top group changes", f"{result['top_changed'].mean():.0%} of scenarios")
+        col3.metric("Rank correlation (median)", f"{pd.Series(result['spearman']).median():.2f}")
+
+        table = pd.DataFrame({
+            "CRI": result["base_cri"],
+            "Rank": result["base_ranks"],
+            "Best rank": result["rank_min"],
+            "Worst rank": result["rank_max"],
+            "P(low)": result["band_share"][:, 0],
+            "P(medium)": result["band_share"][:, 1],
+            "P(high)": result["band_share"][:, 2],
+        }, index=latest.index).sort_values("Rank")
+        st.dataframe(table.style.format({
+            "CRI": "{:.1f}", "P(low)": "{:.0%}", "P(medium)": "{:.0%}", "P(high)": "{:.0%}",
+        }), use_container_width=True)
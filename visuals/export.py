@@ -0,0 +1,105 @@
+import io
+import os
+import re
+import zipfile
+
+import matplotlib.pyplot as plt
+
+from data.engine import level_slug
+from data.jobs import checkpoint, process_pool
+from data.scoring import DEFAULT_PROFILE
+from visuals.figures import group_bar_figure, radar_figure, trend_figure
+
+# On-demand chart export. Every aggregation level gets its overview trend and
+# risk-level charts, and every group its own component-driver radar and CRI
+# trend. Groups are rendered in batches on worker processes with the Agg
+# backend and the PNGs are written into a ZIP as each batch comes back, so
+# nothing is encoded until somebody asks for the archive.
+
+EXPORT_DPI = 200
+GROUPS_PER_TASK = 16
+# Every export request gets its own pool, so concurrent exports are capped
+MAX_EXPORT_WORKERS = 4
+
+
+def png_bytes(fig, dpi=EXPORT_DPI):
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches='tight', dpi=dpi)
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _safe_name(value):
+    return re.sub(r"[^\w.-]+", "_", str(value)).strip("_") or "group"
+
+
+def _unique_names(groups):
+    # File name per group; labels that sanitize to the same name (e.g. "A/B"
+    # and "A_B", or differ only in case) get a numeric suffix
+    names, used = [], set()
+    for group in groups:
+        base = name = _safe_name(group)
+        n = 1
+        while name.lower() in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name.lower())
+        names.append(name)
+    return names
+
+
+def _render(args):
+    slug, df, groups, profile, dpi = args
+    plt.switch_backend("Agg")
+    charts = []
+    if groups is None:
+        for name, fig in (("trend", trend_figure(df, profile)), ("risk_levels", group_bar_figure(df, profile))):
+            if fig is not None:
+                charts.append((f"{slug}/{name}.png", png_bytes(fig, dpi)))
+        return charts
+
+    for group, name in groups:
+        group_df = df[df['group'] == group]
+        charts.append((f"{slug}/groups/{name}_radar.png", png_bytes(radar_figure(group_df, group), dpi)))
+        charts.append((f"{slug}/groups/{name}_trend.png", png_bytes(trend_figure(group_df, profile), dpi)))
+    return charts
+
+
+def export_tasks(results_by_level, profile=DEFAULT_PROFILE, dpi=EXPORT_DPI, groups_per_task=GROUPS_PER_TASK):
+    tasks = []
+    for agg_level, df in results_by_level.items():
+        if df.empty:
+            continue
+        slug = level_slug(agg_level)
+        tasks.append((slug, df, None, profile, dpi))
+        groups = list(df['group'].unique())
+        named = list(zip(groups, _unique_names(groups)))
+        for start in range(0, len(groups), groups_per_task):
+            batch = named[start:start + groups_per_task]
+            tasks.append((slug, df[df['group'].isin([group for group, _ in batch])], batch, profile, dpi))
+    return tasks
+
+
+def export_zip(results_by_level, out, profile=DEFAULT_PROFILE, workers=None, dpi=EXPORT_DPI):
+    # results_by_level: {agg_level: results frame}; out: path or writable binary file
+    tasks = export_tasks(results_by_level, profile, dpi)
+    workers = workers or min(os.cpu_count() or 1, MAX_EXPORT_WORKERS)
+    count = 0
+    # PNGs are already compressed; storing them keeps the archive cheap to build
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_STORED) as archive:
+        if workers == 1 or len(tasks) < 2:
+            results = map(_render, tasks)
+            pool = None
+        else:
+            pool = process_pool(workers)
+            results = pool.map(_render, tasks)
+        try:
+            for done, charts in enumerate(results, start=1):
+                for arcname, data in charts:
+                    archive.writestr(arcname, data)
+                count += len(charts)
+                checkpoint(done / len(tasks), f"Rendered {count:,} charts")
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    return count
@@ -0,0 +1,209 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from data.scoring import DEFAULT_PROFILE, RISK_COLORS
+
+# Figure builders shared by the dashboard (visuals.charts) and headless
+# renderers such as the batch report. They only build matplotlib figures;
+# displaying or saving them is up to the caller.
+
+# Level of detail: past these sizes the charts draw only the highest and
+# lowest groups, summarise the rest as an "other" band, and average long
+# monthly series into buckets, so render cost stops growing with group count
+MAX_TREND_LINES = 10
+MAX_BARS = 30
+MAX_TREND_POINTS = 36
+OTHER_COLOR = "#9e9e9e"
+
+def _split_extremes(cri, n):
+    # Highest ceil(n/2) and lowest floor(n/2) groups by CRI; the rest go to "other"
+    order = cri.sort_values(ascending=False, na_position='last').index
+    n_top = (n + 1) // 2
+    n_bottom = n - n_top
+    top = list(order[:n_top])
+    bottom = list(order[len(order) - n_bottom:]) if n_bottom else []
+    return top, bottom, list(order[n_top:len(order) - n_bottom])
+
+def _downsample(frame, max_points):
+    # Average consecutive months into at most max_points buckets, labelled by their last month
+    if len(frame) <= max_points:
+        return frame
+    buckets = np.arange(len(frame)) * max_points // len(frame)
+    out = frame.groupby(buckets).mean()
+    out.index = pd.Index(frame.index.to_series().groupby(buckets).last().to_numpy(), name=frame.index.name)
+    return out
+
+def trend_figure(df, profile=DEFAULT_PROFILE, max_lines=MAX_TREND_LINES, max_points=MAX_TREND_POINTS):
+    if df.empty:
+        return None
+
+    # Pivot for line chart: months on x, groups on lines, CRI on y
+    pivot = df.pivot(index='month', columns='group', values='CRI')
+    pivot = _downsample(pivot.sort_index(), max_points)  # Ensure chronological order
+
+    rest = []
+    lines = pivot
+    if pivot.shape[1] > max_lines:
+        top, bottom, rest = _split_extremes(pivot.ffill().iloc[-1], max_lines)
+        lines = pivot[top + bottom]
+
+    fig, ax = plt.subplots(figsize=(12, 6))
+
+    lines.plot(ax=ax, marker='o' if len(pivot) <= 24 else None, linewidth=2.5)
+    x = ax.get_lines()[0].get_xdata()
+
+    # Bootstrap intervals as shaded bands in each line's colour
+    if 'CRI_lo' in df.columns:
+        lo = _downsample(df.pivot(index='month', columns='group', values='CRI_lo').sort_index(), max_points)
+        hi = _downsample(df.pivot(index='month', columns='group', values='CRI_hi').sort_index(), max_points)
+        for line, group in zip(ax.get_lines(), lines.columns):
+            ax.fill_between(x, lo[group], hi[group], color=line.get_color(), alpha=0.15)
+
+    # Everything else as percentile ribbons around its median
+    if rest:
+        q = pivot[rest].quantile([0.1, 0.25, 0.5, 0.75, 0.9], axis=1)
+        ax.fill_between(x, q.loc[0.1], q.loc[0.9], color=OTHER_COLOR, alpha=0.2,
+                        label=f"Other {len(rest)} groups (10th-90th pct)")
+        ax.fill_between(x, q.loc[0.25], q.loc[0.75], color=OTHER_COLOR, alpha=0.35, label="Other (25th-75th pct)")
+        ax.plot(x, q.loc[0.5], color=OTHER_COLOR, linestyle='--', linewidth=2, label="Other (median)")
+
+    title = "Organization-Wide CRI Trend Over Time"
+    if rest:
+        title += f" (highest/lowest {len(lines.columns)} of {pivot.shape[1]} groups)"
+    ax.set_title(title, fontsize=16, pad=20)
+    ax.set_ylim(0, 100)
+    ax.set_ylabel("CRI Score")
+    ax.set_xlabel("Month")
+    ax.grid(True, alpha=0.3, linestyle='--')
+
+    # Risk threshold bands
+    ax.axhspan(0, profile.low_max, color=RISK_COLORS[0], alpha=0.2, label='Low Risk')
+    ax.axhspan(profile.low_max, profile.medium_max, color=RISK_COLORS[1], alpha=0.2, label='Medium Risk')
+    ax.axhspan(profile.medium_max, 100, color=RISK_COLORS[2], alpha=0.2, label='High Risk')
+
+    ax.legend(title="Group", bbox_to_anchor=(1.05, 1), loc='upper left')
+
+    return fig
+
+def group_bar_figure(df, profile=DEFAULT_PROFILE, max_bars=MAX_BARS, latest=None):
+    if df.empty:
+        return None
+
+    # Get unique groups in the current data
+    groups = df['group'].unique()
+    num_groups = len(groups)
+
+    # Determine title
+    agg_level = df['group'].name.title() if hasattr(df['group'], 'name') else 'Group'
+    if num_groups == 1:
+        title = f"Current CRI for {groups[0]}"
+    else:
+        title = f"Current Risk Levels by {agg_level}"
+
+    # Use latest month per group, sorted by CRI descending for better visual hierarchy
+    if latest is None:
+        latest = df.sort_values('month').groupby('group').last()
+    latest = latest.sort_values('CRI', ascending=True)  # Low to high for horizontal bar
+
+    # Beyond max_bars: lowest and highest groups around one "other" bar at the
+    # median of the rest, with its 10th-90th percentile range as error bar
+    other = None
+    if len(latest) > max_bars:
+        top, bottom, rest = _split_extremes(latest['CRI'], max_bars)
+        rest_cri = latest.loc[rest, 'CRI']
+        other = f"Other ({len(rest)} groups, median)"
+        title += f" (highest/lowest {max_bars} of {len(latest)})"
+        latest = pd.concat([
+            latest.loc[bottom[::-1]],
+            pd.DataFrame({'CRI': [rest_cri.median()], 'CRI_lo': [rest_cri.quantile(0.1)],
+                          'CRI_hi': [rest_cri.quantile(0.9)]}, index=[other]),
+            latest.loc[top[::-1]],
+        ])
+
+    fig, ax = plt.subplots(figsize=(10, max(6, len(latest) * 0.7)))
+
+    # Color by risk level (green / orange / red)
+    colors = [OTHER_COLOR if group == other else RISK_COLORS[band]
+              for group, band in zip(latest.index, profile.band(latest['CRI'].to_numpy()))]
+
+    xerr = None
+    if 'CRI_lo' in latest.columns:
+        xerr = [(latest['CRI'] - latest['CRI_lo']).clip(lower=0).fillna(0),
+                (latest['CRI_hi'] - latest['CRI']).clip(lower=0).fillna(0)]
+
+    bars = ax.barh(latest.index, latest['CRI'], color=colors, height=0.8,
+                   xerr=xerr, error_kw=dict(ecolor='#333333', capsize=3))
+
+    ax.set_xlim(0, 100)
+    ax.set_title(title, fontsize=16, pad=20)
+    ax.set_xlabel("CRI Score")
+
+    # Add value labels on bars (past the error bar when shown)
+    label_x = latest['CRI_hi'].fillna(latest['CRI']) if xerr is not None else latest['CRI']
+    for bar, x in zip(bars, label_x):
+        width = bar.get_width()
+        ax.text(max(width, x) + 1, bar.get_y() + bar.get_height()/2,
+                f'{width:.1f}', va='center', ha='left', fontweight='bold')
+
+    ax.grid(axis='x', alpha=0.3, linestyle='--')
+
+    # Clean y-axis labels
+    ax.tick_params(axis='y', labelsize=10)
+
+    return fig
+
+def radar_figure(df, group=None, latest=None):
+    if df.empty:
+        return None
+
+    # Get latest data and find highest-risk group (unless one is given)
+    if latest is None:
+        latest = df.sort_values('month').groupby('group').last()
+    if group is None:
+        high_risk_row = latest.sort_values('CRI', ascending=False).iloc[0]
+    else:
+        high_risk_row = latest.loc[group]
+    group_name = high_risk_row.name
+    cri = high_risk_row['CRI']
+
+    # Prepare data
+    labels = [
+        "Polarization &\nInstability",
+        "Declining Trust &\nSafety",
+        "Communication\nStrain",
+        "HR Operational\nStress",
+        "Rapid Change\nImpact"
+    ]
+    values = [
+        high_risk_row['vol_score'],
+        high_risk_row['trust_score'],
+        high_risk_row['comm_score'],
+        high_risk_row['hr_score'],
+        high_risk_row['change_score']
+    ]
+
+    # Create radar chart
+    fig, ax = plt.subplots(figsize=(3, 3), subplot_kw=dict(polar=True))
+
+    angles = [n / float(len(labels)) * 2 * 3.14159 for n in range(len(labels))]
+    angles += angles[:1]  # Close the circle
+    values += values[:1]
+
+    ax.plot(angles, values, 'o-', linewidth=1, color='#00d4ff')
+    ax.fill(angles, values, alpha=0.25, color='#00d4ff')
+
+    ax.set_xticks(angles[:-1])
+    ax.set_xticklabels(labels, fontsize=3, color='white')
+    ax.set_yticklabels([])  # Hide radial numbers
+    ax.set_ylim(0, 100)
+    ax.grid(True, color='gray', alpha=0.3)
+
+    # Title with group and CRI
+    ax.set_title(f"\nComponent Drivers for {group_name}\n(CRI {cri:.1f})", 
+                 size=5, color='white', pad=30)
+
+    # Background
+    fig.patch.set_facecolor('#0e1117')
+    ax.set_facecolor('#0e1117')
+
+    return fig